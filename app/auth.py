@@ -0,0 +1,12 @@
+"""
+Текущий пользователь запроса
+"""
+
+# Аутентификации пока нет: все запросы выполняются от тестового пользователя.
+# Когда она появится, меняется только get_current_user_id - запросы к
+# заметкам и тегам уже получают user_id через эту зависимость
+DEFAULT_USER_ID = 1
+
+
+async def get_current_user_id() -> int:
+    return DEFAULT_USER_ID
@@ -0,0 +1,89 @@
+"""
+Потоковая выгрузка заметок: постоянная память независимо от размера таблицы
+"""
+
+import csv
+import io
+from typing import Callable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.note import Note
+from app.utils.json_security import safe_json_dumps
+
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FIELDS = ("id", "title", "body", "user_id", "created_at", "updated_at")
+
+# Символы, с которых табличные редакторы начинают формулу (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _iter_batches(
+    session_factory: Callable[[], Session], user_id: int, batch_size: int
+) -> Iterator[list]:
+    """
+    Читает заметки пользователя пачками через серверный курсор (yield_per).
+    Сессия открывается здесь, а не в зависимости FastAPI: зависимость
+    закрывается до того, как StreamingResponse начнет отдавать тело.
+    """
+    columns = [getattr(Note, field) for field in EXPORT_FIELDS]
+    query = (
+        select(*columns)
+        .where(Note.user_id == user_id)
+        .order_by(Note.id)
+        .execution_options(yield_per=batch_size)
+    )
+    db = session_factory()
+    try:
+        for batch in db.execute(query).partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def _as_record(row) -> dict:
+    record = dict(row._mapping)
+    for field in ("created_at", "updated_at"):
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return record
+
+
+def iter_notes_ndjson(
+    session_factory: Callable[[], Session],
+    user_id: int,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Заметки в формате NDJSON, один chunk на пачку строк"""
+    for batch in _iter_batches(session_factory, user_id, batch_size):
+        lines = [safe_json_dumps(_as_record(row)) for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_safe(value):
+    """Экранирует значения, которые Excel/LibreOffice исполнят как формулу"""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_notes_csv(
+    session_factory: Callable[[], Session],
+    user_id: int,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Заметки в формате CSV с заголовком"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in _iter_batches(session_factory, user_id, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            record = _as_record(row)
+            writer.writerow([_csv_safe(record[field]) for field in EXPORT_FIELDS])
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,123 @@
+"""
+Учет ссылок на файлы content-addressed хранилища загрузок
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import FileReference, StoredFile, ThumbnailJob
+from app.utils.file_security import SavedFile
+from app.utils.thumbnails import remove_thumbnails
+
+
+async def acquire_file(
+    db: AsyncSession, saved: SavedFile, upload_dir: Path, user_id: int
+) -> int:
+    """
+    Добавляет ссылку пользователя на сохраненный файл. Первая загрузка
+    создает запись и, в той же транзакции, задачу генерации миниатюр.
+    Возвращает новое общее число ссылок
+    """
+    try:
+        ref_count = await _add_reference(db, saved, upload_dir, user_id)
+        await db.commit()
+    except IntegrityError:
+        # Параллельная загрузка того же содержимого успела создать записи
+        await db.rollback()
+        ref_count = await _add_reference(db, saved, upload_dir, user_id)
+        await db.commit()
+    return ref_count
+
+
+async def _add_reference(
+    db: AsyncSession, saved: SavedFile, upload_dir: Path, user_id: int
+) -> int:
+    increment = (
+        update(StoredFile)
+        .where(StoredFile.sha256 == saved.sha256)
+        .values(ref_count=StoredFile.ref_count + 1)
+        .returning(StoredFile.ref_count)
+    )
+    ref_count = (await db.execute(increment)).scalar_one_or_none()
+    if ref_count is None:
+        ref_count = 1
+        db.add(
+            StoredFile(
+                sha256=saved.sha256,
+                path=saved.path.relative_to(upload_dir.resolve()).as_posix(),
+                content_type=saved.content_type,
+                size=saved.size,
+                ref_count=1,
+            )
+        )
+        db.add(ThumbnailJob(sha256=saved.sha256))
+
+    own_increment = (
+        update(FileReference)
+        .where(FileReference.sha256 == saved.sha256, FileReference.user_id == user_id)
+        .values(count=FileReference.count + 1)
+        .returning(FileReference.count)
+    )
+    if (await db.execute(own_increment)).scalar_one_or_none() is None:
+        db.add(FileReference(sha256=saved.sha256, user_id=user_id, count=1))
+    await db.flush()
+    return ref_count
+
+
+def remove_stored_file(upload_dir: Path, path: str, sha256: str, content_type: str):
+    """Удаляет файл и его миниатюры с диска (блокирующие вызовы)"""
+    (upload_dir / path).unlink(missing_ok=True)
+    remove_thumbnails(upload_dir, sha256, content_type)
+
+
+async def release_file(
+    db: AsyncSession, upload_dir: Path, sha256: str, user_id: int
+) -> Optional[int]:
+    """
+    Убирает одну ссылку пользователя на файл. Когда ссылок не остается ни
+    у кого, удаляет запись и файл с диска. Возвращает оставшееся общее
+    число ссылок или None, если у пользователя нет ссылок на файл
+    """
+    own_decrement = (
+        update(FileReference)
+        .where(
+            FileReference.sha256 == sha256,
+            FileReference.user_id == user_id,
+            FileReference.count > 0,
+        )
+        .values(count=FileReference.count - 1)
+        .returning(FileReference.count)
+    )
+    own_count = (await db.execute(own_decrement)).scalar_one_or_none()
+    if own_count is None:
+        await db.rollback()
+        return None
+    if own_count == 0:
+        await db.execute(
+            delete(FileReference).where(
+                FileReference.sha256 == sha256, FileReference.user_id == user_id
+            )
+        )
+
+    decrement = (
+        update(StoredFile)
+        .where(StoredFile.sha256 == sha256, StoredFile.ref_count > 0)
+        .values(ref_count=StoredFile.ref_count - 1)
+        .returning(StoredFile.ref_count, StoredFile.path, StoredFile.content_type)
+    )
+    row = (await db.execute(decrement)).one()
+    if row.ref_count == 0:
+        await db.execute(delete(ThumbnailJob).where(ThumbnailJob.sha256 == sha256))
+        await db.execute(delete(StoredFile).where(StoredFile.sha256 == sha256))
+        # Файл удаляется до commit: пока транзакция держит запись, загрузка
+        # того же содержимого ждет в acquire_file и затем видит, что файла нет
+        await run_in_threadpool(
+            remove_stored_file, upload_dir, row.path, sha256, row.content_type
+        )
+    await db.commit()
+    return row.ref_count
@@ -0,0 +1,113 @@
+"""
+Метрики Prometheus базы данных: время запросов по типу операции и
+состояние пулов соединений
+"""
+
+import time
+from typing import Dict
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+QUERY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["engine", "operation"],
+    buckets=QUERY_BUCKETS,
+)
+QUERY_ERRORS = Counter(
+    "db_query_errors_total", "Failed database statements", ["engine", "operation"]
+)
+
+
+def operation(statement: str) -> str:
+    """SELECT/INSERT/UPDATE/DELETE; PRAGMA, DDL и прочее - OTHER"""
+    words = statement.lstrip().split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in OPERATIONS else "OTHER"
+
+
+class PoolCollector(Collector):
+    """
+    Состояние пулов читается в момент сбора метрик, а не при каждом
+    checkout: запросы ничего не платят за эти метрики
+    """
+
+    def __init__(self):
+        self.engines: Dict[str, Engine] = {}
+
+    def collect(self):
+        families = {
+            "size": GaugeMetricFamily(
+                "db_pool_size", "Configured pool size", labels=["engine"]
+            ),
+            "checked_out": GaugeMetricFamily(
+                "db_pool_checked_out", "Connections in use", labels=["engine"]
+            ),
+            "checked_in": GaugeMetricFamily(
+                "db_pool_checked_in", "Idle connections in the pool", labels=["engine"]
+            ),
+            "overflow": GaugeMetricFamily(
+                "db_pool_overflow",
+                "Connections open above pool_size",
+                labels=["engine"],
+            ),
+        }
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            # SingletonThreadPool in-memory SQLite не имеет размера
+            if not isinstance(pool, QueuePool):
+                continue
+            families["size"].add_metric([name], pool.size())
+            families["checked_out"].add_metric([name], pool.checkedout())
+            families["checked_in"].add_metric([name], pool.checkedin())
+            families["overflow"].add_metric([name], max(pool.overflow(), 0))
+        yield from families.values()
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Подключает метрики к engine (для async engine - к его sync_engine).
+    Время запроса - от отправки драйверу до получения результата
+    """
+    pool_collector.engines[name] = engine
+    duration = {op: QUERY_DURATION.labels(name, op) for op in OPERATIONS | {"OTHER"}}
+
+    # Отметка хранится в контексте выполнения: он свой у каждого запроса
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def observe(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_started
+        duration[operation(statement)].observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def count_error(context):
+        QUERY_ERRORS.labels(name, operation(context.statement or "")).inc()
@@ -0,0 +1,110 @@
+"""
+Запросы к заметкам одного пользователя: фильтр по владельцу применяется
+в каждом запросе, поэтому маршрут не может случайно прочитать чужие заметки
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.database import search as fulltext
+from app.database import sync
+from app.database import tags as tag_queries
+from app.database.pagination import DEFAULT_PAGE_SIZE, Page, paginate
+from app.models.note import Note
+
+
+def _note_key(row) -> Tuple[datetime, int]:
+    return row.Note.created_at, row.Note.id
+
+
+def _version_key(row) -> Tuple[datetime, int]:
+    return row.created_at, row.id
+
+
+class UserNotes:
+    """
+    Заметки пользователя user_id. Страницы списка читаются по индексу
+    (user_id, created_at, id, updated_at): стоимость не зависит от числа
+    заметок других пользователей
+    """
+
+    def __init__(self, db: AsyncSession, user_id: int):
+        self.db = db
+        self.user_id = user_id
+
+    def select(self, *entities) -> Select:
+        """SELECT по заметкам пользователя; без аргументов - сами заметки"""
+        return select(*(entities or (Note,))).where(Note.user_id == self.user_id)
+
+    def new(self, title: str, body: str) -> Note:
+        return Note(title=title, body=body, user_id=self.user_id, tags=[])
+
+    async def get(self, note_id: int) -> Optional[Note]:
+        query = self.select().where(Note.id == note_id).options(selectinload(Note.tags))
+        return await self.db.scalar(query)
+
+    async def updated_at(self, note_id: int) -> Optional[Tuple[datetime]]:
+        """Время изменения заметки (строка) или None, если заметки нет"""
+        result = await self.db.execute(
+            self.select(Note.updated_at).where(Note.id == note_id)
+        )
+        return result.one_or_none()
+
+    async def existing_ids(self, ids: Sequence[int]) -> Set[int]:
+        """Одним запросом определяет, какие из заметок существуют"""
+        if not ids:
+            return set()
+        return set(await self.db.scalars(self.select(Note.id).where(Note.id.in_(ids))))
+
+    async def page(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        versions_only: bool = False,
+        tags: Sequence[str] = (),
+        match: str = tag_queries.MATCH_ALL,
+    ) -> Page:
+        """
+        Страница заметок от новых к старым по ключу (created_at, id).
+        versions_only: только id, created_at и updated_at, без тел заметок.
+        tags/match: только заметки со всеми (all) или любым (any) из тегов.
+        ValueError - поврежденный курсор
+        """
+        if versions_only:
+            query = self.select(Note.id, Note.created_at, Note.updated_at)
+            row_key = _version_key
+        else:
+            query = self.select().options(selectinload(Note.tags))
+            row_key = _note_key
+        if tags:
+            query = query.where(
+                Note.id.in_(tag_queries.tagged_note_ids(self.user_id, tags, match))
+            )
+        return await paginate(
+            self.db,
+            query,
+            key_columns=(Note.created_at, Note.id),
+            row_key=row_key,
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+        )
+
+    async def search(
+        self, search: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Page:
+        return await fulltext.search_notes(
+            self.db, search, self.user_id, cursor=cursor, limit=limit
+        )
+
+    async def changes(
+        self, since: Optional[sync.SyncKey], limit: int, settle: timedelta
+    ) -> sync.ChangeSet:
+        return await sync.fetch_changes(self.db, self.user_id, since, limit, settle)
+
+    async def record_deletions(self, note_ids: Sequence[int]) -> None:
+        await sync.record_deletions(self.db, self.user_id, note_ids)
@@ -0,0 +1,122 @@
+"""
+Keyset (cursor) пагинация: стоимость страницы не зависит от ее номера
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEXT = "next"
+PREV = "prev"
+
+
+@dataclass
+class Page:
+    """Страница результатов и курсоры соседних страниц"""
+
+    rows: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {"dt"}:
+        return datetime.fromisoformat(value["dt"])
+    if value is None or isinstance(value, dict) or isinstance(value, list):
+        raise ValueError("Invalid cursor value")
+    return value
+
+
+def encode_cursor(key: Sequence[Any], direction: str = NEXT) -> str:
+    """Кодирует ключ сортировки в непрозрачный курсор"""
+    payload = {"k": [_encode_value(v) for v in key], "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, key_size: int) -> Tuple[Tuple[Any, ...], str]:
+    """
+    Декодирует курсор. Любой поврежденный или чужой курсор -> ValueError
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(_decode_value(v) for v in payload["k"])
+        direction = payload["d"]
+    except (
+        binascii.Error,
+        UnicodeDecodeError,
+        json.JSONDecodeError,
+        KeyError,
+        TypeError,
+        ValueError,
+    ):
+        raise ValueError("Invalid cursor")
+
+    if len(key) != key_size or direction not in (NEXT, PREV):
+        raise ValueError("Invalid cursor")
+    return key, direction
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    key_columns: Sequence[Any],
+    row_key: Callable[[Any], Sequence[Any]],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+) -> Page:
+    """
+    Выполняет запрос страницы по ключу key_columns.
+
+    Вместо OFFSET используется условие (k1, k2) > (:v1, :v2), поэтому
+    глубокие страницы читаются по индексу так же быстро, как первая.
+    """
+    key = None
+    direction = NEXT
+    if cursor:
+        key, direction = decode_cursor(cursor, len(key_columns))
+
+    backwards = direction == PREV
+    # При движении назад читаем в обратном порядке и разворачиваем результат
+    desc = descending != backwards
+
+    if key is not None:
+        columns = tuple_(*key_columns)
+        query = query.where(columns < tuple_(*key) if desc else columns > tuple_(*key))
+
+    order = [c.desc() if desc else c.asc() for c in key_columns]
+    rows = (await db.execute(query.order_by(*order).limit(limit + 1))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows=[], next_cursor=None, prev_cursor=None)
+
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else key is not None
+
+    return Page(
+        rows=rows,
+        next_cursor=encode_cursor(row_key(rows[-1]), NEXT) if has_next else None,
+        prev_cursor=encode_cursor(row_key(rows[0]), PREV) if has_prev else None,
+    )
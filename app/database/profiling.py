@@ -0,0 +1,125 @@
+"""
+Профилирование SQL: число и время запросов за HTTP запрос, журнал
+медленных запросов с планом выполнения, предупреждение о подозрении на N+1
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.env import env_bool
+
+logger = logging.getLogger(__name__)
+
+# Запрос дольше порога попадает в журнал вместе с планом (0 - выключено)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_SLOW_QUERY_EXPLAIN = env_bool("DB_SLOW_QUERY_EXPLAIN", True)
+# Больше запросов за один HTTP запрос - вероятно N+1 (0 - выключено)
+DB_QUERY_COUNT_WARN = int(os.getenv("DB_QUERY_COUNT_WARN", "50"))
+
+
+@dataclass
+class QueryStats:
+    """Запросы к БД, выполненные при обработке одного HTTP запроса"""
+
+    label: str = ""
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def start_request(label: str):
+    """Начинает сбор статистики; возвращает токен для finish_request"""
+    stats = QueryStats(label=label)
+    return stats, _current_stats.set(stats)
+
+
+def finish_request(stats: QueryStats, token) -> None:
+    _current_stats.reset(token)
+    if DB_QUERY_COUNT_WARN and stats.count > DB_QUERY_COUNT_WARN:
+        statement, repeats = stats.statements.most_common(1)[0]
+        logger.warning(
+            "%s issued %d queries (%.1f ms); most repeated (%d times): %s",
+            stats.label,
+            stats.count,
+            stats.duration * 1000,
+            repeats,
+            statement,
+        )
+    elif stats.count:
+        logger.debug(
+            "%s issued %d queries (%.1f ms)",
+            stats.label,
+            stats.count,
+            stats.duration * 1000,
+        )
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """
+    План запроса через отдельный DBAPI курсор того же соединения:
+    EXPLAIN QUERY PLAN в SQLite, EXPLAIN в PostgreSQL
+    """
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def log_slow_query(conn, statement: str, parameters, executemany: bool, elapsed):
+    stats = current_stats()
+    plan: List[str] = []
+    if DB_SLOW_QUERY_EXPLAIN and not executemany:
+        try:
+            plan = explain(conn, statement, parameters)
+        except Exception:
+            logger.debug("Could not explain slow query", exc_info=True)
+    # Параметры не логируются: в них пользовательские данные
+    logger.warning(
+        "Slow query %.1f ms%s: %s%s",
+        elapsed * 1000,
+        f" in {stats.label}" if stats else "",
+        " ".join(statement.split()),
+        "".join(f"\n  plan: {step}" for step in plan),
+    )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает профилирование к engine (для async engine - к sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context.profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.profile_started
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if DB_SLOW_QUERY_MS and elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            log_slow_query(conn, statement, parameters, executemany, elapsed)
@@ -0,0 +1,184 @@
+"""
+Полнотекстовый поиск по заметкам на базе SQLite FTS5
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from sqlalchemy import Select, column, func, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.pagination import DEFAULT_PAGE_SIZE, Page, paginate
+from app.models.note import Note
+
+# Маркеры подсветки совпадений в сниппете (без HTML, чтобы не открывать XSS)
+SNIPPET_START = "["
+SNIPPET_END = "]"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 12
+
+# Ограничиваем число термов, чтобы запрос не превращался в DoS
+MAX_SEARCH_TERMS = 16
+
+# External-content FTS5 таблица: хранит только индекс, текст берется из notes.
+# В рабочих базах ее создает миграция 0004 с той же DDL
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+        title, body,
+        content='notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE OF title, body ON notes
+    BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+notes_fts = table("notes_fts", column("rowid"), column("rank"))
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchQuery:
+    """Запрос поиска и ключ сортировки для keyset пагинации"""
+
+    query: Select
+    key_columns: Tuple[Any, ...]
+    row_key: Callable[[Any], Tuple[Any, ...]]
+
+
+def include_in_migrations(obj, name, type_, reflected, compare_to) -> bool:
+    """
+    Фильтр autogenerate Alembic: FTS5 таблиц нет в метаданных моделей
+    (их создает миграция 0004), и новая ревизия не должна их удалять
+    """
+    return not (type_ == "table" and name.startswith("notes_fts"))
+
+
+def fulltext_supported(engine: Engine) -> bool:
+    """FTS5 индекс поддерживается только для SQLite"""
+    return engine.dialect.name == "sqlite"
+
+
+def setup_fulltext(engine: Engine) -> None:
+    """
+    Создает FTS5 индекс и триггеры синхронизации с таблицей notes для
+    схемы из Base.metadata.create_all (тесты). При первом создании индекс
+    заполняется существующими заметками.
+    """
+    if not fulltext_supported(engine):
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+            )
+        ).first()
+        for statement in FTS_DDL:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            conn.exec_driver_sql("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Преобразует пользовательский ввод в безопасное FTS5 выражение.
+
+    Каждый терм экранируется как строка и получает префиксный поиск,
+    поэтому операторы FTS5 (NEAR, OR, кавычки, *) из ввода не интерпретируются.
+    """
+    terms = _TERM_RE.findall(search)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_query(bind: Engine, search: str, user_id: int) -> Optional[SearchQuery]:
+    """
+    Строит ранжированный (bm25) запрос поиска со сниппетами по заметкам
+    пользователя. Строки результата: (Note, rank, snippet).
+    None - если искать нечего.
+    """
+    if not fulltext_supported(bind):
+        return _like_query(search, user_id)
+
+    match = build_match_query(search)
+    if match is None:
+        return None
+
+    snippet = func.snippet(
+        literal_column("notes_fts"),
+        -1,
+        SNIPPET_START,
+        SNIPPET_END,
+        SNIPPET_ELLIPSIS,
+        SNIPPET_TOKENS,
+    )
+    query = (
+        select(Note, notes_fts.c.rank, snippet.label("snippet"))
+        .join(notes_fts, notes_fts.c.rowid == Note.id)
+        .where(literal_column("notes_fts").op("MATCH")(match))
+        .where(Note.user_id == user_id)
+    )
+    return SearchQuery(
+        query=query,
+        key_columns=(notes_fts.c.rank, Note.id),
+        row_key=lambda row: (row.rank, row.Note.id),
+    )
+
+
+async def search_notes(
+    db: AsyncSession,
+    search: str,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """Страница результатов поиска по заметкам user_id в порядке релевантности"""
+    search_q = search_query(db.get_bind(), search, user_id)
+    if search_q is None:
+        return Page(rows=[], next_cursor=None, prev_cursor=None)
+    return await paginate(
+        db,
+        search_q.query,
+        search_q.key_columns,
+        search_q.row_key,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+def _like_query(search: str, user_id: int) -> SearchQuery:
+    """Запасной вариант для СУБД без FTS5"""
+    query = select(
+        Note, literal_column("0.0").label("rank"), Note.body.label("snippet")
+    ).where(
+        Note.user_id == user_id,
+        Note.title.icontains(search) | Note.body.icontains(search),
+    )
+    return SearchQuery(
+        query=query, key_columns=(Note.id,), row_key=lambda row: (row.Note.id,)
+    )
@@ -0,0 +1,139 @@
+"""
+Выборка изменений заметок для инкрементальной синхронизации клиентов
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.database.pagination import decode_cursor, encode_cursor
+from app.models.note import Note, NoteTombstone
+
+SyncKey = Tuple[datetime, int]
+
+
+@dataclass
+class ChangeSet:
+    """Измененные заметки, id удаленных и токен следующей синхронизации"""
+
+    notes: List[Note] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+    sync_token: str = ""
+    has_more: bool = False
+
+
+def decode_sync_token(token: Optional[str]) -> Optional[SyncKey]:
+    """Токен - курсор по ключу (время изменения, id). ValueError - чужой токен"""
+    if not token:
+        return None
+    key, _ = decode_cursor(token, 2)
+    if not isinstance(key[0], datetime) or not isinstance(key[1], int):
+        raise ValueError("Invalid sync token")
+    return key
+
+
+async def record_deletions(
+    db: AsyncSession, user_id: int, note_ids: Iterable[int]
+) -> None:
+    """Сохраняет следы удаления в той же транзакции, что и DELETE"""
+    now = datetime.utcnow()
+    rows = [
+        {"note_id": note_id, "user_id": user_id, "deleted_at": now}
+        for note_id in note_ids
+    ]
+    if rows:
+        await db.execute(insert(NoteTombstone), rows)
+
+
+async def _changed_keys(
+    db: AsyncSession,
+    user_column,
+    time_column,
+    id_column,
+    user_id: int,
+    since: Optional[SyncKey],
+    limit: int,
+) -> List[SyncKey]:
+    """
+    Ключи изменений пользователя после since по индексу
+    (user_column, time_column, id_column)
+    """
+    query = select(time_column, id_column).where(user_column == user_id)
+    if since is not None:
+        query = query.where(tuple_(time_column, id_column) > tuple_(*since))
+    query = query.order_by(time_column, id_column).limit(limit)
+    return [tuple(row) for row in await db.execute(query)]
+
+
+async def fetch_changes(
+    db: AsyncSession,
+    user_id: int,
+    since: Optional[SyncKey],
+    limit: int,
+    settle: timedelta,
+) -> ChangeSet:
+    """
+    Изменения заметок user_id после since в порядке времени: обновленные и созданные
+    заметки из notes, удаленные - из note_tombstones.
+
+    Время изменения выставляется до commit, поэтому транзакция может
+    зафиксировать запись со временем раньше уже выданного токена. Когда
+    все изменения выбраны, токен не заходит дальше чем now - settle:
+    изменения последних секунд придут повторно, но не будут пропущены.
+    Клиент применяет их идемпотентно (upsert/delete по id)
+    """
+    updated = await _changed_keys(
+        db, Note.user_id, Note.updated_at, Note.id, user_id, since, limit + 1
+    )
+    deleted = await _changed_keys(
+        db,
+        NoteTombstone.user_id,
+        NoteTombstone.deleted_at,
+        NoteTombstone.note_id,
+        user_id,
+        since,
+        limit + 1,
+    )
+    events: List[Tuple[SyncKey, bool]] = list(
+        heapq.merge(
+            ((key, False) for key in updated),
+            ((key, True) for key in deleted),
+            key=lambda event: event[0],
+        )
+    )[: limit + 1]
+
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    # Для каждого id важно только последнее событие на странице
+    latest: Dict[int, bool] = {}
+    for (_, note_id), is_deleted in events:
+        latest.pop(note_id, None)
+        latest[note_id] = is_deleted
+
+    changed_ids = [note_id for note_id, is_deleted in latest.items() if not is_deleted]
+    notes: List[Note] = []
+    if changed_ids:
+        query = (
+            select(Note)
+            .where(Note.user_id == user_id, Note.id.in_(changed_ids))
+            .options(selectinload(Note.tags))
+        )
+        notes = list(await db.scalars(query))
+        notes.sort(key=lambda note: (note.updated_at, note.id))
+
+    horizon: SyncKey = (datetime.utcnow() - settle, 0)
+    last = events[-1][0] if events else since or horizon
+    token_key = last if has_more else min(last, horizon)
+
+    return ChangeSet(
+        notes=notes,
+        deleted=[note_id for note_id, is_deleted in latest.items() if is_deleted],
+        sync_token=encode_cursor(token_key),
+        has_more=has_more,
+    )
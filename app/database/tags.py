@@ -0,0 +1,112 @@
+"""
+Теги заметок: фильтрация по тегам, счетчики использования и связи note_tags
+"""
+
+from datetime import datetime
+from typing import List, Sequence
+
+from sqlalchemy import Select, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.note import Note, NoteTag, Tag
+
+MATCH_ALL = "all"
+MATCH_ANY = "any"
+
+
+def tagged_note_ids(user_id: int, names: Sequence[str], match: str) -> Select:
+    """
+    Подзапрос id заметок с тегами names: all - со всеми, any - хотя бы с одним.
+    Теги находятся по уникальному индексу (user_id, name), заметки - по
+    индексу note_tags(tag_id, note_id)
+    """
+    names = sorted(set(names))
+    query = (
+        select(NoteTag.note_id)
+        .join(Tag, Tag.id == NoteTag.tag_id)
+        .where(Tag.user_id == user_id, Tag.name.in_(names))
+    )
+    if match == MATCH_ALL and len(names) > 1:
+        query = query.group_by(NoteTag.note_id).having(
+            func.count(NoteTag.tag_id) == len(names)
+        )
+    return query
+
+
+async def tag_usage(db: AsyncSession, user_id: int) -> list:
+    """
+    Теги пользователя с числом заметок. Счетчик - коррелированный
+    подзапрос: для каждого тега пользователя читается только его диапазон
+    индекса note_tags(tag_id, note_id), связи других пользователей не
+    затрагиваются
+    """
+    note_count = (
+        select(func.count())
+        .where(NoteTag.tag_id == Tag.id)
+        .correlate(Tag)
+        .scalar_subquery()
+    )
+    query = (
+        select(Tag, note_count.label("note_count"))
+        .where(Tag.user_id == user_id)
+        .order_by(Tag.name)
+    )
+    return (await db.execute(query)).all()
+
+
+async def touch_notes(db: AsyncSession, note_ids) -> List[int]:
+    """
+    Обновляет updated_at заметок (список id или подзапрос): теги входят в
+    представление заметки, поэтому меняются ETag и заметка попадает в
+    /notes/changes. Возвращает id измененных заметок для инвалидации кэша
+    """
+    result = await db.execute(
+        update(Note)
+        .where(Note.id.in_(note_ids))
+        .values(updated_at=datetime.utcnow())
+        .returning(Note.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+async def attach_tag(db: AsyncSession, note_id: int, tag_id: int) -> bool:
+    """Привязывает тег к заметке. False - тег уже был привязан"""
+    if await db.get(NoteTag, (note_id, tag_id)) is not None:
+        return False
+    try:
+        await db.execute(insert(NoteTag).values(note_id=note_id, tag_id=tag_id))
+        await touch_notes(db, [note_id])
+        await db.commit()
+    except IntegrityError:
+        # Параллельный запрос успел привязать тот же тег
+        await db.rollback()
+        return False
+    return True
+
+
+async def detach_tag(db: AsyncSession, note_id: int, tag_id: int) -> bool:
+    """Отвязывает тег от заметки. False - тег не был привязан"""
+    result = await db.execute(
+        delete(NoteTag).where(NoteTag.note_id == note_id, NoteTag.tag_id == tag_id)
+    )
+    if not result.rowcount:
+        await db.rollback()
+        return False
+    await touch_notes(db, [note_id])
+    await db.commit()
+    return True
+
+
+def notes_with_tag(tag_id: int) -> Select:
+    return select(NoteTag.note_id).where(NoteTag.tag_id == tag_id)
+
+
+async def delete_tag_links(db: AsyncSession, tag_id: int) -> None:
+    await db.execute(delete(NoteTag).where(NoteTag.tag_id == tag_id))
+
+
+async def delete_note_links(db: AsyncSession, note_ids: Sequence[int]) -> None:
+    """Связи удаляемых заметок (для DELETE в обход ORM)"""
+    await db.execute(delete(NoteTag).where(NoteTag.note_id.in_(note_ids)))
@@ -1,12 +1,14 @@
 import logging
 import re
+import string
 from typing import Any, Dict, Optional, Union
-from uuid import uuid4
 
 from fastapi import HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
+from app.middleware.request_id import correlation_id
+
 # Настраиваем безопасный логгер
 security_logger = logging.getLogger("security")
 logger = logging.getLogger(__name__)
@@ -31,47 +33,111 @@ class ProblemDetailException(HTTPException):
         self.additional_data = additional_data or {}
 
 
+# Все правила маскирования - одно регулярное выражение, строка
+# просматривается за один проход. Каждая альтернатива начинается с
+# литерала (@, ", имя секрета, цифра): тогда re пропускает позиции с другими
+# символами без попытки сопоставления. Поэтому правило номера карты
+# развернуто по первой цифре, а вид совпадения определяется в _redact по
+# первому символу; там же проверяются границы слов
+_SECRET_MARKERS = {
+    "password": "[PASSWORD_REDACTED]",
+    "api_key": "[API_KEY_REDACTED]",
+    "token": "[TOKEN_REDACTED]",
+}
+_SENSITIVE_PATTERN = re.compile(
+    "|".join(
+        [
+            r"@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+            rf'"(?:{"|".join(_SECRET_MARKERS)})":\s*"[^"]*"',
+            *(rf"{name}=[^&#\s]*" for name in _SECRET_MARKERS),
+            *(
+                rf"{digit}\d{{3}}[- ]?\d{{4}}[- ]?\d{{4}}[- ]?\d{{4}}\b"
+                for digit in "0123456789"
+            ),
+        ]
+    )
+)
+
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+
+# Длиннее в журнал не пишется: иначе запрос с длинным URL стоит
+# маскирования десятков килобайт
+MAX_MASKED_LENGTH = 512
+
+
+def _truncate(text: str) -> str:
+    text = text[:MAX_MASKED_LENGTH]
+    # Обрезанный на середине email или секрет не распознается правилами,
+    # поэтому отбрасывается и последний неполный фрагмент
+    cut = max(text.rfind(separator) for separator in "&/?; ")
+    return text[: cut + 1] + "[TRUNCATED]"
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _redact(text: str) -> str:
+    parts = []
+    last = 0
+    for match in _SENSITIVE_PATTERN.finditer(text):
+        start, end = match.span()
+        first = text[start]
+        if first == "@":
+            # Локальная часть email - перед @, не раньше предыдущей замены
+            local = start
+            while local > last and text[local - 1] in _EMAIL_LOCAL_CHARS:
+                local -= 1
+            if local == start:
+                continue
+            parts += (text[last:local], "[EMAIL_REDACTED]")
+        elif first == '"':
+            name_end = text.index('"', start + 1)
+            value_start = text.index('"', name_end + 1) + 1
+            name = text[start + 1 : name_end]
+            parts += (text[last:value_start], _SECRET_MARKERS[name], '"')
+        elif first.isdigit():
+            if start and _is_word_char(text[start - 1]):
+                continue
+            parts += (text[last:start], "[CARD_REDACTED]")
+        else:
+            name = match.group().partition("=")[0]
+            parts += (text[last:start], name, "=", _SECRET_MARKERS[name])
+        last = end
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
+
 def mask_sensitive_data(data: Union[str, Dict, Any]) -> str:
     """
-    Маскирует чувствительные данные в логах
+    Маскирует чувствительные данные в логах: email, номера карт, значения
+    password/api_key/token в JSON и в параметрах URL
     """
-    if isinstance(data, dict):
-        data_str = str(data)
-    else:
-        data_str = str(data)
-
-    # Маскируем email
-    data_str = re.sub(
-        r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
-        "[EMAIL_REDACTED]",
-        data_str,
-    )
-
-    # Маскируем пароли (простые эвристики)
-    data_str = re.sub(
-        r'("password":\s*")[^"]*(")', r"\1[PASSWORD_REDACTED]\2", data_str
-    )
-    data_str = re.sub(r'("api_key":\s*")[^"]*(")', r"\1[API_KEY_REDACTED]\2", data_str)
-    data_str = re.sub(r'("token":\s*")[^"]*(")', r"\1[TOKEN_REDACTED]\2", data_str)
+    text = str(data)
+    if len(text) > MAX_MASKED_LENGTH:
+        text = _truncate(text)
+    return _redact(text)
 
-    # Маскируем кредитные карты (упрощенно)
-    data_str = re.sub(
-        r"\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b", "[CARD_REDACTED]", data_str
-    )
 
-    return data_str
+def request_target(request: Request) -> str:
+    """Путь и строка запроса без построения объекта URL"""
+    query = request.scope.get("query_string")
+    path = request.scope["path"]
+    return f"{path}?{query.decode('latin-1')}" if query else path
 
 
 def problem_detail_handler(request: Request, exc: ProblemDetailException):
     """Обработчик для ProblemDetailException"""
-    correlation_id = str(uuid4())
+    request_id = correlation_id()
 
     problem_data = {
         "type": exc.error_type,
         "title": exc.title,
         "status": exc.status_code,
         "detail": exc.detail,
-        "correlation_id": correlation_id,
+        "correlation_id": request_id,
     }
 
     # Добавляем дополнительные данные если есть
@@ -80,15 +146,19 @@ def problem_detail_handler(request: Request, exc: ProblemDetailException):
 
     headers = {"Content-Type": "application/problem+json", **exc.extra_headers}
 
-    # Безопасное логирование без PII
-    safe_path = mask_sensitive_data(str(request.url))
-    security_logger.warning(
-        "ProblemDetailException: %s %s - %s - %s",
-        exc.status_code,
-        exc.title,
-        correlation_id,
-        safe_path,
-    )
+    # Безопасное логирование без PII; маскирование - только если запись
+    # действительно попадет в журнал
+    if security_logger.isEnabledFor(logging.WARNING):
+        security_logger.warning(
+            "ProblemDetailException: %s %s",
+            exc.status_code,
+            exc.title,
+            extra={
+                "status": exc.status_code,
+                "correlation_id": request_id,
+                "path": mask_sensitive_data(request_target(request)),
+            },
+        )
 
     return JSONResponse(
         status_code=exc.status_code,
@@ -99,7 +169,7 @@ def problem_detail_handler(request: Request, exc: ProblemDetailException):
 
 def http_exception_handler(request: Request, exc: HTTPException):
     """Обработчик для стандартных HTTPException"""
-    correlation_id = str(uuid4())
+    request_id = correlation_id()
 
     # Нормализуем детали ошибки
     if isinstance(exc.detail, dict):
@@ -112,7 +182,7 @@ def http_exception_handler(request: Request, exc: HTTPException):
         "title": "HTTP Error",
         "status": exc.status_code,
         "detail": detail,
-        "correlation_id": correlation_id,
+        "correlation_id": request_id,
     }
 
     headers = {
@@ -120,10 +190,17 @@ def http_exception_handler(request: Request, exc: HTTPException):
     }
 
     # Безопасное логирование
-    safe_detail = mask_sensitive_data(detail)
-    security_logger.warning(
-        "HTTPException: %s - %s - %s", exc.status_code, correlation_id, safe_detail
-    )
+    if security_logger.isEnabledFor(logging.WARNING):
+        security_logger.warning(
+            "HTTPException: %s - %s",
+            exc.status_code,
+            mask_sensitive_data(detail),
+            extra={
+                "status": exc.status_code,
+                "correlation_id": request_id,
+                "path": mask_sensitive_data(request_target(request)),
+            },
+        )
 
     return JSONResponse(
         status_code=exc.status_code,
@@ -134,12 +211,16 @@ def http_exception_handler(request: Request, exc: HTTPException):
 
 async def generic_exception_handler(request: Request, exc: Exception):
     """Обработчик неожиданных исключений"""
-    from uuid import uuid4
-
-    correlation_id = str(uuid4())
-    # Временная замена logger на print для отладки
-    print(
-        f"Unhandled exception: {type(exc).__name__} - {correlation_id} - {request.url}"
+    request_id = correlation_id()
+    logger.error(
+        "Unhandled exception: %s",
+        type(exc).__name__,
+        exc_info=exc,
+        extra={
+            "status": 500,
+            "correlation_id": request_id,
+            "path": mask_sensitive_data(request_target(request)),
+        },
     )
 
     return JSONResponse(
@@ -149,7 +230,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
             "title": "Internal Server Error",
             "status": 500,
             "detail": "An internal server error occurred.",
-            "correlation_id": correlation_id,
+            "correlation_id": request_id,
         },
         media_type="application/problem+json",
     )
@@ -157,8 +238,6 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Обработчик ошибок валидации в формате RFC 7807"""
-    from uuid import uuid4
-
     errors = exc.errors()
     error_details = []
 
@@ -175,7 +254,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "title": "Validation Error",
             "status": 422,
             "detail": detail,
-            "correlation_id": str(uuid4()),
+            "correlation_id": correlation_id(),
         },
         media_type="application/problem+json",
     )
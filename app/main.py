@@ -1,9 +1,11 @@
+import os
+from contextlib import asynccontextmanager
 from decimal import Decimal
 
 from fastapi import FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
 
-from app.database.database import create_tables
+from app.database import database, metrics, profiling
 
 # Импортируем наши обработчики ошибок
 from app.errors import (
@@ -13,17 +15,62 @@ from app.errors import (
     problem_detail_handler,
     validation_exception_handler,
 )
+from app.middleware import rate_limiter
+from app.middleware.metrics import MetricsMiddleware, metrics_response
+from app.middleware.query_profiling import QueryProfilingMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
 from app.routes import demo, files, notes, tags
 from app.schemas.item import ItemCreate
+from app.utils.env import env_bool, env_int
+from app.utils.file_security import MAX_FILE_SIZE
+from app.utils.structured_logging import JsonLogging
+
+# Лимит запросов к API с одного адреса (ADR-003); пустое значение отключает.
+# Для нескольких воркеров: RATE_LIMIT_URL=redis://... (нужен пакет redis)
+RATE_LIMIT = os.getenv("RATE_LIMIT", "600/minute")
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")
+RATE_LIMIT_MAX_KEYS = env_int("RATE_LIMIT_MAX_KEYS", 100000)
+
+# Метрики Prometheus на /metrics (METRICS_ENABLED=false отключает)
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# Заголовок Server-Timing с числом и временем SQL запросов (для отладки и
+# нагрузочных тестов; раскрывает внутренние тайминги)
+SERVER_TIMING_ENABLED = env_bool("SERVER_TIMING_ENABLED", False)
+
+# Журнал приложения: json - JSON через очередь и отдельный поток,
+# text - стандартная настройка logging без изменений
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+LOG_QUEUE_SIZE = env_int("LOG_QUEUE_SIZE", 10000)
+
+# Применяем миграции схемы при запуске (отключается DB_AUTO_MIGRATE=false)
+if database.DB_AUTO_MIGRATE:
+    database.migrate_database()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    json_logging = None
+    if LOG_FORMAT == "json":
+        json_logging = JsonLogging(LOG_LEVEL, LOG_QUEUE_SIZE)
+        json_logging.start()
+    # Задачи миниатюр, не завершенные до перезапуска, выполняются снова
+    files.thumbnail_worker.recover()
+    yield
+    files.thumbnail_worker.shutdown()
+    files.upload_pool.shutdown()
+    if json_logging is not None:
+        json_logging.shutdown()
 
-# Создаем таблицы при запуске
-create_tables()
 
 app = FastAPI(
     title="SecDev Course App",
     version="0.1.0",
     docs_url="/docs",
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 # Регистрируем обработчики ошибок
@@ -32,6 +79,45 @@ app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(Exception, generic_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
+# Отклоняем заведомо большие загрузки до чтения тела запроса
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefix="/api/v1/files/upload",
+    max_body_size=MAX_FILE_SIZE,
+)
+
+# Число и время SQL запросов за запрос, журнал медленных запросов
+profiling.instrument_engine(database.engine)
+profiling.instrument_engine(database.async_engine.sync_engine)
+app.add_middleware(QueryProfilingMiddleware, server_timing=SERVER_TIMING_ENABLED)
+
+# Снаружи остальных middleware: лишние запросы отклоняются до всей
+# остальной обработки
+if RATE_LIMIT:
+    app.add_middleware(
+        rate_limiter.RateLimitMiddleware,
+        backend=rate_limiter.build_rate_limit_backend(
+            RATE_LIMIT_URL, RATE_LIMIT_MAX_KEYS
+        ),
+        rules=[rate_limiter.RateLimitRule.parse("/api/", RATE_LIMIT)],
+    )
+
+# Снаружи лимитов: учитываются и ответы 429/413 других middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    metrics.instrument_engine(database.engine, "sync")
+    metrics.instrument_engine(database.async_engine.sync_engine, "async")
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return metrics_response()
+
+
+# X-Request-ID снаружи всех слоев: идентификатор есть у любого ответа и
+# у записей журнала, сделанных при обработке запроса
+app.add_middleware(RequestIdMiddleware)
+
+
 # Подключаем Study Notes роутеры
 app.include_router(notes.router, prefix="/api/v1", tags=["study-notes"])
 app.include_router(tags.router, prefix="/api/v1", tags=["study-notes-tags"])
@@ -0,0 +1,156 @@
+"""
+Метрики Prometheus по HTTP запросам: число, длительность, размер ответа,
+запросы в обработке и ошибки по кодам ErrorCode. Отдаются на /metrics
+"""
+
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Метка route - шаблон пути (/api/v1/notes/{note_id}), а не сам путь:
+# число временных рядов не растет с числом заметок и случайных URL
+UNMATCHED_ROUTE = "<unmatched>"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency including the response body",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method"]
+)
+ERRORS = Counter(
+    "http_errors_total", "HTTP error responses by error code", ["route", "code"]
+)
+
+# Коды ErrorCode (app/errors/error_codes.py) по статусу ответа. Ответы
+# middleware (413, 429) не проходят через обработчики ошибок, поэтому код
+# определяется по статусу, а не в обработчиках
+ERROR_CODES = {
+    401: "AUTHENTICATION_ERROR",
+    403: "AUTHORIZATION_ERROR",
+    404: "NOT_FOUND_ERROR",
+    429: "RATE_LIMIT_ERROR",
+    502: "EXTERNAL_SERVICE_ERROR",
+    504: "EXTERNAL_SERVICE_ERROR",
+}
+
+
+def error_code(status: int) -> str:
+    """Остальные 4xx - некорректный запрос, остальные 5xx - внутренняя ошибка"""
+    code = ERROR_CODES.get(status)
+    if code is not None:
+        return code
+    return "INTERNAL_ERROR" if status >= 500 else "VALIDATION_ERROR"
+
+
+def route_label(scope: Scope) -> str:
+    """Шаблон пути маршрута; FastAPI кладет маршрут в scope при сопоставлении"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: без буферизации ответа и без задач на запрос.
+    Длительность включает отправку тела, в том числе потокового
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # labels() стоит несколько микросекунд (блокировка и проверка меток),
+        # поэтому серии метрик берутся из кэша; их число ограничено числом
+        # маршрутов, методов и статусов
+        self._series: Dict[Tuple[str, str, int], tuple] = {}
+        self._in_progress = {name: IN_PROGRESS.labels(name) for name in METHODS}
+        self._in_progress["OTHER"] = IN_PROGRESS.labels("OTHER")
+
+    def series(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = (
+                REQUESTS.labels(method, route, str(status)),
+                LATENCY.labels(method, route),
+                RESPONSE_SIZE.labels(method, route),
+                ERRORS.labels(route, error_code(status)) if status >= 400 else None,
+            )
+            self._series[key] = series
+        return series
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        # Если приложение упало до ответа, клиент получит 500
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = self._in_progress[method]
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration = time.perf_counter() - started
+            in_progress.dec()
+            requests, latency, response_size, errors = self.series(
+                method, route_label(scope), status
+            )
+            requests.inc()
+            latency.observe(duration)
+            response_size.observe(size)
+            if errors is not None:
+                errors.inc()
@@ -0,0 +1,54 @@
+"""
+Профилирование SQL по HTTP запросам и отладочный заголовок Server-Timing
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import profiling
+
+
+def server_timing(stats: profiling.QueryStats, total: float) -> bytes:
+    """db - запросы к БД до начала ответа, app - вся обработка до ответа"""
+    return (
+        f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+        f"app;dur={total * 1000:.2f}"
+    ).encode()
+
+
+class QueryProfilingMiddleware:
+    """
+    Собирает число и время SQL запросов каждого HTTP запроса.
+    С server_timing=True добавляет их в заголовок Server-Timing (видно в
+    DevTools и в результатах нагрузочных тестов); в продакшене заголовок
+    выключен - он раскрывает внутренние тайминги
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = profiling.start_request(f"{scope['method']} {scope['path']}")
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = server_timing(stats, time.perf_counter() - started)
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", header),
+                ]
+            await send(message)
+
+        try:
+            await self.app(
+                scope, receive, send_with_timing if self.server_timing else send
+            )
+        finally:
+            profiling.finish_request(stats, token)
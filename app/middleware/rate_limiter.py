@@ -0,0 +1,310 @@
+"""
+Ограничение частоты запросов (ADR-003): отказ 429 до обработчика и
+обращения к БД, заголовки X-RateLimit-* в каждом ответе.
+
+Алгоритм - GCRA (generic cell rate algorithm), вариант скользящего окна:
+на ключ хранится одно число - теоретическое время прихода следующего
+запроса (TAT). Лимит "N запросов за period" допускает всплеск до N
+запросов, дальше запросы пропускаются с шагом period / N
+"""
+
+import heapq
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.request_id import correlation_id
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - redis опционален
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+# Допуск на погрешность сложения float: N-й запрос всплеска не отклоняется
+TOLERANCE = 1e-6
+
+
+def parse_rate(value: str) -> Tuple[int, float]:
+    """'5/minute' -> (5, 60.0). ValueError - неверный формат"""
+    try:
+        count, unit = value.strip().split("/")
+        limit, period = int(count), PERIODS[unit.strip().lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    if limit <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return limit, period
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Лимит для запросов, путь которых начинается с path_prefix"""
+
+    path_prefix: str
+    limit: int
+    period: float
+    methods: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def parse(
+        cls, path_prefix: str, rate: str, methods: Optional[Sequence[str]] = None
+    ) -> "RateLimitRule":
+        limit, period = parse_rate(rate)
+        return cls(
+            path_prefix,
+            limit,
+            period,
+            frozenset(method.upper() for method in methods) if methods else None,
+        )
+
+    # Интервал между запросами при равномерной нагрузке
+    interval: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "interval", self.period / self.limit)
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.path_prefix) and (
+            self.methods is None or method in self.methods
+        )
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Секунды до полного восстановления лимита
+    reset_after: float
+    # Секунды до первого разрешенного запроса (0 - если разрешен)
+    retry_after: float
+
+    @classmethod
+    def from_backlog(
+        cls, rule: RateLimitRule, allowed: bool, backlog: float
+    ) -> "RateLimitResult":
+        """
+        backlog - насколько TAT опережает текущее время: для разрешенного
+        запроса - с его учетом, для отклоненного - без него
+        """
+        if allowed:
+            remaining = int((rule.period - backlog) / rule.interval + 1e-9)
+            return cls(True, rule.limit, remaining, backlog, 0.0)
+        retry_after = backlog + rule.interval - rule.period
+        return cls(False, rule.limit, 0, backlog, retry_after)
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (b"x-ratelimit-limit", b"%d" % self.limit),
+            (b"x-ratelimit-remaining", b"%d" % self.remaining),
+            (b"x-ratelimit-reset", b"%d" % math.ceil(self.reset_after)),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", b"%d" % math.ceil(self.retry_after)))
+        return headers
+
+
+class MemoryRateLimitBackend:
+    """
+    GCRA в памяти процесса: один float на ключ. Ключ, чей TAT уже в
+    прошлом, ничем не отличается от отсутствующего, поэтому раз в
+    sweep_interval такие ключи удаляются без изменения поведения.
+    Сверх max_keys забываются ключи с наименьшим TAT, ближе всего к
+    восстановлению лимита: поток новых адресов не сбрасывает лимит
+    клиентам, которые уже упираются в него, а память остается ограниченной.
+
+    В пределах одного воркера проверка атомарна: в hit нет await
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._tats: Dict[str, float] = {}
+        self._next_sweep = clock() + sweep_interval
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        now = self._clock()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+        tat = self._tats.get(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + rule.interval
+        if new_tat - now > rule.period + TOLERANCE:
+            return RateLimitResult.from_backlog(rule, False, tat - now)
+        if key not in self._tats and len(self._tats) >= self.max_keys:
+            self._evict_least_indebted()
+        self._tats[key] = new_tat
+        return RateLimitResult.from_backlog(rule, True, new_tat - now)
+
+    def evict_idle(self, now: Optional[float] = None) -> None:
+        """Удаляет ключи с восстановившимся лимитом"""
+        now = self._clock() if now is None else now
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        self._next_sweep = now + self.sweep_interval
+
+    def _evict_least_indebted(self) -> None:
+        # Освобождаем сразу десятую часть, чтобы не вытеснять на каждом запросе
+        count = max(1, self.max_keys // 10)
+        for key in heapq.nsmallest(count, self._tats, key=self._tats.__getitem__):
+            del self._tats[key]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# TAT хранится в Redis и истекает вместе с backlog: простаивающие ключи
+# удаляет сам Redis. Время берется у Redis, чтобы воркеры с разными
+# часами считали одинаково
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2]) + tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > period then
+    return {0, tostring(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now)}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Общий лимит для нескольких воркеров uvicorn: GCRA выполняется одним
+    Lua скриптом, атомарно для всех процессов
+    """
+
+    def __init__(self, url: str, prefix: str = "studynotes:ratelimit:"):
+        if redis_asyncio is None:
+            raise RuntimeError(
+                "redis package is required for a redis:// rate limit URL"
+            )
+        self._client = redis_asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(GCRA_SCRIPT)
+        self.prefix = prefix
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        allowed, backlog = await self._script(
+            keys=[self.prefix + key], args=[rule.interval, rule.period, TOLERANCE]
+        )
+        return RateLimitResult.from_backlog(rule, bool(allowed), float(backlog))
+
+
+def build_rate_limit_backend(url: Optional[str], max_keys: int):
+    """memory (по умолчанию) или redis://host:6379/0"""
+    if not url or url == "memory":
+        return MemoryRateLimitBackend(max_keys=max_keys)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    raise ValueError(f"Unsupported rate limit URL: {url}")
+
+
+def client_address(scope: Scope) -> str:
+    """
+    Адрес клиента. За обратным прокси uvicorn нужно запускать с
+    --proxy-headers, иначе все запросы придут с адреса прокси
+    """
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware: отказ 429 не доходит до маршрутизации FastAPI.
+    Первое подходящее правило определяет лимит; запросы без правила не
+    ограничиваются. Если общий backend недоступен, запрос пропускается
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend,
+        rules: Sequence[RateLimitRule],
+        key_func: Callable[[Scope], str] = client_address,
+    ):
+        self.app = app
+        self.backend = backend
+        self.rules = list(rules)
+        self.key_func = key_func
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            result = await self.backend.hit(
+                f"{rule.path_prefix}|{self.key_func(scope)}", rule
+            )
+        except Exception:
+            logger.warning("Rate limit backend failed, request allowed", exc_info=True)
+            await self.app(scope, receive, send)
+            return
+
+        headers = result.headers()
+        if not result.allowed:
+            await self._reject(send, headers)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    @staticmethod
+    async def _reject(send: Send, headers: List[Tuple[bytes, bytes]]) -> None:
+        body = json.dumps(
+            {
+                "type": "/errors/rate-limited",
+                "title": "Too Many Requests",
+                "status": 429,
+                "detail": "Rate limit exceeded, retry later",
+                "correlation_id": correlation_id(),
+            }
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/problem+json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *headers,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,90 @@
+"""
+Идентификатор запроса: берется из входящего X-Request-ID (его ставит
+прокси или клиент) или генерируется, возвращается в заголовке ответа и
+служит correlation_id ошибок и полем request_id в журнале
+"""
+
+import os
+import re
+from contextvars import ContextVar
+from itertools import count
+from typing import Optional
+from uuid import uuid4
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HEADER = b"x-request-id"
+
+# Значение из заголовка попадает в журнал и в ответ: допускаются только
+# безопасные символы, иначе генерируется новый идентификатор
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+_current_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Идентификатор в формате UUID: случайный префикс процесса и счетчик.
+# uuid4() на каждый запрос читает os.urandom; здесь - одно сложение
+_prefix = ""
+_counter = count()
+
+
+def _reset_prefix() -> None:
+    global _prefix, _counter
+    _prefix = str(uuid4())[:23]
+    _counter = count()
+
+
+_reset_prefix()
+# Воркеры, созданные fork после импорта, не должны повторять идентификаторы
+os.register_at_fork(after_in_child=_reset_prefix)
+
+
+def new_request_id() -> str:
+    return f"{_prefix}-{next(_counter) & 0xFFFFFFFFFFFF:012x}"
+
+
+def current_request_id() -> Optional[str]:
+    return _current_request_id.get()
+
+
+def correlation_id() -> str:
+    """Идентификатор текущего запроса; вне RequestIdMiddleware - новый"""
+    return _current_request_id.get() or new_request_id()
+
+
+def incoming_request_id(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == HEADER:
+            request_id = value.decode("latin-1")
+            return request_id if VALID_REQUEST_ID.fullmatch(request_id) else None
+    return None
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware, самый внешний слой приложения: идентификатор
+    доступен и ответам других middleware (413, 429), и обработчикам ошибок.
+    Ответ 500 отправляет ServerErrorMiddleware Starlette снаружи этого слоя,
+    поэтому у него идентификатор есть только в теле (correlation_id)
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = incoming_request_id(scope) or new_request_id()
+        # Не сбрасывается после ответа: обработчик 500 выполняется уже
+        # снаружи middleware. Каждый запрос выполняется в своей задаче со
+        # своей копией контекста, поэтому значение не переходит к другому
+        _current_request_id.set(request_id)
+        header = (HEADER, request_id.encode("latin-1"))
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
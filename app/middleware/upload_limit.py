@@ -0,0 +1,108 @@
+"""
+Ранний отказ для слишком больших загрузок: по заголовку Content-Length,
+до того как Starlette начнет читать и разбирать multipart тело, а без
+него (Transfer-Encoding: chunked) - как только прочитанное тело превысит
+лимит
+"""
+
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.request_id import correlation_id
+
+# Запас на multipart заголовки и границы вокруг файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class RequestBodyTooLarge(Exception):
+    """Тело запроса превысило лимит; чтение прерывается"""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware: возвращает 413 без чтения тела запроса, если
+    Content-Length больше лимита, иначе считает байты тела и прерывает
+    чтение на первом сообщении сверх лимита. Ответ приложения на
+    прерванное тело (400 от разбора формы, 500) заменяется на 413
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str, max_body_size: int):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_body_size = max_body_size + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            content_length = self._content_length(scope)
+            if content_length is not None and content_length > self.max_body_size:
+                await self._reject(send)
+                return
+            await self._call_limited(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _call_limited(self, scope: Scope, receive: Receive, send: Send) -> None:
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def receive_limited() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    raise RequestBodyTooLarge()
+            return message
+
+        async def send_unless_exceeded(message: Message) -> None:
+            nonlocal response_started
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_limited, send_unless_exceeded)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+        if exceeded and not response_started:
+            await self._reject(send)
+
+    @staticmethod
+    def _content_length(scope: Scope):
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        body = json.dumps(
+            {
+                "type": "/errors/file-too-large",
+                "title": "File Too Large",
+                "status": 413,
+                "detail": "File exceeds maximum allowed size (5MB)",
+                "correlation_id": correlation_id(),
+            }
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/problem+json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+
+from app.models.note import Base
+
+
+class StoredFile(Base):
+    """Файл в content-addressed хранилище и число ссылок на него"""
+
+    __tablename__ = "stored_files"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(255), nullable=False)
+    content_type = Column(String(50), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    # Размеры изображения заполняет фоновая обработка
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class FileReference(Base):
+    """
+    Ссылки одного пользователя на файл. Их сумма равна StoredFile.ref_count;
+    удаление убирает только ссылку самого пользователя
+    """
+
+    __tablename__ = "file_references"
+
+    sha256 = Column(String(64), ForeignKey("stored_files.sha256"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=1)
+
+
+class ThumbnailJob(Base):
+    """
+    Задача генерации миниатюр. Хранится в БД, поэтому задачи, не
+    завершенные до перезапуска процесса, выполняются после старта
+    """
+
+    __tablename__ = "thumbnail_jobs"
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    sha256 = Column(String(64), ForeignKey("stored_files.sha256"), primary_key=True)
+    status = Column(String(16), nullable=False, default=PENDING, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -20,17 +20,61 @@ class Note(Base):
     user = relationship("User", back_populates="notes")
     tags = relationship("Tag", secondary="note_tags", back_populates="notes")
 
+    # Все запросы к заметкам идут в пределах пользователя, поэтому индексы
+    # начинаются с user_id (он же обслуживает внешний ключ)
+    __table_args__ = (
+        # Страница списка: ORDER BY created_at, id без сортировки; updated_at
+        # в индексе - ETag страницы считается без чтения строк таблицы
+        Index(
+            "ix_notes_user_id_created_at_id",
+            "user_id",
+            "created_at",
+            "id",
+            "updated_at",
+        ),
+        # Ключ выборки изменений для синхронизации (GET /notes/changes)
+        Index("ix_notes_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
+
+
+class NoteTombstone(Base):
+    """
+    След удаленной заметки: без него клиент синхронизации не узнает об
+    удалении. note_id не уникален - SQLite может повторно выдать id
+    """
+
+    __tablename__ = "note_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    note_id = Column(Integer, nullable=False)
+    # Без внешнего ключа: пользователь удаленной заметки тоже может быть удален
+    user_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_note_tombstones_user_id_deleted_at_note_id",
+            "user_id",
+            "deleted_at",
+            "note_id",
+        ),
+    )
+
 
 class Tag(Base):
     __tablename__ = "tags"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(50), nullable=False, unique=True)
+    name = Column(String(50), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     user = relationship("User", back_populates="tags")
     notes = relationship("Note", secondary="note_tags", back_populates="tags")
 
+    # Имена тегов уникальны в пределах пользователя; индекс же служит
+    # для поиска тега по имени при фильтрации заметок
+    __table_args__ = (Index("uq_tags_user_id_name", "user_id", "name", unique=True),)
+
 
 class NoteTag(Base):
     __tablename__ = "note_tags"
@@ -38,6 +82,10 @@ class NoteTag(Base):
     note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True)
     tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
 
+    # Первичный ключ (note_id, tag_id) отвечает на "теги заметки",
+    # обратный индекс - на "заметки с тегом" без сканирования таблицы
+    __table_args__ = (Index("ix_note_tags_tag_id_note_id", "tag_id", "note_id"),)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -1,9 +1,25 @@
+import os
+import re
+from email.utils import formatdate
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth import get_current_user_id
+from app.database.database import SessionLocal, get_async_db
+from app.database.files import acquire_file, release_file
 from app.errors import ProblemDetailException
-from app.utils.file_security import secure_save_file
+from app.models.file import StoredFile, ThumbnailJob
+from app.utils import file_security
+from app.utils.conditional import is_not_modified
+from app.utils.file_response import StoredFileResponse, requested_range
+from app.utils.io_pool import BoundedIOPool, PoolOverloadedError
+from app.utils.thumbnails import THUMBNAIL_SIZES, thumbnail_path
+from app.workers.thumbnails import ThumbnailWorker
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -11,26 +27,86 @@ router = APIRouter(prefix="/files", tags=["files"])
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Дисковые операции загрузки выполняются вне event loop в ограниченном пуле
+UPLOAD_IO_CONCURRENCY = int(os.getenv("UPLOAD_IO_CONCURRENCY", "4"))
+UPLOAD_QUEUE_LIMIT = int(os.getenv("UPLOAD_QUEUE_LIMIT", "32"))
+UPLOAD_RETRY_AFTER = 1
+
+upload_pool = BoundedIOPool(
+    max_workers=UPLOAD_IO_CONCURRENCY, max_pending=UPLOAD_QUEUE_LIMIT, name="upload"
+)
+
+# Миниатюры создаются в фоне после загрузки нового содержимого
+thumbnail_worker = ThumbnailWorker(SessionLocal, UPLOAD_DIR)
+
+# Имя сохраненного файла: SHA-256 содержимого и расширение
+STORED_NAME_RE = re.compile(r"^([0-9a-f]{64})\.(png|jpg)$")
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg"}
+
+# Содержимое адресуется хешем и не меняется, клиенты и CDN кэшируют его навсегда
+DOWNLOAD_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def file_not_found() -> ProblemDetailException:
+    return ProblemDetailException(
+        status_code=404,
+        title="Not Found",
+        detail="File not found",
+        error_type="/errors/not-found",
+    )
+
+
+def stat_stored_file(path: Path) -> os.stat_result:
+    """Проверка, что файл внутри UPLOAD_DIR, и его stat (блокирующие вызовы)"""
+    if not file_security.validate_file_path(UPLOAD_DIR, path):
+        raise FileNotFoundError(path)
+    return path.stat()
+
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
     """
     Endpoint для безопасной загрузки файлов
     """
     try:
-        # Читаем файл
-        file_data = await file.read()
-
-        # Сохраняем файл с безопасными проверками
-        saved_path = secure_save_file(UPLOAD_DIR, file_data, file.filename)
+        # Сохраняем файл потоково, chunk за chunk, с безопасными проверками.
+        # Проверка пути, симлинков и запись выполняются в пуле потоков
+        saved = await upload_pool.run(
+            file_security.secure_save_stream, UPLOAD_DIR, file.file, file.filename
+        )
+        ref_count = await acquire_file(db, saved, UPLOAD_DIR, user_id)
+        if not await upload_pool.run(saved.path.exists):
+            # Последняя ссылка на это содержимое была удалена между
+            # сохранением и acquire_file: записываем файл заново
+            await file.seek(0)
+            saved = await upload_pool.run(
+                file_security.secure_save_stream, UPLOAD_DIR, file.file, file.filename
+            )
+        if ref_count == 1:
+            # Новое содержимое: задача уже в thumbnail_jobs, запускаем ее
+            thumbnail_worker.submit(saved.sha256)
 
         return {
             "filename": file.filename,
-            "saved_as": saved_path.name,
-            "size": len(file_data),
+            "saved_as": saved.path.name,
+            "size": saved.size,
+            "sha256": saved.sha256,
+            "deduplicated": not saved.created,
             "message": "File uploaded securely",
         }
 
+    except PoolOverloadedError:
+        raise ProblemDetailException(
+            status_code=503,
+            title="Service Unavailable",
+            detail="Too many uploads in progress, retry later",
+            error_type="/errors/upload-overloaded",
+            extra_headers={"Retry-After": str(UPLOAD_RETRY_AFTER)},
+        )
     except ValueError as e:
         error_msg = str(e)
         if "too large" in error_msg:
@@ -68,3 +144,118 @@ async def upload_file(file: UploadFile = File(...)):
             detail="Failed to process file upload",
             error_type="/errors/file-upload-failed",
         )
+
+
+@router.delete("/{file_name}", status_code=204)
+async def delete_file(
+    file_name: str,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Убирает одну ссылку текущего пользователя на файл; сам файл удаляется
+    вместе с последней ссылкой. Без своих ссылок на файл - 404
+    """
+    match = STORED_NAME_RE.match(file_name)
+    remaining = None
+    if match:
+        remaining = await release_file(db, UPLOAD_DIR, match.group(1), user_id)
+    if remaining is None:
+        raise file_not_found()
+    return Response(status_code=204)
+
+
+@router.get("/{file_name}/info")
+async def file_info(file_name: str, db: AsyncSession = Depends(get_async_db)):
+    """Метаданные файла: размеры изображения и готовность миниатюр"""
+    match = STORED_NAME_RE.match(file_name)
+    row = None
+    if match:
+        query = (
+            select(StoredFile, ThumbnailJob.status)
+            .outerjoin(ThumbnailJob, ThumbnailJob.sha256 == StoredFile.sha256)
+            .where(StoredFile.sha256 == match.group(1))
+        )
+        row = (await db.execute(query)).first()
+    if row is None:
+        raise file_not_found()
+
+    stored, status = row
+    thumbnails = {}
+    if status == ThumbnailJob.DONE:
+        thumbnails = {str(size): f"{file_name}?size={size}" for size in THUMBNAIL_SIZES}
+    return {
+        "sha256": stored.sha256,
+        "content_type": stored.content_type,
+        "size": stored.size,
+        "width": stored.width,
+        "height": stored.height,
+        "thumbnail_status": status,
+        "thumbnails": thumbnails,
+    }
+
+
+@router.api_route("/{file_name}", methods=["GET", "HEAD"])
+async def download_file(
+    file_name: str, request: Request, size: Optional[int] = Query(None)
+):
+    """
+    Отдает сохраненный файл или его миниатюру (?size=): ETag, Last-Modified,
+    304 на If-None-Match/If-Modified-Since и диапазоны байт (Range)
+    """
+    match = STORED_NAME_RE.match(file_name)
+    if not match or (size is not None and size not in THUMBNAIL_SIZES):
+        raise file_not_found()
+    sha256, extension = match.groups()
+    content_type = CONTENT_TYPES[extension]
+
+    if size is None:
+        path = file_security.content_path(UPLOAD_DIR, sha256, content_type)
+        etag = f'"{sha256}"'
+    else:
+        path = thumbnail_path(UPLOAD_DIR, sha256, content_type, size)
+        etag = f'"{sha256}-{size}"'
+    try:
+        stat_result = await run_in_threadpool(stat_stored_file, path)
+    except FileNotFoundError:
+        raise file_not_found()
+
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    file_size = stat_result.st_size
+    try:
+        byte_range = requested_range(request.headers, file_size, etag, last_modified)
+    except ValueError:
+        raise ProblemDetailException(
+            status_code=416,
+            title="Range Not Satisfiable",
+            detail="Requested range is outside of the file",
+            error_type="/errors/range-not-satisfiable",
+            extra_headers={"Content-Range": f"bytes */{file_size}"},
+        )
+
+    status_code = 200
+    headers["Content-Length"] = str(file_size)
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        headers["Content-Length"] = str(end - start + 1)
+
+    return StoredFileResponse(
+        path,
+        byte_range=byte_range,
+        status_code=status_code,
+        headers=headers,
+        media_type=content_type,
+    )
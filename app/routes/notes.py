@@ -1,103 +1,387 @@
-from typing import List
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
+from app.auth import get_current_user_id
+from app.database import sync
+from app.database import tags as tag_queries
+from app.database.database import SessionLocal, get_async_db
+from app.database.export import iter_notes_csv, iter_notes_ndjson
+from app.database.notes import UserNotes
+from app.database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from app.errors import ProblemDetailException
 from app.models.note import Note
-from app.schemas.note import NoteCreate, NoteResponse
+from app.schemas.note import (
+    NoteBatchResponse,
+    NoteBatchResult,
+    NoteBatchUpdate,
+    NoteChanges,
+    NoteCreate,
+    NotePage,
+    NoteResponse,
+)
+from app.utils import cache
+from app.utils.conditional import http_date, is_conditional, is_fresh, utc_timestamp
 from app.utils.json_security import safe_json_response
 
 router = APIRouter()
 
+# Максимальный размер пакета для batch endpoints
+MAX_BATCH_SIZE = 1000
 
-@router.get("/notes", response_model=List[NoteResponse])
-def get_notes(db: Session = Depends(get_db)):
+# Кэш ответов чтения. В памяти процесса инвалидация видна только этому
+# воркеру, остальные увидят изменение не позже чем через TTL;
+# NOTES_CACHE_URL=redis://... дает общий кэш. TTL=0 отключает кэш
+NOTES_CACHE_TTL = float(os.getenv("NOTES_CACHE_TTL", "30"))
+NOTES_CACHE_MAX_ENTRIES = int(os.getenv("NOTES_CACHE_MAX_ENTRIES", "1024"))
+notes_cache = cache.ResponseCache(
+    cache.build_cache_backend(os.getenv("NOTES_CACHE_URL"), NOTES_CACHE_MAX_ENTRIES),
+    ttl=NOTES_CACHE_TTL,
+)
+
+
+# Окно, изменения за которое повторно отдаются в /notes/changes: запись,
+# получившая updated_at раньше выданного токена, могла еще не быть зафиксирована
+NOTES_SYNC_SETTLE_SECONDS = float(os.getenv("NOTES_SYNC_SETTLE_SECONDS", "2"))
+
+# Заметки меняются: клиент хранит ответ, но проверяет его ETag при каждом запросе
+NOTES_CACHE_CONTROL = "private, no-cache"
+
+
+async def get_user_notes(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+) -> UserNotes:
+    """Заметки текущего пользователя: чужие заметки маршрутам не видны"""
+    return UserNotes(db, user_id)
+
+
+async def list_query(
+    user_notes: UserNotes,
+    cursor: Optional[str],
+    limit: int,
+    versions_only: bool = False,
+    tags: Sequence[str] = (),
+    match: str = tag_queries.MATCH_ALL,
+) -> Page:
+    """Страница заметок пользователя; поврежденный курсор - ответ 400"""
+    try:
+        return await user_notes.page(cursor, limit, versions_only, tags, match)
+    except ValueError:
+        raise invalid_cursor()
+
+
+def tag_filter_key(tags: Sequence[str], match: str) -> str:
+    """Часть ключа кэша списка для фильтра по тегам"""
+    if not tags:
+        return ""
+    names = json.dumps(sorted(set(tags)), ensure_ascii=False).encode("utf-8")
+    return f"{match}:{hashlib.sha256(names).hexdigest()[:16]}"
+
+
+def _version_token(updated_at: Optional[datetime]) -> str:
+    timestamp = utc_timestamp(updated_at)
+    return "0" if timestamp is None else str(round(timestamp * 1_000_000))
+
+
+def note_etag(note_id: int, updated_at: Optional[datetime]) -> str:
+    """ETag заметки: id и время последнего изменения"""
+    return f'"n{note_id}-{_version_token(updated_at)}"'
+
+
+def page_etag(
+    versions: Iterable[Tuple[int, Optional[datetime]]],
+    next_cursor: Optional[str],
+    prev_cursor: Optional[str],
+) -> str:
+    """
+    ETag страницы списка: версии ее заметок и курсоры соседних страниц.
+    Меняется при изменении, удалении или добавлении заметки на странице
+    """
+    digest = hashlib.sha256()
+    for note_id, updated_at in versions:
+        digest.update(f"{note_id}:{_version_token(updated_at)};".encode())
+    digest.update(f"{next_cursor}|{prev_cursor}".encode())
+    return f'"l{digest.hexdigest()[:32]}"'
+
+
+def validator_headers(
+    etag: str, updated_at: Optional[datetime] = None
+) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": NOTES_CACHE_CONTROL}
+    timestamp = utc_timestamp(updated_at)
+    if timestamp is not None:
+        headers["Last-Modified"] = http_date(timestamp)
+    return headers
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 без тела, но с валидаторами и Cache-Control"""
+    return Response(status_code=304, headers=headers)
+
+
+def note_to_dict(note: Note) -> Dict[str, Any]:
+    """
+    Поля NoteResponse. В async сессии неявная подгрузка невозможна,
+    поэтому note.tags должны быть загружены запросом (selectinload)
+    """
+    return {
+        "id": note.id,
+        "title": note.title,
+        "body": note.body,
+        "user_id": note.user_id,
+        "created_at": note.created_at,
+        "updated_at": note.updated_at,
+        "tags": sorted(tag.name for tag in note.tags),
+    }
+
+
+def invalid_cursor() -> ProblemDetailException:
+    return ProblemDetailException(
+        status_code=400,
+        title="Bad Request",
+        detail="Invalid pagination cursor",
+        error_type="/errors/invalid-cursor",
+    )
+
+
+@router.get("/notes", response_model=NotePage)
+async def get_notes(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tag: List[str] = Query([]),
+    match: str = Query(tag_queries.MATCH_ALL, pattern="^(all|any)$"),
+    user_notes: UserNotes = Depends(get_user_notes),
+):
+    """
+    Получить страницу заметок (keyset пагинация по курсору).
+    ?tag=a&tag=b - только заметки со всеми тегами (match=any - с любым).
+    Поддерживает If-None-Match: ETag страницы считается без тел заметок
+    """
+    key = await notes_cache.list_key(
+        user_notes.user_id, cursor, limit, tag_filter_key(tag, match)
+    )
+    cached = await notes_cache.get(key)
+    if cached is not None:
+        if is_fresh(request.headers, cached.headers):
+            return not_modified(cached.headers)
+        return cache.cached_json_response(cached, hit=True)
+
+    if is_conditional(request.headers):
+        versions = await list_query(
+            user_notes, cursor, limit, versions_only=True, tags=tag, match=match
+        )
+        headers = validator_headers(
+            page_etag(
+                [(row.id, row.updated_at) for row in versions.rows],
+                versions.next_cursor,
+                versions.prev_cursor,
+            )
+        )
+        if is_fresh(request.headers, headers):
+            return not_modified(headers)
+
+    page = await list_query(user_notes, cursor, limit, tags=tag, match=match)
+    notes_page = NotePage(
+        items=[note_to_dict(row.Note) for row in page.rows],
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+    )
+    # Last-Modified у списка нет: удаление заметки не меняет max(updated_at)
+    etag = page_etag(
+        [(row.Note.id, row.Note.updated_at) for row in page.rows],
+        page.next_cursor,
+        page.prev_cursor,
+    )
+    cached = cache.CachedResponse(
+        notes_page.model_dump_json().encode("utf-8"), validator_headers(etag)
+    )
+    await notes_cache.set(key, cached)
+    return cache.cached_json_response(cached, hit=False)
+
+
+@router.get("/notes/cache/stats")
+async def notes_cache_stats():
+    """Попадания и промахи кэша ответов чтения заметок"""
+    return notes_cache.stats()
+
+
+@router.get("/notes/changes", response_model=NoteChanges)
+async def get_note_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user_notes: UserNotes = Depends(get_user_notes),
+):
     """
-    Получить все заметки
+    Инкрементальная синхронизация: заметки, созданные или измененные после
+    since, и id удаленных. Без since - полная выгрузка по страницам
     """
-    notes = db.query(Note).all()
-    return notes
+    try:
+        since_key = sync.decode_sync_token(since)
+    except ValueError:
+        raise ProblemDetailException(
+            status_code=400,
+            title="Bad Request",
+            detail="Invalid sync token",
+            error_type="/errors/invalid-sync-token",
+        )
+
+    changes = await user_notes.changes(
+        since_key, limit, timedelta(seconds=NOTES_SYNC_SETTLE_SECONDS)
+    )
+    return NoteChanges(
+        changes=[note_to_dict(note) for note in changes.notes],
+        deleted=changes.deleted,
+        sync_token=changes.sync_token,
+        has_more=changes.has_more,
+    )
 
 
 @router.get("/")
 async def search_notes(
-    search: str = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user_notes: UserNotes = Depends(get_user_notes),
 ):
-    """Поиск заметок с безопасной параметризацией"""
+    """Полнотекстовый поиск заметок с ранжированием и сниппетами"""
     try:
-        query = db.query(Note)
-
         if search:
-            # Безопасный поиск через параметризацию
-            query = query.filter(
-                Note.title.contains(search) | Note.content.contains(search)
-            )
-
-        notes = query.offset(skip).limit(limit).all()
+            # Пользовательский ввод экранируется в build_match_query
+            page = await user_notes.search(search, cursor=cursor, limit=limit)
+        else:
+            page = await user_notes.page(cursor, limit)
+    except ValueError:
+        raise invalid_cursor()
 
+    try:
         # Возвращаем безопасно сериализованные данные
         notes_data = []
-        for note in notes:
+        for row in page.rows:
+            note = row.Note
             notes_data.append(
                 {
                     "id": note.id,
                     "title": note.title,
-                    "content": note.content,
+                    "body": note.body,
+                    "snippet": getattr(row, "snippet", None),
+                    "rank": getattr(row, "rank", None),
                     "created_at": (
                         note.created_at.isoformat() if note.created_at else None
                     ),
                 }
             )
 
-        return safe_json_response(notes_data)
+        return safe_json_response(
+            {
+                "items": notes_data,
+                "next_cursor": page.next_cursor,
+                "prev_cursor": page.prev_cursor,
+            }
+        )
 
     except Exception:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/notes/export")
+def export_notes(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Потоковая выгрузка всех заметок пользователя в NDJSON или CSV.
+    Генератор синхронный: Starlette итерирует его в пуле потоков
+    """
+    if format == "csv":
+        body = iter_notes_csv(SessionLocal, user_id)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = iter_notes_ndjson(SessionLocal, user_id)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="notes.{format}"'},
+    )
+
+
 @router.get("/notes/{note_id}", response_model=NoteResponse)
-def get_note(note_id: int, db: Session = Depends(get_db)):
+async def get_note(
+    note_id: int,
+    request: Request,
+    user_notes: UserNotes = Depends(get_user_notes),
+):
     """
-    Получить заметку по ID
+    Получить заметку по ID. Поддерживает If-None-Match и If-Modified-Since
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
+    key = await notes_cache.note_key(user_notes.user_id, note_id)
+    cached = await notes_cache.get(key)
+    if cached is not None:
+        if is_fresh(request.headers, cached.headers):
+            return not_modified(cached.headers)
+        return cache.cached_json_response(cached, hit=True)
+
+    if is_conditional(request.headers):
+        # Для проверки валидаторов тело заметки не нужно
+        updated_at = await user_notes.updated_at(note_id)
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Note not found")
+        headers = validator_headers(note_etag(note_id, updated_at[0]), updated_at[0])
+        if is_fresh(request.headers, headers):
+            return not_modified(headers)
+
+    note = await user_notes.get(note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
-    return safe_json_response(
-        {
-            "id": note.id,
-            "title": note.title,
-            "content": note.content,
-            "created_at": note.created_at.isoformat() if note.created_at else None,
-        }
+    # Та же сериализация, что и у списка: поля по умолчанию (priority) входят в тело
+    body = NoteResponse.model_validate(note_to_dict(note)).model_dump_json()
+    cached = cache.CachedResponse(
+        body.encode("utf-8"),
+        validator_headers(note_etag(note.id, note.updated_at), note.updated_at),
     )
+    await notes_cache.set(key, cached)
+    return cache.cached_json_response(cached, hit=False)
 
 
 @router.post("/notes", response_model=NoteResponse)
-def create_note(note_data: NoteCreate, db: Session = Depends(get_db)):
+async def create_note(
+    note_data: NoteCreate, user_notes: UserNotes = Depends(get_user_notes)
+):
     """
     Создать новую заметку
     """
-    # В реальном приложении здесь будет auth и user_id из токена
-    user_id = 1  # временно используем тестового пользователя
-
-    # Создаем новую заметку
-    new_note = Note(title=note_data.title, body=note_data.body, user_id=user_id)
+    new_note = user_notes.new(note_data.title, note_data.body)
 
+    db = user_notes.db
     db.add(new_note)
-    db.commit()
-    db.refresh(new_note)
+    await db.commit()
+    await notes_cache.invalidate_notes(user_notes.user_id)
+    # expire_on_commit=False: id и значения по умолчанию уже в объекте
 
-    return new_note
+    return note_to_dict(new_note)
 
 
 @router.put("/notes/{note_id}", response_model=NoteResponse)
-def update_note(note_id: int, note_data: NoteCreate, db: Session = Depends(get_db)):
+async def update_note(
+    note_id: int,
+    note_data: NoteCreate,
+    user_notes: UserNotes = Depends(get_user_notes),
+):
     """
     Обновить заметку
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
+    note = await user_notes.get(note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
@@ -105,22 +389,187 @@ def update_note(note_id: int, note_data: NoteCreate, db: Session = Depends(get_d
     note.title = note_data.title
     note.body = note_data.body
 
-    db.commit()
-    db.refresh(note)
+    await user_notes.db.commit()
+    await notes_cache.invalidate_notes(user_notes.user_id, [note_id])
 
-    return note
+    return note_to_dict(note)
 
 
 @router.delete("/notes/{note_id}")
-def delete_note(note_id: int, db: Session = Depends(get_db)):
+async def delete_note(note_id: int, user_notes: UserNotes = Depends(get_user_notes)):
     """
     Удалить заметку
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
+    note = await user_notes.get(note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    db.delete(note)
-    db.commit()
+    db = user_notes.db
+    await db.delete(note)
+    await user_notes.record_deletions([note_id])
+    await db.commit()
+    await notes_cache.invalidate_notes(user_notes.user_id, [note_id])
 
     return {"message": "Note deleted successfully"}
+
+
+def validation_detail(exc: ValidationError) -> str:
+    """Ошибки pydantic в том же виде, что и в validation_exception_handler"""
+    return "; ".join(
+        f"{' -> '.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def check_batch_size(items: list) -> None:
+    if len(items) > MAX_BATCH_SIZE:
+        raise ProblemDetailException(
+            status_code=413,
+            title="Batch Too Large",
+            detail=f"Batch exceeds maximum of {MAX_BATCH_SIZE} items",
+            error_type="/errors/batch-too-large",
+        )
+
+
+@router.post("/notes:batch", response_model=NoteBatchResponse)
+async def create_notes_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    user_notes: UserNotes = Depends(get_user_notes),
+):
+    """
+    Пакетное создание заметок одной транзакцией
+    """
+    check_batch_size(items)
+    db, user_id = user_notes.db, user_notes.user_id
+
+    results: List[Optional[NoteBatchResult]] = [None] * len(items)
+    rows, row_indexes = [], []
+    for index, item in enumerate(items):
+        try:
+            note_data = NoteCreate.model_validate(item)
+        except ValidationError as e:
+            results[index] = NoteBatchResult(
+                index=index, status=422, detail=validation_detail(e)
+            )
+            continue
+        rows.append(
+            {"title": note_data.title, "body": note_data.body, "user_id": user_id}
+        )
+        row_indexes.append(index)
+
+    if rows:
+        # Один INSERT ... VALUES (...), (...) RETURNING id на весь пакет
+        new_ids = (
+            await db.scalars(
+                insert(Note).returning(Note.id, sort_by_parameter_order=True), rows
+            )
+        ).all()
+        await db.commit()
+        await notes_cache.invalidate_notes(user_id)
+        for index, note_id in zip(row_indexes, new_ids):
+            results[index] = NoteBatchResult(index=index, status=201, id=note_id)
+
+    return NoteBatchResponse(results=results)
+
+
+@router.patch("/notes:batch", response_model=NoteBatchResponse)
+async def update_notes_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    user_notes: UserNotes = Depends(get_user_notes),
+):
+    """
+    Пакетное частичное обновление заметок одной транзакцией
+    """
+    check_batch_size(items)
+
+    results: List[Optional[NoteBatchResult]] = [None] * len(items)
+    updates: Dict[int, Tuple[int, NoteBatchUpdate]] = {}
+    for index, item in enumerate(items):
+        try:
+            update_data = NoteBatchUpdate.model_validate(item)
+        except ValidationError as e:
+            results[index] = NoteBatchResult(
+                index=index, status=422, detail=validation_detail(e)
+            )
+            continue
+        if update_data.id in updates:
+            results[index] = NoteBatchResult(
+                index=index,
+                status=409,
+                id=update_data.id,
+                detail="Duplicate note id in batch",
+            )
+            continue
+        updates[update_data.id] = (index, update_data)
+
+    existing = await user_notes.existing_ids(list(updates))
+    now = datetime.utcnow()
+    rows = []
+    for note_id, (index, update_data) in updates.items():
+        if note_id not in existing:
+            results[index] = NoteBatchResult(
+                index=index, status=404, id=note_id, detail="Note not found"
+            )
+            continue
+        values = update_data.model_dump(include={"title", "body"}, exclude_unset=True)
+        rows.append({"id": note_id, "updated_at": now, **values})
+        results[index] = NoteBatchResult(index=index, status=200, id=note_id)
+
+    if rows:
+        # ORM bulk UPDATE по первичному ключу (executemany); в rows только
+        # заметки пользователя - их отобрал existing_ids
+        await user_notes.db.execute(update(Note), rows)
+        await user_notes.db.commit()
+        await notes_cache.invalidate_notes(
+            user_notes.user_id, (row["id"] for row in rows)
+        )
+
+    return NoteBatchResponse(results=results)
+
+
+@router.delete("/notes:batch", response_model=NoteBatchResponse)
+async def delete_notes_batch(
+    ids: List[int] = Body(...), user_notes: UserNotes = Depends(get_user_notes)
+):
+    """
+    Пакетное удаление заметок одним DELETE ... WHERE id IN (...)
+    """
+    check_batch_size(ids)
+
+    existing = await user_notes.existing_ids(ids)
+    if existing:
+        db = user_notes.db
+        await db.execute(
+            delete(Note)
+            .where(Note.id.in_(existing))
+            .execution_options(synchronize_session=False)
+        )
+        await tag_queries.delete_note_links(db, existing)
+        await user_notes.record_deletions(existing)
+        await db.commit()
+        await notes_cache.invalidate_notes(user_notes.user_id, existing)
+
+    results: List[NoteBatchResult] = []
+    seen = set()
+    for index, note_id in enumerate(ids):
+        if note_id in seen:
+            results.append(
+                NoteBatchResult(
+                    index=index,
+                    status=409,
+                    id=note_id,
+                    detail="Duplicate note id in batch",
+                )
+            )
+            continue
+        seen.add(note_id)
+        if note_id in existing:
+            results.append(NoteBatchResult(index=index, status=200, id=note_id))
+        else:
+            results.append(
+                NoteBatchResult(
+                    index=index, status=404, id=note_id, detail="Note not found"
+                )
+            )
+
+    return NoteBatchResponse(results=results)
@@ -1,11 +1,164 @@
-from fastapi import APIRouter
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_user_id
+from app.database import tags as tag_queries
+from app.database.database import get_async_db
+from app.database.notes import UserNotes
+from app.errors import ProblemDetailException
+from app.models.note import Tag
+from app.routes import notes
+from app.schemas.note import TagCreate, TagResponse, TagUsage
 
 router = APIRouter()
 
 
-@router.get("/tags")
-def get_tags():
+def tag_exists(name: str) -> ProblemDetailException:
+    return ProblemDetailException(
+        status_code=409,
+        title="Conflict",
+        detail=f"Tag '{name}' already exists",
+        error_type="/errors/tag-exists",
+    )
+
+
+async def get_user_tag(db: AsyncSession, user_id: int, tag_id: int) -> Tag:
+    tag = await db.get(Tag, tag_id)
+    if tag is None or tag.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    return tag
+
+
+@router.get("/tags", response_model=List[TagUsage])
+async def get_tags(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Теги пользователя с числом заметок
+    """
+    rows = await tag_queries.tag_usage(db, user_id)
+    return [
+        TagUsage(
+            id=row.Tag.id,
+            name=row.Tag.name,
+            user_id=row.Tag.user_id,
+            note_count=row.note_count,
+        )
+        for row in rows
+    ]
+
+
+@router.post("/tags", response_model=TagResponse, status_code=201)
+async def create_tag(
+    tag_data: TagCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Создать тег (имя уникально в пределах пользователя)
+    """
+    tag = Tag(name=tag_data.name, user_id=user_id)
+    db.add(tag)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise tag_exists(tag_data.name)
+    return tag
+
+
+@router.get("/tags/{tag_id}", response_model=TagResponse)
+async def get_tag(
+    tag_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Получить тег по ID
+    """
+    return await get_user_tag(db, user_id, tag_id)
+
+
+@router.put("/tags/{tag_id}", response_model=TagResponse)
+async def rename_tag(
+    tag_id: int,
+    tag_data: TagCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Переименовать тег. Заметки с этим тегом считаются измененными
+    """
+    tag = await get_user_tag(db, user_id, tag_id)
+    if tag.name == tag_data.name:
+        return tag
+
+    tag.name = tag_data.name
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise tag_exists(tag_data.name)
+    changed = await tag_queries.touch_notes(db, tag_queries.notes_with_tag(tag_id))
+    await db.commit()
+    await notes.notes_cache.invalidate_notes(user_id, changed)
+    return tag
+
+
+@router.delete("/tags/{tag_id}", status_code=204)
+async def delete_tag(
+    tag_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Удалить тег и отвязать его от всех заметок
+    """
+    tag = await get_user_tag(db, user_id, tag_id)
+    changed = await tag_queries.touch_notes(db, tag_queries.notes_with_tag(tag_id))
+    await tag_queries.delete_tag_links(db, tag_id)
+    await db.delete(tag)
+    await db.commit()
+    await notes.notes_cache.invalidate_notes(user_id, changed)
+    return Response(status_code=204)
+
+
+async def check_note_and_tag(user_notes: UserNotes, note_id: int, tag_id: int) -> None:
+    """Тег и заметка принадлежат текущему пользователю"""
+    await get_user_tag(user_notes.db, user_notes.user_id, tag_id)
+    if not await user_notes.existing_ids([note_id]):
+        raise HTTPException(status_code=404, detail="Note not found")
+
+
+@router.put("/notes/{note_id}/tags/{tag_id}", status_code=204)
+async def attach_tag(
+    note_id: int,
+    tag_id: int,
+    user_notes: UserNotes = Depends(notes.get_user_notes),
+):
+    """
+    Привязать тег к заметке (повторная привязка ничего не меняет)
+    """
+    await check_note_and_tag(user_notes, note_id, tag_id)
+    if await tag_queries.attach_tag(user_notes.db, note_id, tag_id):
+        await notes.notes_cache.invalidate_notes(user_notes.user_id, [note_id])
+    return Response(status_code=204)
+
+
+@router.delete("/notes/{note_id}/tags/{tag_id}", status_code=204)
+async def detach_tag(
+    note_id: int,
+    tag_id: int,
+    user_notes: UserNotes = Depends(notes.get_user_notes),
+):
     """
-    Получить все теги (заглушка)
+    Отвязать тег от заметки
     """
-    return {"message": "Tags endpoint - to be implemented"}
+    await check_note_and_tag(user_notes, note_id, tag_id)
+    if await tag_queries.detach_tag(user_notes.db, note_id, tag_id):
+        await notes.notes_cache.invalidate_notes(user_notes.user_id, [note_id])
+    return Response(status_code=204)
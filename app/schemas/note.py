@@ -11,8 +11,8 @@ class TagBase(BaseModel):
     name: str
 
 
-class TagCreate(TagBase):
-    pass
+class TagCreate(StrictBaseModel):
+    name: str = Field(..., min_length=1, max_length=50, pattern=r"^[\w\-\.]+$")
 
 
 class TagResponse(TagBase):
@@ -23,10 +23,29 @@ class TagResponse(TagBase):
         from_attributes = True
 
 
+class TagUsage(TagResponse):
+    """Тег и число заметок, к которым он привязан"""
+
+    note_count: int
+
+
+# Ограничения заголовка общие для создания и (пакетного) обновления
+TITLE_PATTERN = "^[a-zA-Z0-9\\s\\-\\.\\,]+$"
+FORBIDDEN_TITLE_PATTERNS = ["<script>", "javascript:", "onload="]
+
+
+def check_title_content(v: Optional[str]) -> Optional[str]:
+    """Защита от потенциально опасного контента в заголовке"""
+    if v is None:
+        return v
+    for pattern in FORBIDDEN_TITLE_PATTERNS:
+        if pattern in v.lower():
+            raise ValueError(f"Title contains forbidden pattern: {pattern}")
+    return v
+
+
 class NoteBase(StrictBaseModel):
-    title: str = Field(
-        ..., min_length=1, max_length=200, pattern="^[a-zA-Z0-9\\s\\-\\.\\,]+$"
-    )
+    title: str = Field(..., min_length=1, max_length=200, pattern=TITLE_PATTERN)
     body: str = Field(..., min_length=1, max_length=10000)
     priority: Decimal = Field(
         default=Decimal("1.0"), ge=Decimal("0.1"), le=Decimal("10.0")
@@ -37,25 +56,76 @@ class NoteCreate(NoteBase):
     @field_validator("title")
     @classmethod
     def validate_title_content(cls, v):
-        """Защита от потенциально опасного контента в заголовке"""
-        forbidden_patterns = ["<script>", "javascript:", "onload="]
-        for pattern in forbidden_patterns:
-            if pattern in v.lower():
-                raise ValueError(f"Title contains forbidden pattern: {pattern}")
-        return v
+        return check_title_content(v)
 
 
 class NoteUpdate(StrictBaseModel):
-    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    """Частичное обновление: переданные поля проверяются как в NoteCreate"""
+
+    title: Optional[str] = Field(
+        None, min_length=1, max_length=200, pattern=TITLE_PATTERN
+    )
     body: Optional[str] = Field(None, min_length=1, max_length=10000)
     priority: Optional[Decimal] = Field(None, ge=Decimal("0.1"), le=Decimal("10.0"))
 
+    @field_validator("title")
+    @classmethod
+    def validate_title_content(cls, v):
+        return check_title_content(v)
+
+
+class NoteBatchUpdate(NoteUpdate):
+    """Элемент пакетного обновления: id заметки и изменяемые поля"""
+
+    id: int
+
+
+class NoteBatchResult(BaseModel):
+    """Результат обработки одного элемента пакета"""
+
+    index: int
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class NoteBatchResponse(BaseModel):
+    results: List[NoteBatchResult]
+
+
+class NoteResponse(BaseModel):
+    """
+    Ответ с заметкой. Ограничения NoteBase сюда не наследуются:
+    они проверяют ввод, а не уже сохраненные данные.
+    """
 
-class NoteResponse(NoteBase):
     id: int
+    title: str
+    body: str
+    priority: Decimal = Decimal("1.0")
     user_id: int
     created_at: datetime
     updated_at: datetime
     tags: List[str] = []
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class NotePage(BaseModel):
+    """Страница заметок с непрозрачными курсорами соседних страниц"""
+
+    items: List[NoteResponse]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class NoteChanges(BaseModel):
+    """
+    Изменения с момента sync_token предыдущего ответа. has_more - изменений
+    больше limit, следующий запрос нужно сделать сразу с новым токеном
+    """
+
+    changes: List[NoteResponse]
+    deleted: List[int]
+    sync_token: str
+    has_more: bool
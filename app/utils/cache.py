@@ -0,0 +1,205 @@
+"""
+Кэш сериализованных ответов: LRU/TTL в памяти процесса или общий Redis
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi.responses import Response
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - redis опционален
+    redis_asyncio = None
+
+
+class MemoryCacheBackend:
+    """
+    LRU кэш с TTL в памяти процесса. Версии ключей тоже хранятся в LRU
+    (max_versions, по умолчанию 4 * max_entries). Вытесненную версию
+    нельзя просто забыть: сброс вернул бы к жизни устаревшие записи.
+    Поэтому при вытеснении все имена без своей версии переходят на новую
+    общую эпоху, большую любой выданной раньше версии
+    """
+
+    def __init__(self, max_entries: int = 1024, max_versions: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_versions = max_versions or 4 * max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._last_version = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_version(self, name: str) -> int:
+        with self._lock:
+            version = self._versions.get(name)
+            if version is None:
+                return self._epoch
+            self._versions.move_to_end(name)
+            return version
+
+    async def bump_version(self, name: str) -> int:
+        with self._lock:
+            self._last_version += 1
+            version = self._last_version
+            self._versions[name] = version
+            self._versions.move_to_end(name)
+            if len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+                self._last_version += 1
+                self._epoch = self._last_version
+            return version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Общий кэш для нескольких воркеров uvicorn: инвалидация в одном
+    процессе видна всем остальным
+    """
+
+    def __init__(self, url: str, prefix: str = "studynotes:"):
+        if redis_asyncio is None:
+            raise RuntimeError("redis package is required for a redis:// cache URL")
+        self._client = redis_asyncio.Redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_version(self, name: str) -> int:
+        return int(await self._client.get(f"{self.prefix}version:{name}") or 0)
+
+    async def bump_version(self, name: str) -> int:
+        return await self._client.incr(f"{self.prefix}version:{name}")
+
+
+def build_cache_backend(url: Optional[str], max_entries: int):
+    """memory (по умолчанию) или redis://host:6379/0"""
+    if not url or url == "memory":
+        return MemoryCacheBackend(max_entries=max_entries)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+@dataclass
+class CachedResponse:
+    """Тело ответа и заголовки, которые нужно отдать вместе с ним"""
+
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def pack(self) -> bytes:
+        # Первая строка - заголовки в JSON (без переводов строк), затем тело
+        return json.dumps(self.headers).encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, value: bytes) -> "CachedResponse":
+        headers, _, body = value.partition(b"\n")
+        return cls(body=body, headers=json.loads(headers))
+
+
+class ResponseCache:
+    """
+    Кэш готовых JSON тел ответов для заметок.
+
+    Ключи содержат версию: запись не удаляется при изменении, а
+    становится недостижимой после bump_version. Поэтому ответ, прочитанный
+    из БД до изменения, но записанный в кэш после него, никогда не
+    отдается - он лежит под старой версией ключа.
+
+    Ключи содержат и пользователя: ответ, сохраненный для одного
+    пользователя, не может быть отдан другому
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def note_key(self, user_id: int, note_id: int) -> str:
+        version = await self.backend.get_version(f"note:{note_id}")
+        return f"note:{user_id}:{note_id}:v{version}"
+
+    async def list_key(
+        self, user_id: int, cursor: Optional[str], limit: int, filters: str = ""
+    ) -> str:
+        version = await self.backend.get_version(f"notes:list:{user_id}")
+        return f"notes:{user_id}:v{version}:{limit}:{filters}:{cursor or ''}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = await self.backend.get(key) if self.enabled else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return CachedResponse.unpack(value) if value is not None else None
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        if self.enabled:
+            await self.backend.set(key, response.pack(), self.ttl)
+
+    async def invalidate_notes(
+        self, user_id: int, note_ids: Iterable[int] = ()
+    ) -> None:
+        """
+        Вызывается после commit изменения: заметки и все страницы списка
+        пользователя. Списки других пользователей остаются в кэше
+        """
+        for note_id in note_ids:
+            await self.backend.bump_version(f"note:{note_id}")
+        await self.backend.bump_version(f"notes:list:{user_id}")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def cached_json_response(cached: CachedResponse, hit: bool) -> Response:
+    """JSON ответ из готового тела с заголовком X-Cache: HIT/MISS"""
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={**cached.headers, "X-Cache": "HIT" if hit else "MISS"},
+    )
@@ -0,0 +1,64 @@
+"""
+Условные запросы (RFC 9110): ETag / If-None-Match и If-Modified-Since
+"""
+
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Слабое сравнение ETag для If-None-Match (W/ префикс игнорируется)"""
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def is_not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: Optional[float]
+) -> bool:
+    """
+    Проверка для ответа 304. If-None-Match имеет приоритет, If-Modified-Since
+    учитывается только без него и только если известно время изменения
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
+def is_fresh(
+    request_headers: Mapping[str, str], response_headers: Mapping[str, str]
+) -> bool:
+    """Проверка 304 по валидаторам ETag/Last-Modified готового ответа"""
+    last_modified = response_headers.get("Last-Modified")
+    timestamp = None
+    if last_modified:
+        timestamp = parsedate_to_datetime(last_modified).timestamp()
+    return is_not_modified(request_headers, response_headers["ETag"], timestamp)
+
+
+def is_conditional(headers: Mapping[str, str]) -> bool:
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def utc_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Timestamp наивного UTC datetime из БД"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
@@ -0,0 +1,19 @@
+"""
+Разбор настроек из переменных окружения
+"""
+
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """Целое из переменной; не задана или пусто - default"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """1/true/yes/on (без учета регистра) - True; не задана или пусто - default"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,127 @@
+"""
+Отдача сохраненных файлов: диапазоны байт (RFC 9110)
+"""
+
+import os
+import re
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+ByteRange = Tuple[int, int]
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[ByteRange]:
+    """
+    Разбирает заголовок Range в диапазон [start, end] включительно.
+    None - заголовка нет или он некорректен/содержит несколько диапазонов:
+    такой Range игнорируется и отдается весь файл.
+    ValueError - диапазон не пересекается с файлом (416)
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: последние N байт
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def requested_range(
+    headers: Mapping[str, str], size: int, etag: str, last_modified: str
+) -> Optional[ByteRange]:
+    """
+    Диапазон из Range с учетом If-Range: если файл изменился с тех пор,
+    как клиент получил валидатор, диапазон игнорируется
+    """
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range.strip() not in (etag, last_modified):
+        return None
+    return parse_range(headers.get("range"), size)
+
+
+class StoredFileResponse(FileResponse):
+    """
+    FileResponse с поддержкой диапазона байт. Если сервер поддерживает
+    ASGI расширение http.response.zerocopysend, тело отдается через
+    sendfile без копирования в пространство пользователя
+    """
+
+    def __init__(self, path, byte_range: Optional[ByteRange] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            await self._zerocopy_send(send)
+        else:
+            await self._send_chunks(send)
+
+        if self.background is not None:
+            await self.background()
+
+    def _span(self) -> Tuple[int, int]:
+        offset = self.byte_range[0] if self.byte_range else 0
+        return offset, int(self.headers["content-length"])
+
+    async def _zerocopy_send(self, send: Send) -> None:
+        offset, count = self._span()
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": fd,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                }
+            )
+        finally:
+            os.close(fd)
+
+    async def _send_chunks(self, send: Send) -> None:
+        offset, remaining = self._span()
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(offset)
+            more_body = True
+            while more_body:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and len(chunk) > 0
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body,
+                    }
+                )
@@ -1,9 +1,14 @@
-import uuid
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
 
 # Константы
 MAX_FILE_SIZE = 5_000_000  # 5MB
+CHUNK_SIZE = 64 * 1024
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 JPEG_SOI = b"\xff\xd8"
 JPEG_EOI = b"\xff\xd9"
@@ -18,6 +23,193 @@ def sniff_content_type(data: bytes) -> Optional[str]:
     return None
 
 
+@dataclass
+class SavedFile:
+    """Результат сохранения загруженного файла"""
+
+    path: Path
+    size: int
+    content_type: str
+    sha256: str
+    # False - такое содержимое уже было сохранено, запись на диск не выполнялась
+    created: bool = True
+
+
+def _extension_for(content_type: str) -> str:
+    return ".png" if content_type == "image/png" else ".jpg"
+
+
+def content_path(upload_dir: Path, sha256: str, content_type: str) -> Path:
+    """
+    Путь файла в content-addressed хранилище: ab/cd/<sha256>.ext.
+    Два уровня шардирования держат директории небольшими (~65k листьев)
+    """
+    return (
+        upload_dir
+        / sha256[:2]
+        / sha256[2:4]
+        / f"{sha256}{_extension_for(content_type)}"
+    )
+
+
+def _secure_upload_dir(upload_dir: Path) -> Path:
+    """Канонизирует директорию загрузок и запрещает симлинки на пути к ней"""
+    upload_dir = upload_dir.resolve(strict=True)
+
+    # Проверка на симлинки в родительских директориях
+    current_path = upload_dir
+    while current_path != current_path.parent:  # пока не дошли до корня
+        if current_path.is_symlink():
+            raise ValueError("Symlinks not allowed in path")
+        current_path = current_path.parent
+    return upload_dir
+
+
+def _secure_target(upload_dir: Path, filename: Union[str, Path]) -> Path:
+    file_path = (upload_dir / filename).resolve()
+
+    # Проверка что файл остается внутри целевой директории
+    if not str(file_path).startswith(str(upload_dir)):
+        raise ValueError("Path traversal attempt detected")
+    return file_path
+
+
+def _sniff_prefix(prefix: bytes) -> Optional[str]:
+    """
+    Тип по первым байтам потока. Для JPEG окончательная проверка
+    маркера EOI выполняется после чтения последнего chunk
+    """
+    if prefix.startswith(PNG_SIGNATURE):
+        return "image/png"
+    if prefix.startswith(JPEG_SOI):
+        return "image/jpeg"
+    return None
+
+
+def _iter_checked_chunks(
+    first_chunk: bytes,
+    stream: BinaryIO,
+    content_type: str,
+    max_size: int,
+    chunk_size: int,
+) -> Iterator[bytes]:
+    """
+    Отдает chunk потока, проверяя лимит размера по мере чтения
+    и маркер конца JPEG после последнего chunk
+    """
+    size = 0
+    tail = b""
+    chunk = first_chunk
+    while chunk:
+        size += len(chunk)
+        if size > max_size:
+            raise ValueError("File too large")
+        yield chunk
+        tail = (tail + chunk)[-len(JPEG_EOI) :]
+        chunk = stream.read(chunk_size)
+
+    if content_type == "image/jpeg" and tail != JPEG_EOI:
+        raise ValueError("Unsupported file type")
+
+
+def _store(
+    upload_dir: Path,
+    content_type: str,
+    chunks: Iterator[bytes],
+    expected_sha256: Optional[str] = None,
+) -> Tuple[str, int, bool]:
+    """
+    Записывает chunks во временный файл с хешированием на лету и атомарно
+    переносит его по content-addressed пути. Возвращает (sha256, size, created)
+    """
+    size = 0
+    hasher = hashlib.sha256()
+    tmp = tempfile.NamedTemporaryFile(
+        dir=upload_dir, prefix=".upload-", suffix=".part", delete=False
+    )
+    try:
+        with tmp:
+            for chunk in chunks:
+                size += len(chunk)
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        sha256 = hasher.hexdigest()
+        if expected_sha256 is not None and sha256 != expected_sha256:
+            raise ValueError("File changed during upload")
+
+        target = _secure_target(
+            upload_dir, content_path(upload_dir, sha256, content_type)
+        )
+        if target.exists():
+            Path(tmp.name).unlink()
+            return sha256, size, False
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Одинаковое содержимое -> одинаковое имя, гонка двух загрузок безопасна
+        os.replace(tmp.name, target)
+        return sha256, size, True
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def secure_save_stream(
+    upload_dir: Path,
+    stream: BinaryIO,
+    original_filename: Optional[str] = None,
+    max_size: int = MAX_FILE_SIZE,
+    chunk_size: int = CHUNK_SIZE,
+) -> SavedFile:
+    """
+    Потоково сохраняет файл в content-addressed хранилище с теми же
+    проверками, что и secure_save_file, без загрузки всего файла в память:
+    - magic bytes проверяются по первому chunk, до записи на диск
+    - лимит размера проверяется по мере чтения, чтение прерывается сразу
+    - имя файла - SHA-256 содержимого, одинаковые загрузки хранятся один раз
+
+    Если поток поддерживает seek (UploadFile), хеш считается первым
+    проходом без записи, поэтому дубликат не стоит ни одной записи на диск.
+    """
+    upload_dir = _secure_upload_dir(upload_dir)
+
+    start = stream.tell() if stream.seekable() else None
+    first_chunk = stream.read(chunk_size)
+    content_type = _sniff_prefix(first_chunk)
+    if not content_type:
+        raise ValueError("Unsupported file type")
+
+    chunks = _iter_checked_chunks(
+        first_chunk, stream, content_type, max_size, chunk_size
+    )
+
+    if start is None:
+        sha256, size, created = _store(upload_dir, content_type, chunks)
+    else:
+        size = 0
+        hasher = hashlib.sha256()
+        for chunk in chunks:
+            size += len(chunk)
+            hasher.update(chunk)
+        sha256 = hasher.hexdigest()
+
+        created = False
+        if not content_path(upload_dir, sha256, content_type).exists():
+            stream.seek(start)
+            chunks = _iter_checked_chunks(
+                stream.read(chunk_size), stream, content_type, max_size, chunk_size
+            )
+            _, size, created = _store(upload_dir, content_type, chunks, sha256)
+
+    return SavedFile(
+        path=_secure_target(upload_dir, content_path(upload_dir, sha256, content_type)),
+        size=size,
+        content_type=content_type,
+        sha256=sha256,
+        created=created,
+    )
+
+
 def secure_save_file(
     upload_dir: Path, file_data: bytes, original_filename: str
 ) -> Path:
@@ -26,7 +218,7 @@ def secure_save_file(
     - Magic bytes
     - Лимит размера
     - Канонизация пути
-    - UUID имя файла
+    - Имя файла по SHA-256 содержимого
     - Запрет симлинков
     """
     # Проверка размера файла
@@ -34,34 +226,10 @@ def secure_save_file(
         raise ValueError("File too large")
 
     # Проверка magic bytes
-    content_type = sniff_content_type(file_data)
-    if not content_type:
+    if not sniff_content_type(file_data):
         raise ValueError("Unsupported file type")
 
-    # Определяем расширение на основе типа контента
-    extension = ".png" if content_type == "image/png" else ".jpg"
-
-    # Создаем UUID имя файла
-    filename = f"{uuid.uuid4()}{extension}"
-
-    # Канонизация пути
-    upload_dir = upload_dir.resolve(strict=True)
-    file_path = (upload_dir / filename).resolve()
-
-    # Проверка что файл остается внутри целевой директории
-    if not str(file_path).startswith(str(upload_dir)):
-        raise ValueError("Path traversal attempt detected")
-
-    # Проверка на симлинки в родительских директориях
-    current_path = upload_dir
-    while current_path != current_path.parent:  # пока не дошли до корня
-        if current_path.is_symlink():
-            raise ValueError("Symlinks not allowed in path")
-        current_path = current_path.parent
-
-    # Сохраняем файл
-    file_path.write_bytes(file_data)
-    return file_path
+    return secure_save_stream(upload_dir, io.BytesIO(file_data), original_filename).path
 
 
 def validate_file_path(root_dir: Path, file_path: Path) -> bool:
@@ -0,0 +1,63 @@
+"""
+Ограниченный пул потоков для блокирующего файлового I/O
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class PoolOverloadedError(Exception):
+    """Очередь пула переполнена: запрос нужно отклонить (backpressure)"""
+
+
+class BoundedIOPool:
+    """
+    Выполняет блокирующие функции в отдельном пуле потоков, не занимая
+    event loop. Одновременно выполняется не больше max_workers задач,
+    еще max_pending ждут в очереди; сверх этого run() сразу выбрасывает
+    PoolOverloadedError вместо бесконечного накопления запросов.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, name: str = "io"):
+        if max_workers < 1 or max_pending < 0:
+            raise ValueError("Invalid pool limits")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}-pool"
+        )
+        self._lock = threading.Lock()
+        self._in_use = 0
+
+    @property
+    def in_use(self) -> int:
+        """Задачи в работе и в очереди"""
+        return self._in_use
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_use -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self._in_use >= self.max_workers + self.max_pending:
+                raise PoolOverloadedError("I/O pool is overloaded")
+            self._in_use += 1
+
+        # Слот освобождается, когда поток действительно завершил работу,
+        # даже если ожидающий запрос был отменен (клиент отключился)
+        try:
+            future = self._executor.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
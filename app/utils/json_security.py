@@ -2,6 +2,16 @@ import json
 from decimal import Decimal
 from typing import Any
 
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+
+    # datetime/dataclass отдаем в default, как это делает stdlib json
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
 
 def safe_json_loads(json_str: str) -> Any:
     """
@@ -10,26 +20,52 @@ def safe_json_loads(json_str: str) -> Any:
     return json.loads(json_str, parse_float=str)  # Преобразуем float в строку
 
 
+def decimal_encoder(o):
+    if isinstance(o, Decimal):
+        return str(o)  # Преобразуем Decimal в строку
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+
 def safe_json_dumps(obj: Any) -> str:
     """
     Безопасная сериализация JSON с обработкой Decimal
     """
+    return json.dumps(obj, default=decimal_encoder, ensure_ascii=False)
 
-    def decimal_encoder(o):
-        if isinstance(o, Decimal):
-            return str(o)  # Преобразуем Decimal в строку
-        raise TypeError(
-            f"Object of type {o.__class__.__name__} is not JSON serializable"
-        )
 
-    return json.dumps(obj, default=decimal_encoder, ensure_ascii=False)
+# Энкодер создается один раз: json.dumps с default= строит его на каждый вызов
+_response_encoder = json.JSONEncoder(
+    default=decimal_encoder,
+    ensure_ascii=False,
+    allow_nan=False,
+    separators=(",", ":"),
+)
+
+
+def render_safe_json(data: Any) -> bytes:
+    """
+    Сериализует данные в JSON bytes за один проход, Decimal -> строка.
+    Использует orjson, если он установлен; значения, которые orjson
+    не поддерживает (например, int больше 64 бит), уходят в stdlib json.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=decimal_encoder, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return _response_encoder.encode(data).encode("utf-8")
+
+
+class SafeJSONResponse(JSONResponse):
+    """JSONResponse с однопроходной Decimal-безопасной сериализацией"""
+
+    def render(self, content: Any) -> bytes:
+        return render_safe_json(content)
 
 
-def safe_json_response(data: Any) -> dict:
+def safe_json_response(data: Any) -> SafeJSONResponse:
     """
-    Подготавливает данные для безопасного возврата в JSON response
+    Готовый JSON response: данные сериализуются один раз, без
+    промежуточного dumps/loads и без повторной обработки FastAPI
     """
-    if isinstance(data, (list, dict)):
-        json_str = safe_json_dumps(data)
-        return json.loads(json_str)  # Возвращаем как native Python объекты
-    return data
+    return SafeJSONResponse(content=data)
@@ -0,0 +1,110 @@
+"""
+Структурированный журнал в JSON без блокировки обработки запросов:
+обработчик запроса только кладет запись в очередь, форматирование и
+запись в поток выполняет отдельный поток QueueListener
+"""
+
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+from app.middleware.request_id import current_request_id
+
+# Атрибуты LogRecord; остальные (переданные через extra=) попадают в JSON
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestContextQueueHandler(QueueHandler):
+    """
+    В потоке запроса запись только дополняется request_id (contextvar
+    не виден потоку QueueListener) и ставится в очередь. При переполнении
+    очереди запись отбрасывается: журнал не должен тормозить ответы
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Стандартный prepare копирует запись и форматирует ее здесь же;
+        # подстановка аргументов дешевая и фиксирует их значения, а JSON и
+        # трассировка исключения формируются уже в потоке QueueListener
+        record.request_id = current_request_id()
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BlockingSentinelListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # При остановке очередь может быть заполнена: ждем, пока ее разберут
+        self.queue.put(self._sentinel)
+
+
+class JsonLogging:
+    """
+    Подключает JSON журнал к корневому логгеру на время работы приложения
+    (start в начале lifespan, shutdown в конце). Логгеры uvicorn
+    настраиваются самим uvicorn и не затрагиваются
+    """
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        queue_size: int = 10_000,
+        stream: Optional[TextIO] = None,
+    ):
+        self.level = level.upper()
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter())
+        self.handler = RequestContextQueueHandler(self._queue)
+        self._listener = _BlockingSentinelListener(self._queue, output)
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.handler)
+        self._listener.start()
+
+    def shutdown(self) -> None:
+        """Убирает обработчик и дописывает записи, оставшиеся в очереди"""
+        logging.getLogger().removeHandler(self.handler)
+        self._listener.stop()
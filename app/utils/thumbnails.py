@@ -0,0 +1,97 @@
+"""
+Миниатюры и размеры загруженных изображений (Pillow опционален)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow опционален
+    Image = None
+
+# Максимальная сторона миниатюры, от большей к меньшей
+THUMBNAIL_SIZES = (512, 256, 128)
+JPEG_QUALITY = 85
+THUMBS_DIR = "thumbs"
+
+
+class InvalidImageError(Exception):
+    """Изображение невозможно обработать, повтор не поможет"""
+
+
+def thumbnail_path(upload_dir: Path, sha256: str, content_type: str, size: int) -> Path:
+    """Путь миниатюры: thumbs/<size>/ab/cd/<sha256>.ext рядом с оригиналами"""
+    extension = ".png" if content_type == "image/png" else ".jpg"
+    return (
+        upload_dir
+        / THUMBS_DIR
+        / str(size)
+        / sha256[:2]
+        / sha256[2:4]
+        / f"{sha256}{extension}"
+    )
+
+
+def thumbnail_paths(upload_dir: Path, sha256: str, content_type: str) -> Iterator[Path]:
+    for size in THUMBNAIL_SIZES:
+        yield thumbnail_path(upload_dir, sha256, content_type, size)
+
+
+def _save_atomic(image, target: Path, content_type: str) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(
+        dir=target.parent, prefix=".thumb-", suffix=".part", delete=False
+    )
+    try:
+        with tmp:
+            if content_type == "image/png":
+                image.save(tmp, format="PNG")
+            else:
+                image.save(tmp, format="JPEG", quality=JPEG_QUALITY)
+        os.replace(tmp.name, target)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def make_thumbnails(
+    upload_dir: Path, source: Path, sha256: str, content_type: str
+) -> Tuple[int, int]:
+    """
+    Создает миниатюры всех размеров и возвращает (width, height) оригинала.
+    JPEG декодируется сразу в уменьшенном масштабе (draft), каждая
+    следующая миниатюра строится из предыдущей, а не из оригинала
+    """
+    if Image is None:
+        raise InvalidImageError("Pillow is not installed")
+
+    try:
+        image = Image.open(source)
+        width, height = image.size
+        image.draft("RGB", (THUMBNAIL_SIZES[0], THUMBNAIL_SIZES[0]))
+        image.load()
+    except FileNotFoundError:
+        # Файла нет - это не ошибка изображения, задачу можно повторить
+        raise
+    except (Image.DecompressionBombError, SyntaxError, OSError) as e:
+        # Нераспознанные или поврежденные данные изображения
+        raise InvalidImageError(str(e)) from e
+
+    with image:
+        current = image
+        if content_type == "image/jpeg" and current.mode not in ("RGB", "L"):
+            current = current.convert("RGB")
+        for size in THUMBNAIL_SIZES:
+            current = current.copy()
+            current.thumbnail((size, size))
+            target = thumbnail_path(upload_dir, sha256, content_type, size)
+            _save_atomic(current, target, content_type)
+    return width, height
+
+
+def remove_thumbnails(upload_dir: Path, sha256: str, content_type: str) -> None:
+    for path in thumbnail_paths(upload_dir, sha256, content_type):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,141 @@
+"""
+Фоновая генерация миниатюр: пул потоков и очередь задач в таблице thumbnail_jobs
+"""
+
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.file import StoredFile, ThumbnailJob
+from app.utils.thumbnails import InvalidImageError, make_thumbnails, remove_thumbnails
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_MAX_ATTEMPTS = int(os.getenv("THUMBNAIL_MAX_ATTEMPTS", "3"))
+MAX_ERROR_LENGTH = 500
+
+
+class ThumbnailWorker:
+    """
+    Выполняет задачи thumbnail_jobs в отдельном пуле потоков, не задерживая
+    ответ на загрузку. Состояние задачи хранится в БД: после перезапуска
+    recover() возвращает в очередь все незавершенные задачи
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        upload_dir: Path,
+        max_workers: int = THUMBNAIL_WORKERS,
+        max_attempts: int = THUMBNAIL_MAX_ATTEMPTS,
+    ):
+        self.session_factory = session_factory
+        self.upload_dir = upload_dir
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="thumbnail"
+        )
+
+    def submit(self, sha256: str) -> Future:
+        return self._executor.submit(self.process, sha256)
+
+    def recover(self) -> List[Future]:
+        """
+        Задачи в статусе running прерваны остановкой процесса: возвращаем
+        их в pending и ставим в пул все ожидающие задачи
+        """
+        with self.session_factory() as db:
+            db.execute(
+                update(ThumbnailJob)
+                .where(ThumbnailJob.status == ThumbnailJob.RUNNING)
+                .values(status=ThumbnailJob.PENDING)
+            )
+            db.commit()
+            pending = db.scalars(
+                select(ThumbnailJob.sha256).where(
+                    ThumbnailJob.status == ThumbnailJob.PENDING
+                )
+            ).all()
+        return [self.submit(sha256) for sha256 in pending]
+
+    def process(self, sha256: str) -> Optional[str]:
+        """
+        Выполняет задачу, если ее удалось захватить (pending -> running).
+        Возвращает итоговый статус или None, если задача не выполнялась
+        """
+        with self.session_factory() as db:
+            attempts = db.execute(
+                update(ThumbnailJob)
+                .where(
+                    ThumbnailJob.sha256 == sha256,
+                    ThumbnailJob.status == ThumbnailJob.PENDING,
+                )
+                .values(status=ThumbnailJob.RUNNING, attempts=ThumbnailJob.attempts + 1)
+                .returning(ThumbnailJob.attempts)
+            ).scalar_one_or_none()
+            db.commit()
+            if attempts is None:
+                return None
+
+            stored = db.get(StoredFile, sha256)
+            if stored is None:
+                return None
+            try:
+                width, height = make_thumbnails(
+                    self.upload_dir,
+                    self.upload_dir / stored.path,
+                    sha256,
+                    stored.content_type,
+                )
+            except InvalidImageError as e:
+                return self._finish(db, sha256, ThumbnailJob.FAILED, str(e))
+            except Exception as e:
+                logger.exception("Thumbnail job %s failed", sha256)
+                if attempts >= self.max_attempts:
+                    return self._finish(db, sha256, ThumbnailJob.FAILED, str(e))
+                status = self._finish(db, sha256, ThumbnailJob.PENDING, str(e))
+                if status is not None:
+                    try:
+                        self.submit(sha256)
+                    except RuntimeError:
+                        # Пул останавливается: задача останется pending
+                        pass
+                return status
+
+            db.execute(
+                update(StoredFile)
+                .where(StoredFile.sha256 == sha256)
+                .values(width=width, height=height)
+            )
+            status = self._finish(db, sha256, ThumbnailJob.DONE, None)
+            if status is None:
+                # Последнюю ссылку на файл удалили во время обработки
+                remove_thumbnails(self.upload_dir, sha256, stored.content_type)
+            return status
+
+    def _finish(
+        self, db: Session, sha256: str, status: str, error: Optional[str]
+    ) -> Optional[str]:
+        result = db.execute(
+            update(ThumbnailJob)
+            .where(
+                ThumbnailJob.sha256 == sha256,
+                ThumbnailJob.status == ThumbnailJob.RUNNING,
+            )
+            .values(
+                status=status,
+                last_error=error[:MAX_ERROR_LENGTH] if error else None,
+            )
+        )
+        db.commit()
+        return status if result.rowcount else None
+
+    def shutdown(self) -> None:
+        """Ожидающие в пуле задачи отменяются, в БД они остаются pending"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,236 @@
+"""
+Микробенчмарки горячих функций (pytest-benchmark). Запуск и сравнение
+с сохраненным baseline - make bench-micro, сохранение baseline -
+make bench-baseline.
+
+Бенчмарки middleware, кроме сравнения с baseline, проверяют и
+абсолютную добавку к запросу: в тестах tests/ такие проверки ломались
+бы под трассировкой coverage
+"""
+
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from fastapi import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("LOG_FORMAT", "text")
+
+from app.errors import (  # noqa: E402
+    ProblemDetailException,
+    mask_sensitive_data,
+    problem_detail_handler,
+)
+from app.middleware.metrics import MetricsMiddleware  # noqa: E402
+from app.middleware.rate_limiter import (  # noqa: E402
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RateLimitRule,
+)
+from app.middleware.request_id import RequestIdMiddleware  # noqa: E402
+from app.schemas.note import NoteCreate  # noqa: E402
+from app.utils.file_security import sniff_content_type  # noqa: E402
+from app.utils.json_security import safe_json_response  # noqa: E402
+from app.utils.structured_logging import JsonLogging  # noqa: E402
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+JPEG = b"\xff\xd8" + b"\x00" * 4096 + b"\xff\xd9"
+
+NOTE = {
+    "title": "Linear algebra, lecture 3",
+    "body": "Eigenvalues and eigenvectors. " * 40,
+    "priority": "2.5",
+}
+
+
+class AsgiBatch:
+    """
+    Пачка запросов через ASGI приложение за один вызов: цена запуска
+    event loop делится на всю пачку, а не ложится на каждый запрос
+    """
+
+    def __init__(self, app, scopes):
+        self.app = app
+        self.scopes = scopes
+        self.loop = asyncio.new_event_loop()
+
+    async def _run(self):
+        for scope in self.scopes:
+            await self.app(dict(scope), self._receive, self._send)
+
+    @staticmethod
+    async def _receive():
+        return {"type": "http.request", "body": b""}
+
+    @staticmethod
+    async def _send(message):
+        pass
+
+    def __call__(self):
+        self.loop.run_until_complete(self._run())
+
+    def best(self, rounds: int = 5) -> float:
+        """Лучшее время пачки без pytest-benchmark, секунды"""
+        best = float("inf")
+        for _ in range(rounds):
+            started = time.perf_counter()
+            self()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def assert_below(benchmark, limit: float, calls: int = 1, bare: float = 0.0) -> None:
+    """Лучший раунд за вычетом bare в пересчете на один вызов меньше limit"""
+    if benchmark.disabled:
+        return
+    per_call = (benchmark.stats.stats.min - bare) / calls
+    assert per_call < limit, f"{per_call * 1e6:.1f} us per call"
+
+
+def assert_overhead(benchmark, bare: AsgiBatch, limit: float) -> None:
+    """Добавка middleware к одному запросу меньше limit"""
+    assert_below(benchmark, limit, len(bare.scopes), bare.best())
+
+
+def notes_page(size: int):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {
+        "items": [
+            {
+                "id": note_id,
+                "title": f"Note {note_id}",
+                "body": "Some body text " * 20,
+                "priority": Decimal("1.5"),
+                "created_at": created.isoformat(),
+            }
+            for note_id in range(size)
+        ],
+        "next_cursor": "eyJpZCI6IDUwfQ",
+        "prev_cursor": None,
+    }
+
+
+@pytest.mark.parametrize("size", [1, 50])
+def test_safe_json_response(benchmark, size):
+    data = notes_page(size)
+
+    response = benchmark(safe_json_response, data)
+
+    assert response.body.startswith(b'{"items":')
+
+
+@pytest.mark.parametrize(
+    "data", [PNG, JPEG, b"GIF89a" + b"\x00" * 4096], ids=["png", "jpeg", "unknown"]
+)
+def test_sniff_content_type(benchmark, data):
+    benchmark(sniff_content_type, data)
+
+
+@pytest.mark.parametrize(
+    "text, limit",
+    [
+        ("/api/v1/notes/42", 10e-6),
+        ("/api/v1/notes?cursor=eyJpZCI6IDUwfQ&limit=20&tag=algebra", 10e-6),
+        (
+            "/api/v1/login?email=someone@example.com&token=abc123"
+            "&card=4111-1111-1111-1111",
+            10e-6,
+        ),
+        # Длинный адрес обрезается до маскирования
+        ("/api/v1/notes?" + "q=1234&" * 10_000, 1e-3),
+    ],
+    ids=["plain", "query", "secrets", "long"],
+)
+def test_mask_sensitive_data(benchmark, text, limit):
+    benchmark(mask_sensitive_data, text)
+
+    assert_below(benchmark, limit)
+
+
+def test_note_create_validation(benchmark):
+    note = benchmark(NoteCreate.model_validate, NOTE)
+
+    assert note.priority == Decimal("2.5")
+
+
+def test_rate_limit_middleware(benchmark):
+    limited = RateLimitMiddleware(
+        endpoint,
+        backend=MemoryRateLimitBackend(),
+        rules=[
+            RateLimitRule.parse("/api/v1/files/", "10/minute"),
+            RateLimitRule.parse("/api/", "1000000/second"),
+        ],
+    )
+    scopes = [
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/notes",
+            "headers": [],
+            "client": (f"10.0.{i // 256 % 256}.{i % 256}", 50000),
+        }
+        for i in range(500)
+    ]
+
+    benchmark(AsgiBatch(limited, scopes))
+
+    assert_overhead(benchmark, AsgiBatch(endpoint, scopes), 10e-6)
+
+
+def test_metrics_middleware(benchmark):
+    scopes = [{"type": "http", "method": "GET", "path": "/bench", "headers": []}] * 500
+
+    benchmark(AsgiBatch(MetricsMiddleware(endpoint), scopes))
+
+    assert_overhead(benchmark, AsgiBatch(endpoint, scopes), 20e-6)
+
+
+@pytest.fixture
+def security_log():
+    """
+    Журнал безопасности включен, записи уходят в очередь без слушателя;
+    перехват журнала pytest на корневом логгере не измеряется
+    """
+    logger = logging.getLogger("security")
+    json_logging = JsonLogging("INFO", queue_size=1, stream=io.StringIO())
+    logger.addHandler(json_logging.handler)
+    logger.propagate = False
+    yield
+    logger.propagate = True
+    logger.removeHandler(json_logging.handler)
+
+
+def test_not_found_error_path(benchmark, security_log):
+    async def not_found(scope, receive, send):
+        response = problem_detail_handler(
+            Request(scope), ProblemDetailException(404, "Not Found", "note not found")
+        )
+        await response(scope, receive, send)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/notes/999999",
+        "query_string": b"user=someone@example.com&token=abc",
+        "headers": [(b"x-request-id", b"bench-1")],
+    }
+    batch = AsgiBatch(RequestIdMiddleware(not_found), [scope] * 200)
+
+    benchmark(batch)
+
+    assert_below(benchmark, 100e-6, len(batch.scopes))
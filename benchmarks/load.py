@@ -0,0 +1,220 @@
+"""
+Нагрузочный тест API без сети: смесь запросов из scenario.py (CRUD
+заметок, поиск, загрузки) идет через httpx.ASGITransport в приложение с
+временной БД, засеянной seed.py. Считаются задержки p50/p95/p99 по
+операциям и общая пропускная способность; результат сравнивается с
+сохраненным baseline.
+
+Запуск:
+    python benchmarks/load.py --notes 5000 --requests 3000 --concurrency 8
+    python benchmarks/load.py --save benchmarks/baselines/load.json
+    python benchmarks/load.py --compare benchmarks/baselines/load.json --threshold 25
+
+Baseline зависит от машины: после смены железа или окружения CI его
+нужно сохранить заново (make bench-baseline)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(_TMP.name, 'bench.db')}"
+)
+# Все запросы идут с одного адреса: лимит измерял бы сам себя
+os.environ["RATE_LIMIT"] = ""
+os.environ.setdefault("LOG_FORMAT", "text")
+# EXPLAIN медленных запросов сам добавлял бы время к измеряемым запросам
+os.environ.setdefault("DB_SLOW_QUERY_MS", "0")
+
+import httpx  # noqa: E402
+import seed  # noqa: E402
+from scenario import WEIGHTS, Scenario  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.routes import files  # noqa: E402
+
+# multipart пишет предупреждение на каждый запрос httpx (завершающий CRLF)
+for _name in ("multipart", "python_multipart", "security", "httpx"):
+    logging.getLogger(_name).setLevel(logging.ERROR)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+async def run(scenario: Scenario, requests: int, concurrency: int) -> Dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    remaining = requests
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            request = scenario.next_request()
+            started = time.perf_counter()
+            response = await client.request(
+                request.method, request.url, json=request.json, files=request.files
+            )
+            latencies[request.name].append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors[request.name] += 1
+                continue
+            body = response.json() if response.content else None
+            scenario.record(request, response.status_code, body)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    operations = {}
+    for name, samples in latencies.items():
+        samples.sort()
+        operations[name] = {
+            "count": len(samples),
+            "errors": errors[name],
+            "mean_ms": statistics.fmean(samples),
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+        }
+    return {
+        "requests_per_sec": requests / elapsed,
+        "errors": sum(errors.values()),
+        "operations": operations,
+    }
+
+
+def compare(result: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Регрессии: медиана задержки операции или пропускная способность хуже на
+    threshold %. p95 по нескольким сотням запросов между прогонами скачет
+    сильнее порога, поэтому только выводится
+    """
+    limit = 1 + threshold / 100
+    regressions = []
+    for name, base in baseline["operations"].items():
+        current = result["operations"].get(name)
+        if current and current["p50_ms"] > base["p50_ms"] * limit:
+            regressions.append(
+                f"{name}: p50 {current['p50_ms']:.2f}ms > "
+                f"baseline {base['p50_ms']:.2f}ms +{threshold:g}%"
+            )
+    if result["requests_per_sec"] * limit < baseline["requests_per_sec"]:
+        regressions.append(
+            f"throughput {result['requests_per_sec']:.0f} req/s < "
+            f"baseline {baseline['requests_per_sec']:.0f} req/s -{threshold:g}%"
+        )
+    return regressions
+
+
+def print_result(result: Dict, baseline: Dict = None) -> None:
+    print(
+        f"{'operation':<20} {'count':>6} {'err':>4} {'p50':>8} {'p95':>8} "
+        f"{'p99':>8} {'base p50':>9}"
+    )
+    for name, _ in WEIGHTS:
+        stats = result["operations"].get(name)
+        if stats is None:
+            continue
+        base = (baseline or {}).get("operations", {}).get(name)
+        print(
+            f"{name:<20} {stats['count']:>6} {stats['errors']:>4} "
+            f"{stats['p50_ms']:>6.2f}ms {stats['p95_ms']:>6.2f}ms "
+            f"{stats['p99_ms']:>6.2f}ms "
+            + (f"{base['p50_ms']:>7.2f}ms" if base else f"{'-':>9}")
+        )
+    print(f"throughput: {result['requests_per_sec']:.0f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--notes", type=int, default=5000, help="размер засеянной БД")
+    parser.add_argument("--requests", type=int, default=3000)
+    # SQLite пишет в один поток: при большем параллелизме задержки записи
+    # определяет очередь на блокировку БД, а не код приложения
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--upload-kb", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="сохранить результат как baseline")
+    parser.add_argument("--compare", type=Path, help="baseline для сравнения")
+    parser.add_argument(
+        "--threshold", type=float, default=25.0, help="допустимое ухудшение, %%"
+    )
+    args = parser.parse_args()
+
+    files.UPLOAD_DIR = Path(_TMP.name) / "uploads"
+    files.UPLOAD_DIR.mkdir(exist_ok=True)
+    files.thumbnail_worker.upload_dir = files.UPLOAD_DIR
+    note_ids = seed.seed(args.notes, args.seed)
+    scenario = Scenario(random.Random(args.seed), note_ids, upload_kb=args.upload_kb)
+
+    async def warmup_and_run():
+        # Один event loop: пул async engine привязан к циклу, в котором создан
+        await run(scenario, args.warmup, args.concurrency)
+        return await run(scenario, args.requests, args.concurrency)
+
+    result = asyncio.run(warmup_and_run())
+    result["config"] = {
+        "notes": args.notes,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "upload_kb": args.upload_kb,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+    baseline = None
+    if args.compare:
+        if args.compare.exists():
+            baseline = json.loads(args.compare.read_text())
+        else:
+            print(f"No baseline at {args.compare}, run make bench-baseline")
+    print_result(result, baseline)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {args.save}")
+
+    failed = result["errors"] > 0
+    if failed:
+        print(f"FAILED: {result['errors']} requests returned an error status")
+    if baseline is not None:
+        if baseline.get("config", {}).get("notes") != args.notes:
+            print("Warning: baseline was recorded with a different --notes")
+        regressions = compare(result, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
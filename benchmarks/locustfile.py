@@ -0,0 +1,53 @@
+"""
+Нагрузка на запущенный сервер тем же сценарием, что и load.py.
+
+Подготовка и запуск (лимит запросов выключен: вся нагрузка идет с
+одного адреса):
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/seed.py --notes 10000
+    DATABASE_URL=sqlite:///./bench.db RATE_LIMIT= uvicorn app.main:app --port 8000
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 \\
+        --headless --users 50 --spawn-rate 10 --run-time 1m --csv benchmarks/results/locust
+
+locust ставится отдельно: pip install -r benchmarks/requirements.txt
+"""
+
+import random
+
+from locust import HttpUser, between, task
+from scenario import API, TEMP_TITLE_PREFIX, Scenario
+
+# Сколько заметок каждый пользователь locust берет для чтения и изменения
+KNOWN_NOTES = 200
+
+
+class NotesUser(HttpUser):
+    wait_time = between(0.05, 0.2)
+
+    def on_start(self):
+        response = self.client.get(
+            f"{API}/notes?limit={KNOWN_NOTES}", name="GET /notes (setup)"
+        )
+        # Заметки, созданные другими пользователями locust, те же и удалят
+        note_ids = [
+            note["id"]
+            for note in response.json()["items"]
+            if not note["title"].startswith(TEMP_TITLE_PREFIX)
+        ]
+        self.scenario = Scenario(random.Random(), note_ids)
+
+    @task
+    def api_request(self):
+        request = self.scenario.next_request()
+        with self.client.request(
+            request.method,
+            request.url,
+            name=request.name,
+            json=request.json,
+            files=request.files,
+            catch_response=True,
+        ) as response:
+            if response.status_code >= 400:
+                response.failure(f"HTTP {response.status_code}")
+                return
+            body = response.json() if response.content else None
+            self.scenario.record(request, response.status_code, body)
@@ -0,0 +1,157 @@
+"""
+Сценарий нагрузки на API заметок: смесь запросов и их веса. Общий для
+load.py (in-process, httpx) и locustfile.py (запущенный сервер), чтобы оба
+измеряли одну и ту же нагрузку
+"""
+
+import io
+import math
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow опционален для locust
+    Image = None
+
+API = "/api/v1"
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+# Слова для заголовков и текста: заголовок допускает только латиницу,
+# цифры, пробелы и - . ,
+WORDS = (
+    "algebra calculus vector matrix derivative integral limit series graph "
+    "theorem proof lemma lecture seminar exam chapter summary outline review "
+    "python database index query cache network protocol kernel thread memory"
+).split()
+
+# Заголовок заметок, созданных сценарием (и затем удаляемых им)
+TEMP_TITLE_PREFIX = "Temp"
+
+LIST = "GET /notes"
+READ = "GET /notes/{id}"
+SEARCH = "GET /?search"
+CREATE = "POST /notes"
+UPDATE = "PUT /notes/{id}"
+DELETE = "DELETE /notes/{id}"
+UPLOAD = "POST /files/upload"
+
+# Преобладает чтение, как у клиентов приложения
+WEIGHTS: Tuple[Tuple[str, int], ...] = (
+    (LIST, 5),
+    (READ, 5),
+    (SEARCH, 3),
+    (CREATE, 2),
+    (UPDATE, 1),
+    (DELETE, 1),
+    (UPLOAD, 1),
+)
+
+
+def note_title(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).capitalize()
+
+
+def note_body(rng: random.Random, words: int = 80) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def png_payload(rng: random.Random, size_kb: int) -> bytes:
+    """
+    PNG из случайных пикселей (шум почти не сжимается, размер около
+    size_kb): хранилище дедуплицирует одинаковые файлы, а настоящее
+    изображение нагружает и фоновую генерацию миниатюр. Без Pillow -
+    сигнатура PNG и случайные байты
+    """
+    if Image is None:
+        return PNG_HEADER + rng.randbytes(max(size_kb * 1024 - len(PNG_HEADER), 1))
+    side = max(1, math.isqrt(size_kb * 1024 // 3))
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+@dataclass
+class ApiRequest:
+    # Метка для статистики - шаблон пути, а не сам путь
+    name: str
+    method: str
+    url: str
+    json: Optional[Dict[str, Any]] = None
+    files: Optional[Dict[str, Tuple[str, bytes, str]]] = None
+    note_id: Optional[int] = None
+
+
+class Scenario:
+    """
+    Выбирает следующий запрос по весам WEIGHTS. Читаются и изменяются
+    засеянные заметки, удаляются только созданные самим сценарием: данные
+    не убывают, и параллельный запрос не наткнется на удаленную заметку
+    """
+
+    def __init__(
+        self,
+        rng: random.Random,
+        note_ids: List[int],
+        upload_kb: int = 64,
+        page_size: int = 20,
+    ):
+        self.rng = rng
+        self.note_ids = list(note_ids)
+        self.created: List[int] = []
+        self.upload_kb = upload_kb
+        self.page_size = page_size
+        self._names = [name for name, _ in WEIGHTS]
+        self._weights = [weight for _, weight in WEIGHTS]
+
+    def next_request(self) -> ApiRequest:
+        name = self.rng.choices(self._names, self._weights)[0]
+        if name in (READ, UPDATE) and not self.note_ids:
+            name = CREATE
+        if name == DELETE and not self.created:
+            name = CREATE
+
+        if name == LIST:
+            return ApiRequest(name, "GET", f"{API}/notes?limit={self.page_size}")
+        if name == READ:
+            note_id = self.rng.choice(self.note_ids)
+            return ApiRequest(name, "GET", f"{API}/notes/{note_id}", note_id=note_id)
+        if name == SEARCH:
+            term = self.rng.choice(WORDS)
+            return ApiRequest(
+                name, "GET", f"{API}/?search={term}&limit={self.page_size}"
+            )
+        if name == CREATE:
+            return ApiRequest(name, "POST", f"{API}/notes", json=self._note())
+        if name == UPDATE:
+            note_id = self.rng.choice(self.note_ids)
+            return ApiRequest(
+                name,
+                "PUT",
+                f"{API}/notes/{note_id}",
+                json=self._note(),
+                note_id=note_id,
+            )
+        if name == DELETE:
+            note_id = self.created.pop(self.rng.randrange(len(self.created)))
+            return ApiRequest(name, "DELETE", f"{API}/notes/{note_id}", note_id=note_id)
+        payload = png_payload(self.rng, self.upload_kb)
+        return ApiRequest(
+            name,
+            "POST",
+            f"{API}/files/upload",
+            files={"file": ("bench.png", payload, "image/png")},
+        )
+
+    def record(self, request: ApiRequest, status: int, body: Any) -> None:
+        """Запоминает id созданных заметок для удаления"""
+        if request.name == CREATE and status == 200 and isinstance(body, dict):
+            self.created.append(body["id"])
+
+    def _note(self) -> Dict[str, Any]:
+        return {
+            "title": f"{TEMP_TITLE_PREFIX} {note_title(self.rng)}",
+            "body": note_body(self.rng),
+        }
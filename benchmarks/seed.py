@@ -0,0 +1,79 @@
+"""
+Заполняет БД заметками пользователя по умолчанию для нагрузочных тестов.
+Схема создается миграциями приложения, FTS индекс обновляется триггерами.
+Содержимое детерминировано (--seed), поэтому прогоны сравнимы.
+
+Запуск:
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/seed.py --notes 10000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import insert, select
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from scenario import note_body, note_title  # noqa: E402
+
+from app.auth import DEFAULT_USER_ID  # noqa: E402
+from app.database import database  # noqa: E402
+from app.models.note import Note, User  # noqa: E402
+
+BATCH_SIZE = 1000
+
+
+def seed(notes: int, seed: int = 0, engine=None) -> List[int]:
+    """Добавляет notes заметок; возвращает id всех заметок пользователя"""
+    engine = engine or database.engine
+    database.migrate_database(engine)
+    rng = random.Random(seed)
+
+    with engine.begin() as connection:
+        if connection.scalar(select(User.id).where(User.id == DEFAULT_USER_ID)) is None:
+            connection.execute(
+                insert(User).values(
+                    id=DEFAULT_USER_ID,
+                    username="bench",
+                    email="bench@example.com",
+                    hashed_password="-",
+                )
+            )
+        for start in range(0, notes, BATCH_SIZE):
+            connection.execute(
+                insert(Note),
+                [
+                    {
+                        "title": note_title(rng),
+                        "body": note_body(rng),
+                        "user_id": DEFAULT_USER_ID,
+                    }
+                    for _ in range(min(BATCH_SIZE, notes - start))
+                ],
+            )
+        return list(
+            connection.scalars(select(Note.id).where(Note.user_id == DEFAULT_USER_ID))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    note_ids = seed(args.notes, args.seed)
+    print(
+        f"{args.notes} notes added in {time.perf_counter() - started:.1f}s, "
+        f"{len(note_ids)} in total ({database.SQLALCHEMY_DATABASE_URL})"
+    )
+
+
+if __name__ == "__main__":
+    main()
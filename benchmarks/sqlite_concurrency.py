@@ -0,0 +1,109 @@
+"""
+Бенчмарк конкурентного чтения/записи SQLite: стандартные настройки
+(rollback journal) против профиля из app.database.database (WAL и PRAGMA).
+
+Запуск:
+    python benchmarks/sqlite_concurrency.py --seconds 5 --readers 8 --writers 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.database import database  # noqa: E402
+from app.models.note import Base, Note  # noqa: E402
+
+# Без профиля: настройки SQLite по умолчанию (rollback journal, synchronous=FULL)
+DEFAULT_PRAGMAS = [("journal_mode", "DELETE"), ("synchronous", "FULL")]
+
+
+def run(pragmas, seconds: float, readers: int, writers: int, seed_rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, **database.engine_options(url))
+        database.apply_sqlite_profile(engine, pragmas)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            db.add_all(
+                Note(title=f"Seed {i}", body="x" * 500, user_id=1)
+                for i in range(seed_rows)
+            )
+            db.commit()
+
+        stats = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def count(key):
+            with lock:
+                stats[key] += 1
+
+        def reader():
+            while time.perf_counter() < deadline:
+                try:
+                    with Session() as db:
+                        db.execute(
+                            select(Note.id, Note.title)
+                            .order_by(Note.id.desc())
+                            .limit(50)
+                        ).all()
+                        db.scalar(select(func.count(Note.id)))
+                    count("reads")
+                except OperationalError:
+                    count("locked")
+
+        def writer():
+            while time.perf_counter() < deadline:
+                try:
+                    with Session() as db:
+                        db.add(Note(title="Bench", body="y" * 500, user_id=1))
+                        db.commit()
+                    count("writes")
+                except OperationalError:
+                    count("locked")
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {key: value / seconds for key, value in stats.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'locked/s':>12}")
+    for name, pragmas in (
+        ("default", DEFAULT_PRAGMAS),
+        ("tuned", database.sqlite_pragmas()),
+    ):
+        result = run(pragmas, args.seconds, args.readers, args.writers, args.seed_rows)
+        print(
+            f"{name:<10}{result['reads']:>12.0f}"
+            f"{result['writes']:>12.0f}{result['locked']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
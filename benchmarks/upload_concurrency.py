@@ -0,0 +1,119 @@
+"""
+Бенчмарк загрузок файлов: запись на event loop против ограниченного пула
+потоков (app.utils.io_pool). Пока идут параллельные загрузки, измеряется
+задержка /health - она показывает, насколько блокируется event loop.
+
+Запуск:
+    python benchmarks/upload_concurrency.py --uploads 64 --concurrency 16 --size-kb 4096
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(_TMP.name, 'bench.db')}"
+)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.routes import files  # noqa: E402
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+# multipart пишет предупреждение на каждый запрос httpx (завершающий CRLF)
+for _name in ("multipart", "python_multipart"):
+    logging.getLogger(_name).setLevel(logging.ERROR)
+
+
+class InlinePool:
+    """Прежнее поведение: блокирующий вызов прямо в event loop"""
+
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def run(pool, uploads: int, concurrency: int, size_kb: int) -> dict:
+    files.upload_pool = pool
+    body = os.urandom(size_kb * 1024 - len(PNG_HEADER) - 8)
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+    latencies = []
+
+    async def upload(client: httpx.AsyncClient, index: int):
+        # Уникальное содержимое: хранилище дедуплицирует одинаковые файлы
+        payload = PNG_HEADER + index.to_bytes(8, "big") + body
+        async with semaphore:
+            response = await client.post(
+                "/api/v1/files/upload",
+                files={"file": ("bench.png", payload, "image/png")},
+            )
+            statuses.append(response.status_code)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, stop, latencies))
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(client, i) for i in range(uploads)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    latencies.sort()
+    return {
+        "uploads_per_sec": uploads / elapsed,
+        "mb_per_sec": uploads * size_kb / 1024 / elapsed,
+        "rejected": sum(1 for status in statuses if status == 503),
+        "failed": sum(1 for status in statuses if status not in (200, 503)),
+        "health_p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "health_max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--size-kb", type=int, default=4096)
+    args = parser.parse_args()
+
+    files.UPLOAD_DIR = Path(_TMP.name) / "uploads"
+    files.UPLOAD_DIR.mkdir()
+    pooled = files.upload_pool
+
+    print(
+        f"{'mode':<8} {'uploads/s':>10} {'MB/s':>8} {'503':>5} {'err':>5} "
+        f"{'health p50':>11} {'health max':>11}"
+    )
+    for name, pool in (("inline", InlinePool()), ("pool", pooled)):
+        result = asyncio.run(run(pool, args.uploads, args.concurrency, args.size_kb))
+        print(
+            f"{name:<8} {result['uploads_per_sec']:>10.1f} {result['mb_per_sec']:>8.1f} "
+            f"{result['rejected']:>5} {result['failed']:>5} "
+            f"{result['health_p50_ms']:>9.2f}ms {result['health_max_ms']:>9.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
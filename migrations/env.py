@@ -0,0 +1,71 @@
+"""
+Окружение Alembic. Запускается из CLI (alembic upgrade head) или из
+приложения через app.database.database.migrate_database, которое передает
+готовое соединение в config.attributes["connection"]
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.database.database import SQLALCHEMY_DATABASE_URL
+from app.database.search import include_in_migrations
+from app.models.note import Base
+
+config = context.config
+
+# Из приложения логирование уже настроено, fileConfig его бы сбросил
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_in_migrations,
+        # SQLite не умеет ALTER большинства конструкций: batch пересоздает таблицу
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    engine = create_engine(database_url())
+    try:
+        with engine.begin() as connection:
+            run_migrations(connection)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
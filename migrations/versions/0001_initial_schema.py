@@ -0,0 +1,129 @@
+"""initial schema
+
+Схема, которую до появления миграций создавал create_tables().
+Базы, созданные тогда, не имеют таблицы alembic_version: ревизия
+пропускает уже существующие таблицы и индексы и создает только недостающие.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_table(name: str, *columns) -> None:
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _create_index(name: str, table: str, columns, unique: bool = False) -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in existing:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    _create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("hashed_password", sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("username"),
+        sa.UniqueConstraint("email"),
+    )
+    _create_index("ix_users_id", "users", ["id"])
+
+    _create_table(
+        "notes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _create_index("ix_notes_id", "notes", ["id"])
+    _create_index("ix_notes_updated_at_id", "notes", ["updated_at", "id"])
+
+    _create_table(
+        "note_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("note_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _create_index(
+        "ix_note_tombstones_deleted_at_note_id",
+        "note_tombstones",
+        ["deleted_at", "note_id"],
+    )
+
+    _create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _create_index("ix_tags_id", "tags", ["id"])
+    _create_index("uq_tags_user_id_name", "tags", ["user_id", "name"], unique=True)
+
+    _create_table(
+        "note_tags",
+        sa.Column("note_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["note_id"], ["notes.id"]),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"]),
+        sa.PrimaryKeyConstraint("note_id", "tag_id"),
+    )
+    _create_index("ix_note_tags_tag_id_note_id", "note_tags", ["tag_id", "note_id"])
+
+    _create_table(
+        "stored_files",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("path", sa.String(length=255), nullable=False),
+        sa.Column("content_type", sa.String(length=50), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+
+    _create_table(
+        "thumbnail_jobs",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["sha256"], ["stored_files.sha256"]),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    _create_index("ix_thumbnail_jobs_status", "thumbnail_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_table("thumbnail_jobs")
+    op.drop_table("stored_files")
+    op.drop_table("note_tags")
+    op.drop_table("tags")
+    op.drop_table("note_tombstones")
+    op.drop_table("notes")
+    op.drop_table("users")
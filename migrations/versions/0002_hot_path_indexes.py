@@ -0,0 +1,33 @@
+"""hot path indexes
+
+Индексы под основные запросы заметок:
+- ix_notes_created_at_id: страница списка ORDER BY created_at DESC, id DESC
+  читается по индексу без сортировки всей таблицы
+- ix_notes_user_id_created_at_id: то же для списка заметок одного
+  пользователя; левый префикс (user_id) обслуживает внешний ключ
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_notes_created_at_id", "notes", ["created_at", "id"])
+    op.create_index(
+        "ix_notes_user_id_created_at_id", "notes", ["user_id", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_user_id_created_at_id", table_name="notes")
+    op.drop_index("ix_notes_created_at_id", table_name="notes")
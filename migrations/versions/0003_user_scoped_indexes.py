@@ -0,0 +1,76 @@
+"""user scoped indexes
+
+Запросы к заметкам теперь всегда фильтруются по пользователю:
+- ix_notes_user_id_created_at_id дополнен updated_at: страница списка и
+  ее ETag читаются только из индекса; ix_notes_created_at_id больше не нужен
+- ix_notes_user_id_updated_at_id заменяет ix_notes_updated_at_id для
+  выборки изменений (GET /notes/changes)
+- note_tombstones получает user_id и индекс (user_id, deleted_at, note_id).
+  До этой ревизии все заметки создавались от тестового пользователя 1,
+  поэтому существующие следы удаления отдаются ему
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_USER_ID = 1
+
+
+def upgrade() -> None:
+    op.drop_index("ix_notes_created_at_id", table_name="notes")
+    op.drop_index("ix_notes_user_id_created_at_id", table_name="notes")
+    op.drop_index("ix_notes_updated_at_id", table_name="notes")
+    op.create_index(
+        "ix_notes_user_id_created_at_id",
+        "notes",
+        ["user_id", "created_at", "id", "updated_at"],
+    )
+    op.create_index(
+        "ix_notes_user_id_updated_at_id", "notes", ["user_id", "updated_at", "id"]
+    )
+
+    with op.batch_alter_table("note_tombstones") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                nullable=False,
+                server_default=str(LEGACY_USER_ID),
+            )
+        )
+        batch_op.drop_index("ix_note_tombstones_deleted_at_note_id")
+    # server_default нужен только для заполнения существующих строк
+    with op.batch_alter_table("note_tombstones") as batch_op:
+        batch_op.alter_column("user_id", server_default=None)
+        batch_op.create_index(
+            "ix_note_tombstones_user_id_deleted_at_note_id",
+            ["user_id", "deleted_at", "note_id"],
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("note_tombstones") as batch_op:
+        batch_op.drop_index("ix_note_tombstones_user_id_deleted_at_note_id")
+        batch_op.drop_column("user_id")
+        batch_op.create_index(
+            "ix_note_tombstones_deleted_at_note_id", ["deleted_at", "note_id"]
+        )
+
+    op.drop_index("ix_notes_user_id_updated_at_id", table_name="notes")
+    op.drop_index("ix_notes_user_id_created_at_id", table_name="notes")
+    op.create_index("ix_notes_updated_at_id", "notes", ["updated_at", "id"])
+    op.create_index(
+        "ix_notes_user_id_created_at_id", "notes", ["user_id", "created_at", "id"]
+    )
+    op.create_index("ix_notes_created_at_id", "notes", ["created_at", "id"])
@@ -0,0 +1,73 @@
+"""notes fulltext
+
+FTS5 индекс notes_fts и триггеры, которые синхронизируют его с notes.
+Раньше их создавал только migrate_database() при запуске приложения, и
+база, обновленная через `alembic upgrade head` (DB_AUTO_MIGRATE=false),
+оставалась без индекса. Существующие заметки индексируются при создании
+таблицы. Только для SQLite: на других СУБД ревизия ничего не делает.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+        title, body,
+        content='notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE OF title, body ON notes
+    BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    # Базы, где индекс уже создал setup_fulltext, не переиндексируются
+    exists = sa.inspect(bind).has_table("notes_fts")
+    for statement in FTS_DDL:
+        op.execute(statement)
+    if not exists:
+        op.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("notes_fts_au", "notes_fts_ad", "notes_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS notes_fts")
@@ -0,0 +1,60 @@
+"""tags unique per user
+
+Базы, созданные до миграций, получили tags с глобальным UNIQUE (name):
+ревизия 0001 такую таблицу не трогает, и тег с именем, уже занятым другим
+пользователем, создать нельзя. Ограничение удаляется; уникальность в
+пределах пользователя обеспечивает индекс uq_tags_user_id_name.
+В SQLite ограничение без имени удаляется только пересозданием таблицы.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _tags_table() -> sa.Table:
+    """Таблица tags в том виде, как ее создает 0001"""
+    return sa.Table(
+        "tags",
+        sa.MetaData(),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.Index("ix_tags_id", "id"),
+        sa.Index("uq_tags_user_id_name", "user_id", "name", unique=True),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    global_unique = [
+        constraint
+        for constraint in sa.inspect(bind).get_unique_constraints("tags")
+        if constraint["column_names"] == ["name"]
+    ]
+    if not global_unique:
+        return
+    if bind.dialect.name == "sqlite":
+        with op.batch_alter_table("tags", copy_from=_tags_table(), recreate="always"):
+            pass
+    else:
+        for constraint in global_unique:
+            op.drop_constraint(constraint["name"], "tags", type_="unique")
+
+
+def downgrade() -> None:
+    # Глобальная уникальность не восстанавливается: имена тегов разных
+    # пользователей к этому моменту могут совпадать
+    pass
@@ -0,0 +1,44 @@
+"""file references
+
+Ссылки на файлы учитываются по пользователям: DELETE /files/{name}
+убирает только ссылку того, кто загружал файл, а не любую из общего
+счетчика. До этой ревизии все файлы загружались от тестового
+пользователя 1, поэтому существующие ссылки отдаются ему
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_USER_ID = 1
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_references",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["sha256"], ["stored_files.sha256"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("sha256", "user_id"),
+    )
+    op.execute(
+        "INSERT INTO file_references (sha256, user_id, count) "
+        f"SELECT sha256, {LEGACY_USER_ID}, ref_count FROM stored_files "
+        "WHERE ref_count > 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("file_references")
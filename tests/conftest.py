@@ -1,7 +1,82 @@
 # tests/conftest.py
+import os
 import sys
 from pathlib import Path
 
+import pytest
+import pytest_asyncio
+
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+# Тесты шлют сотни запросов с одного адреса; лимитер проверяется
+# отдельно в test_rate_limiting.py
+os.environ.setdefault("RATE_LIMIT", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database.database import async_database_url  # noqa: E402
+from app.database.search import setup_fulltext  # noqa: E402
+from app.models.note import Base  # noqa: E402
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    """Изолированная файловая SQLite БД со схемой и FTS индексом"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    setup_fulltext(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sync_db(sync_engine):
+    """Синхронная сессия для подготовки данных"""
+    with Session(sync_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def async_db(sync_engine):
+    """Async сессия к той же БД, как в обработчиках запросов"""
+    url = sync_engine.url.render_as_string(hide_password=False)
+    engine = create_async_engine(async_database_url(url))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def other_user():
+    """Запросы к app.main.app от имени другого пользователя"""
+    from app.auth import DEFAULT_USER_ID, get_current_user_id
+    from app.main import app
+
+    other_user_id = DEFAULT_USER_ID + 1000
+
+    async def current_user_id():
+        return other_user_id
+
+    app.dependency_overrides[get_current_user_id] = current_user_id
+    yield other_user_id
+    app.dependency_overrides.pop(get_current_user_id, None)
+
+
+@pytest.fixture
+def create_note():
+    """Создает заметку текущего пользователя через API и возвращает ее id"""
+    from app.main import app
+
+    client = TestClient(app)
+
+    def create(title="Test note", body="body"):
+        response = client.post("/api/v1/notes", json={"title": title, "body": body})
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    return create
@@ -54,7 +54,6 @@ class TestErrorHandling:
         assert "item not found" in data["detail"]
         assert "correlation_id" in data
 
-    @pytest.mark.skip(reason="Need to fix logger issue in generic_exception_handler")
     def test_generic_exception_handling(self):
         """Тест обработки неожиданных исключений"""
         # Используем существующее приложение и создаем тестовый endpoint
@@ -73,7 +72,7 @@ class TestErrorHandling:
         def test_error():
             raise ValueError("Test unexpected error")
 
-        test_client = TestClient(test_app)
+        test_client = TestClient(test_app, raise_server_exceptions=False)
         response = test_client.get("/test-error")
 
         assert response.status_code == 500
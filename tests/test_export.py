@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.export import iter_notes_csv, iter_notes_ndjson
+from app.main import app
+from app.models.note import Base, Note
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        for i in range(5):
+            db.add(Note(title=f"Note {i}", body=f"body {i}", user_id=1))
+        db.add(Note(title="=HYPERLINK(1)", body="-2+3", user_id=1))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+class TestExportStreams:
+    """Тесты потоковой выгрузки"""
+
+    def test_ndjson_is_chunked_by_batch(self, session_factory):
+        chunks = list(iter_notes_ndjson(session_factory, 1, batch_size=2))
+
+        assert len(chunks) == 3
+        records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        assert [r["id"] for r in records] == [1, 2, 3, 4, 5, 6]
+        assert records[0]["title"] == "Note 0"
+        assert records[0]["created_at"] is not None
+
+    def test_csv_has_header_and_neutralized_formulas(self, session_factory):
+        data = b"".join(iter_notes_csv(session_factory, 1, batch_size=4)).decode()
+
+        rows = list(csv.DictReader(io.StringIO(data)))
+        assert len(rows) == 6
+        assert rows[5]["title"] == "'=HYPERLINK(1)"
+        assert rows[5]["body"] == "'-2+3"
+
+
+def test_export_endpoint_streams_ndjson():
+    client.post("/api/v1/notes", json={"title": "Exported", "body": "text"})
+
+    response = client.get("/api/v1/notes/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert any(r["title"] == "Exported" for r in records)
+
+
+def test_export_endpoint_csv_and_unknown_format():
+    response = client.get("/api/v1/notes/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.text.startswith("id,title,body,user_id,created_at,updated_at")
+
+    response = client.get("/api/v1/notes/export", params={"format": "xml"})
+    assert response.status_code == 422
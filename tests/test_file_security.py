@@ -1,10 +1,22 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import threading
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 
+from app.auth import get_current_user_id
 from app.main import app
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
+from app.routes import files
+from app.utils import file_security
+from app.utils.file_response import StoredFileResponse, parse_range
 from app.utils.file_security import secure_save_file, sniff_content_type
+from app.utils.io_pool import BoundedIOPool, PoolOverloadedError
 
 client = TestClient(app)
 
@@ -19,9 +31,7 @@ class TestFileSecurity:
 
     def teardown_method(self):
         """Очищаем тестовую директорию"""
-        for file in self.test_dir.glob("*"):
-            file.unlink()
-        self.test_dir.rmdir()
+        shutil.rmtree(self.test_dir)
 
     def test_sniff_content_type_png(self):
         """Тест определения PNG по magic bytes"""
@@ -47,8 +57,9 @@ class TestFileSecurity:
 
         assert saved_path.exists()
         assert saved_path.suffix == ".png"
-        # Исправленная проверка - файл должен быть внутри test_dir
-        assert saved_path.parent == self.test_dir.resolve()
+        # Файл внутри test_dir, в шардированной директории ab/cd/
+        relative = saved_path.relative_to(self.test_dir.resolve())
+        assert relative.parts[:2] == (saved_path.stem[:2], saved_path.stem[2:4])
 
     def test_secure_save_file_too_large(self):
         """Тест отклонения слишком большого файла"""
@@ -64,6 +75,220 @@ class TestFileSecurity:
         with pytest.raises(ValueError, match="Unsupported file type"):
             secure_save_file(self.test_dir, invalid_data, "test.txt")
 
+    def test_secure_save_stream_valid_jpeg(self):
+        """Потоковое сохранение JPEG маленькими chunk"""
+        jpeg_data = b"\xff\xd8" + b"x" * 10_000 + b"\xff\xd9"
+
+        saved = file_security.secure_save_stream(
+            self.test_dir, io.BytesIO(jpeg_data), chunk_size=1000
+        )
+
+        assert saved.size == len(jpeg_data)
+        assert saved.content_type == "image/jpeg"
+        assert saved.path.read_bytes() == jpeg_data
+        assert saved.path.is_relative_to(self.test_dir.resolve())
+
+    def test_secure_save_stream_stops_reading_at_limit(self):
+        """Слишком большой поток прерывается сразу после превышения лимита"""
+
+        class EndlessJpeg(io.RawIOBase):
+            def __init__(self):
+                self.read_bytes = 0
+
+            def read(self, size=-1):
+                chunk = (b"\xff\xd8" if self.read_bytes == 0 else b"") + b"x" * size
+                chunk = chunk[:size]
+                self.read_bytes += len(chunk)
+                return chunk
+
+        stream = EndlessJpeg()
+        with pytest.raises(ValueError, match="File too large"):
+            file_security.secure_save_stream(
+                self.test_dir, stream, max_size=100_000, chunk_size=4096
+            )
+
+        assert stream.read_bytes <= 100_000 + 4096
+        # Временный файл удален, в директории ничего не осталось
+        assert list(self.test_dir.iterdir()) == []
+
+    def test_secure_save_stream_rejects_before_writing(self):
+        """Неподдерживаемый тип отклоняется по первому chunk"""
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            file_security.secure_save_stream(
+                self.test_dir, io.BytesIO(b"GIF89a" + b"x" * 100)
+            )
+
+        assert list(self.test_dir.iterdir()) == []
+
+    def test_secure_save_stream_jpeg_without_eoi(self):
+        """JPEG без маркера конца отклоняется, временный файл удаляется"""
+        truncated = b"\xff\xd8" + b"x" * 5000
+
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            file_security.secure_save_stream(
+                self.test_dir, io.BytesIO(truncated), chunk_size=1024
+            )
+
+        assert list(self.test_dir.iterdir()) == []
+
+    def test_duplicate_content_is_stored_once(self):
+        """Повторная загрузка того же содержимого не пишет на диск"""
+        png_data = b"\x89PNG\r\n\x1a\n" + b"same" * 1000
+
+        first = file_security.secure_save_stream(self.test_dir, io.BytesIO(png_data))
+        mtime = first.path.stat().st_mtime_ns
+        second = file_security.secure_save_stream(self.test_dir, io.BytesIO(png_data))
+
+        assert first.created and not second.created
+        assert first.path == second.path
+        assert first.sha256 == second.sha256 == first.path.stem
+        assert second.path.stat().st_mtime_ns == mtime
+        stored = [p for p in self.test_dir.rglob("*") if p.is_file()]
+        assert stored == [first.path.relative_to(Path.cwd())]
+
+    def test_unseekable_stream_is_hashed_while_writing(self):
+        """Поток без seek пишется во временный файл и дедуплицируется"""
+
+        class Unseekable(io.RawIOBase):
+            def __init__(self, data):
+                self.inner = io.BytesIO(data)
+
+            def seekable(self):
+                return False
+
+            def read(self, size=-1):
+                return self.inner.read(size)
+
+        jpeg_data = b"\xff\xd8" + b"y" * 5000 + b"\xff\xd9"
+        first = file_security.secure_save_stream(
+            self.test_dir, Unseekable(jpeg_data), chunk_size=1024
+        )
+        second = file_security.secure_save_stream(
+            self.test_dir, Unseekable(jpeg_data), chunk_size=1024
+        )
+
+        assert first.created and not second.created
+        assert first.path.read_bytes() == jpeg_data
+        # Временные .part файлы не остаются
+        assert not list(self.test_dir.glob(".upload-*"))
+
+    def test_upload_rejected_by_content_length(self):
+        """Middleware отвечает 413 по Content-Length, не читая тело"""
+        called = []
+
+        async def downstream(scope, receive, send):
+            called.append(scope)
+
+        async def receive():
+            raise AssertionError("body must not be read")
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = UploadSizeLimitMiddleware(
+            downstream, path_prefix="/api/v1/files/upload", max_body_size=1000
+        )
+        scope = {
+            "type": "http",
+            "path": "/api/v1/files/upload",
+            "headers": [(b"content-length", b"10000000")],
+        }
+
+        asyncio.run(middleware(scope, receive, send))
+
+        assert called == []
+        assert sent[0]["status"] == 413
+
+    def test_chunked_upload_rejected_after_limit(self):
+        """
+        Без Content-Length (Transfer-Encoding: chunked) тело читается только
+        до лимита, а не целиком перед ответом 413
+        """
+        boundary = b"limit-boundary"
+        head = (
+            b"--" + boundary + b"\r\n"
+            b'Content-Disposition: form-data; name="file"; filename="big.jpg"\r\n'
+            b"Content-Type: image/jpeg\r\n\r\n\xff\xd8"
+        )
+        chunk = b"x" * 64 * 1024
+        total = 40 * 1024 * 1024
+        read = 0
+
+        async def receive():
+            nonlocal read
+            body = head if read == 0 else chunk
+            read += len(body)
+            return {"type": "http.request", "body": body, "more_body": read < total}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/api/v1/files/upload",
+            "raw_path": b"/api/v1/files/upload",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"transfer-encoding", b"chunked"),
+                (
+                    b"content-type",
+                    b"multipart/form-data; boundary=" + boundary,
+                ),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+
+        asyncio.run(app(scope, receive, send))
+
+        starts = [m for m in sent if m["type"] == "http.response.start"]
+        assert [m["status"] for m in starts] == [413]
+        body = b"".join(m.get("body", b"") for m in sent[1:])
+        assert json.loads(body)["type"] == "/errors/file-too-large"
+        assert read <= file_security.MAX_FILE_SIZE + 128 * 1024
+
+    def test_streamed_body_within_limit_is_passed_through(self):
+        chunks = [b"a" * 400, b"b" * 400, b""]
+        received = []
+
+        async def downstream(scope, receive, send):
+            while True:
+                message = await receive()
+                received.append(message["body"])
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        async def receive():
+            body = chunks.pop(0)
+            return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = UploadSizeLimitMiddleware(
+            downstream, path_prefix="/api/v1/files/upload", max_body_size=1000
+        )
+        scope = {"type": "http", "path": "/api/v1/files/upload", "headers": []}
+
+        asyncio.run(middleware(scope, receive, send))
+
+        assert b"".join(received) == b"a" * 400 + b"b" * 400
+        assert sent[0]["status"] == 200
+
     def test_file_upload_endpoint_success(self):
         """Тест успешной загрузки файла через endpoint"""
         png_data = b"\x89PNG\r\n\x1a\n" + b"fake_png_content"
@@ -76,6 +301,9 @@ class TestFileSecurity:
         data = response.json()
         assert "saved_as" in data
         assert data["filename"] == "test.png"
+        # Файл хранится по хэшу содержимого: без удаления следующий запуск
+        # получил бы deduplicated=True от оставшейся копии
+        assert client.delete(f"/api/v1/files/{data['saved_as']}").status_code == 204
 
     def test_file_upload_too_large(self):
         """Тест отклонения слишком большого файла через endpoint"""
@@ -105,3 +333,231 @@ class TestFileSecurity:
         assert response.status_code == 415
         error_data = response.json()
         assert error_data["type"] == "/errors/unsupported-file-type"
+
+
+class TestStoredFileReferences:
+    """Учет ссылок на файлы при загрузке и удалении через endpoint"""
+
+    def upload(self, data):
+        response = client.post(
+            "/api/v1/files/upload", files={"file": ("dup.png", data, "image/png")}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_duplicate_uploads_share_one_file(self):
+        png_data = b"\x89PNG\r\n\x1a\n" + os.urandom(2048)
+
+        first = self.upload(png_data)
+        second = self.upload(png_data)
+
+        assert first["deduplicated"] is False
+        assert second["deduplicated"] is True
+        assert first["saved_as"] == second["saved_as"]
+        name = first["saved_as"]
+        path = files.UPLOAD_DIR / name[:2] / name[2:4] / name
+        assert path.read_bytes() == png_data
+
+        # Файл удаляется только вместе с последней ссылкой
+        assert client.delete(f"/api/v1/files/{name}").status_code == 204
+        assert path.exists()
+        assert client.delete(f"/api/v1/files/{name}").status_code == 204
+        assert not path.exists()
+        assert client.delete(f"/api/v1/files/{name}").status_code == 404
+
+    def test_delete_releases_only_own_references(self, other_user):
+        png_data = b"\x89PNG\r\n\x1a\n" + os.urandom(2048)
+        name = self.upload(png_data)["saved_as"]
+        path = files.UPLOAD_DIR / name[:2] / name[2:4] / name
+        as_other_user = app.dependency_overrides.pop(get_current_user_id)
+
+        # Загрузка другого пользователя не удаляется чужими запросами
+        for _ in range(3):
+            assert client.delete(f"/api/v1/files/{name}").status_code == 404
+        assert path.exists()
+
+        assert self.upload(png_data)["deduplicated"] is True
+        assert client.delete(f"/api/v1/files/{name}").status_code == 204
+        assert client.delete(f"/api/v1/files/{name}").status_code == 404
+        assert path.exists()
+
+        app.dependency_overrides[get_current_user_id] = as_other_user
+        assert client.delete(f"/api/v1/files/{name}").status_code == 204
+        assert not path.exists()
+
+    def test_delete_rejects_invalid_name(self):
+        response = client.delete("/api/v1/files/..%2Fstudy_notes.db")
+        assert response.status_code == 404
+
+
+class TestFileDownload:
+    """Отдача файлов: ETag, 304 и диапазоны байт"""
+
+    def setup_method(self):
+        self.data = b"\x89PNG\r\n\x1a\n" + os.urandom(200_000)
+        response = client.post(
+            "/api/v1/files/upload", files={"file": ("img.png", self.data, "image/png")}
+        )
+        self.url = f"/api/v1/files/{response.json()['saved_as']}"
+
+    def teardown_method(self):
+        client.delete(self.url)
+
+    def test_full_download_with_cache_headers(self):
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.content == self.data
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == f'"{self.url.rsplit("/", 1)[1][:64]}"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "immutable" in response.headers["cache-control"]
+        assert "last-modified" in response.headers
+
+    def test_if_none_match_returns_304(self):
+        etag = client.get(self.url).headers["etag"]
+
+        response = client.get(self.url, headers={"If-None-Match": f'"other", W/{etag}'})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = client.get(self.url).headers["last-modified"]
+
+        response = client.get(self.url, headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+
+    def test_range_request(self):
+        response = client.get(self.url, headers={"Range": "bytes=100-199"})
+
+        assert response.status_code == 206
+        assert response.content == self.data[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(self.data)}"
+        assert response.headers["content-length"] == "100"
+
+    def test_suffix_range_request(self):
+        response = client.get(self.url, headers={"Range": "bytes=-70000"})
+
+        assert response.status_code == 206
+        assert response.content == self.data[-70000:]
+
+    def test_if_range_mismatch_returns_full_file(self):
+        response = client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+        )
+
+        assert response.status_code == 200
+        assert response.content == self.data
+
+    def test_unsatisfiable_range(self):
+        response = client.get(self.url, headers={"Range": "bytes=999999999-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(self.data)}"
+
+    def test_head_request(self):
+        response = client.head(self.url)
+
+        assert response.status_code == 200
+        assert response.headers["content-length"] == str(len(self.data))
+        assert response.content == b""
+
+    def test_unknown_file(self):
+        assert client.get(f"/api/v1/files/{'0' * 64}.png").status_code == 404
+        assert client.get("/api/v1/files/..%2F..%2Fetc%2Fpasswd").status_code == 404
+
+    def test_zerocopy_send_extension(self, tmp_path):
+        """Сервер с http.response.zerocopysend получает fd и диапазон"""
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"0123456789")
+        response = StoredFileResponse(
+            path, byte_range=(2, 5), status_code=206, headers={"Content-Length": "4"}
+        )
+        sent = []
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                message = {**message, "data": os.pread(message["file"], 4, 2)}
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "extensions": {"http.response.zerocopysend": {}},
+        }
+        asyncio.run(response(scope, None, send))
+
+        assert sent[0]["status"] == 206
+        assert sent[1]["type"] == "http.response.zerocopysend"
+        assert (sent[1]["offset"], sent[1]["count"]) == (2, 4)
+        assert sent[1]["data"] == b"2345"
+
+    @pytest.mark.parametrize(
+        "header,expected",
+        [
+            (None, None),
+            ("bytes=0-9", (0, 9)),
+            ("bytes=5-", (5, 99)),
+            ("bytes=-10", (90, 99)),
+            ("bytes=-500", (0, 99)),
+            ("bytes=90-500", (90, 99)),
+            ("bytes=9-0", None),
+            ("bytes=0-1,5-6", None),
+            ("items=0-9", None),
+        ],
+    )
+    def test_parse_range(self, header, expected):
+        assert parse_range(header, 100) == expected
+
+    @pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0"])
+    def test_parse_range_unsatisfiable(self, header):
+        with pytest.raises(ValueError):
+            parse_range(header, 100)
+
+
+class TestUploadIOPool:
+    """Тесты пула потоков для файлового I/O"""
+
+    def test_runs_outside_event_loop_thread(self):
+        pool = BoundedIOPool(max_workers=2, max_pending=0, name="test")
+
+        async def main():
+            return await pool.run(lambda: threading.current_thread().name)
+
+        assert asyncio.run(main()).startswith("test-pool")
+        pool.shutdown()
+
+    def test_rejects_when_queue_is_full(self):
+        pool = BoundedIOPool(max_workers=1, max_pending=1, name="test")
+        release = threading.Event()
+
+        async def main():
+            busy = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(PoolOverloadedError):
+                await pool.run(release.wait)
+            release.set()
+            await asyncio.gather(*busy)
+
+        asyncio.run(main())
+        assert pool.in_use == 0
+        pool.shutdown()
+
+    def test_upload_endpoint_returns_503_when_overloaded(self, monkeypatch):
+        class OverloadedPool:
+            async def run(self, *args, **kwargs):
+                raise PoolOverloadedError()
+
+        monkeypatch.setattr(files, "upload_pool", OverloadedPool())
+        png_data = b"\x89PNG\r\n\x1a\n" + b"fake_png_content"
+
+        response = client.post(
+            "/api/v1/files/upload", files={"file": ("test.png", png_data, "image/png")}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["type"] == "/errors/upload-overloaded"
@@ -0,0 +1,124 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import OperationalError
+
+from app.database import database
+from app.database.metrics import operation
+from app.main import app
+from app.middleware.metrics import error_code
+
+client = TestClient(app)
+
+NOTE_ROUTE = "/api/v1/notes/{note_id}"
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRequestMetrics:
+    """Метрики по шаблону маршрута, а не по конкретному пути"""
+
+    def test_requests_are_counted_by_route_template(self, create_note):
+        note_id = create_note()
+        labels = {"method": "GET", "route": NOTE_ROUTE}
+        before = sample("http_requests_total", status="200", **labels)
+        latency_before = sample("http_request_duration_seconds_count", **labels)
+
+        response = client.get(f"/api/v1/notes/{note_id}")
+
+        assert sample("http_requests_total", status="200", **labels) == before + 1
+        assert (
+            sample("http_request_duration_seconds_count", **labels)
+            == latency_before + 1
+        )
+        size = sample("http_response_size_bytes_sum", **labels)
+        assert size >= len(response.content)
+
+    def test_errors_are_counted_by_error_code(self):
+        labels = {"route": NOTE_ROUTE, "code": "NOT_FOUND_ERROR"}
+        before = sample("http_errors_total", **labels)
+
+        assert client.get("/api/v1/notes/999999999").status_code == 404
+
+        assert sample("http_errors_total", **labels) == before + 1
+
+    def test_unknown_paths_share_one_label(self):
+        labels = {"method": "GET", "route": "<unmatched>", "status": "404"}
+        before = sample("http_requests_total", **labels)
+
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+
+        assert sample("http_requests_total", **labels) == before + 2
+
+    def test_in_progress_returns_to_zero(self):
+        client.get("/health")
+
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    @pytest.mark.parametrize(
+        "status, code",
+        [
+            (400, "VALIDATION_ERROR"),
+            (404, "NOT_FOUND_ERROR"),
+            (422, "VALIDATION_ERROR"),
+            (429, "RATE_LIMIT_ERROR"),
+            (500, "INTERNAL_ERROR"),
+            (502, "EXTERNAL_SERVICE_ERROR"),
+        ],
+    )
+    def test_error_code(self, status, code):
+        assert error_code(status) == code
+
+
+class TestDatabaseMetrics:
+    def test_query_time_is_observed(self, create_note):
+        note_id = create_note()
+        labels = {"engine": "async", "operation": "SELECT"}
+        before = sample("db_query_duration_seconds_count", **labels)
+
+        client.get(f"/api/v1/notes/{note_id}", headers={"If-None-Match": '"x"'})
+
+        assert sample("db_query_duration_seconds_count", **labels) > before
+
+    def test_failed_queries_are_counted(self):
+        labels = {"engine": "sync", "operation": "SELECT"}
+        before = sample("db_query_errors_total", **labels)
+
+        with database.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("SELECT * FROM no_such_table")
+
+        assert sample("db_query_errors_total", **labels) == before + 1
+
+    def test_pool_state_is_exported(self, create_note):
+        create_note()
+
+        assert sample("db_pool_size", engine="async") > 0
+        assert sample("db_pool_checked_out", engine="async") == 0
+
+    @pytest.mark.parametrize(
+        "statement, expected",
+        [
+            ("SELECT 1", "SELECT"),
+            ("\n  insert into notes", "INSERT"),
+            ("PRAGMA journal_mode=WAL", "OTHER"),
+            ("", "OTHER"),
+        ],
+    )
+    def test_operation(self, statement, expected):
+        assert operation(statement) == expected
+
+
+class TestMetricsEndpoint:
+    def test_exposition_format(self):
+        client.get("/health")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds_bucket" in response.text
+        assert "db_pool_checked_out" in response.text
@@ -0,0 +1,140 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from app.database import database
+from app.database.search import include_in_migrations
+from app.models.note import Base
+
+# Схема, которую создавал create_tables() до появления миграций
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL, username VARCHAR(50) NOT NULL,
+        email VARCHAR(100) NOT NULL, hashed_password VARCHAR(255) NOT NULL,
+        PRIMARY KEY (id), UNIQUE (username), UNIQUE (email))""",
+    """CREATE TABLE notes (
+        id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, body TEXT NOT NULL,
+        user_id INTEGER NOT NULL, created_at DATETIME, updated_at DATETIME,
+        PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))""",
+    "CREATE INDEX ix_notes_id ON notes (id)",
+    "INSERT INTO notes (title, body, user_id) VALUES ('Legacy', 'body', 1)",
+]
+
+# Теги того же времени: имя уникально для всех пользователей сразу
+LEGACY_TAGS = [
+    """CREATE TABLE tags (
+        id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, user_id INTEGER NOT NULL,
+        PRIMARY KEY (id), UNIQUE (name), FOREIGN KEY(user_id) REFERENCES users (id))""",
+    "CREATE INDEX ix_tags_id ON tags (id)",
+    """CREATE TABLE note_tags (
+        note_id INTEGER NOT NULL, tag_id INTEGER NOT NULL,
+        PRIMARY KEY (note_id, tag_id), FOREIGN KEY(note_id) REFERENCES notes (id),
+        FOREIGN KEY(tag_id) REFERENCES tags (id))""",
+    "INSERT INTO tags (id, name, user_id) VALUES (1, 'x', 1)",
+    "INSERT INTO note_tags (note_id, tag_id) VALUES (1, 1)",
+]
+
+
+def alembic_config(url=None):
+    config = Config(str(database.ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if url is not None:
+        config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def migrated(tmp_path, name="test.db"):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    database.migrate_database(engine)
+    return engine
+
+
+class TestMigrations:
+    """Миграции Alembic и модели описывают одну и ту же схему"""
+
+    def test_head_matches_models(self, tmp_path):
+        engine = migrated(tmp_path)
+
+        with engine.connect() as conn:
+            context = MigrationContext.configure(
+                conn, opts={"include_object": include_in_migrations}
+            )
+            assert compare_metadata(context, Base.metadata) == []
+        engine.dispose()
+
+    def test_legacy_database_is_upgraded(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                conn.exec_driver_sql(statement)
+
+        database.migrate_database(engine)
+
+        inspector = inspect(engine)
+        assert "note_tombstones" in inspector.get_table_names()
+        assert "ix_notes_user_id_created_at_id" in {
+            index["name"] for index in inspector.get_indexes("notes")
+        }
+        with engine.connect() as conn:
+            assert conn.scalar(text("SELECT title FROM notes")) == "Legacy"
+            assert conn.scalar(text("SELECT version_num FROM alembic_version"))
+        engine.dispose()
+
+    def test_legacy_tags_become_unique_per_user(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA + LEGACY_TAGS:
+                conn.exec_driver_sql(statement)
+
+        database.migrate_database(engine)
+
+        insert_tag = text("INSERT INTO tags (name, user_id) VALUES (:name, :user_id)")
+        with engine.begin() as conn:
+            conn.execute(insert_tag, {"name": "x", "user_id": 2})
+            with pytest.raises(IntegrityError):
+                with conn.begin_nested():
+                    conn.execute(insert_tag, {"name": "x", "user_id": 1})
+            assert conn.execute(text("SELECT * FROM note_tags")).all() == [(1, 1)]
+        with engine.connect() as conn:
+            context = MigrationContext.configure(
+                conn, opts={"include_object": include_in_migrations}
+            )
+            assert compare_metadata(context, Base.metadata) == []
+        engine.dispose()
+
+    def test_cli_upgrade_creates_fulltext_index(self, tmp_path):
+        # Путь `alembic upgrade head` при DB_AUTO_MIGRATE=false
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                conn.exec_driver_sql(statement)
+
+        command.upgrade(alembic_config(url), "head")
+
+        match = text("SELECT rowid FROM notes_fts WHERE notes_fts MATCH :query")
+        with engine.begin() as conn:
+            # Заметки, созданные до миграции, проиндексированы
+            assert conn.execute(match, {"query": "legacy"}).all() == [(1,)]
+            conn.exec_driver_sql(
+                "INSERT INTO notes (title, body, user_id) VALUES ('Fresh', 'x', 1)"
+            )
+            assert conn.execute(match, {"query": "fresh"}).all() == [(2,)]
+        engine.dispose()
+
+    def test_downgrade_to_base(self, tmp_path):
+        engine = migrated(tmp_path)
+        config = alembic_config()
+
+        with engine.begin() as connection:
+            config.attributes["connection"] = connection
+            command.downgrade(config, "base")
+
+        tables = set(inspect(engine).get_table_names())
+        assert not tables & set(Base.metadata.tables)
+        assert "notes_fts" not in tables
+        engine.dispose()
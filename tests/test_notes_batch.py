@@ -0,0 +1,121 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def create_batch(items):
+    response = client.post("/api/v1/notes:batch", json=items)
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+class TestNotesBatch:
+    """Тесты пакетных операций с заметками"""
+
+    def test_batch_create_reports_per_item_results(self):
+        results = create_batch(
+            [
+                {"title": "Batch one", "body": "first"},
+                {"title": "", "body": "invalid title"},
+                {"title": "Batch three", "body": "third"},
+            ]
+        )
+
+        assert [r["status"] for r in results] == [201, 422, 201]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[0]["id"] < results[2]["id"]
+        assert "title" in results[1]["detail"]
+
+        listed = client.get("/api/v1/notes", params={"limit": 5}).json()["items"]
+        titles = {n["title"] for n in listed}
+        assert {"Batch one", "Batch three"} <= titles
+
+    def test_batch_update(self):
+        first, second = (
+            r["id"]
+            for r in create_batch(
+                [{"title": "Before", "body": "a"}, {"title": "Before", "body": "b"}]
+            )
+        )
+
+        response = client.patch(
+            "/api/v1/notes:batch",
+            json=[
+                {"id": first, "title": "After"},
+                {"id": second, "body": "changed"},
+                {"id": first, "body": "duplicate"},
+                {"id": 10**9, "title": "Missing"},
+                {"title": "No id"},
+            ],
+        )
+
+        assert response.status_code == 200
+        statuses = [r["status"] for r in response.json()["results"]]
+        assert statuses == [200, 200, 409, 404, 422]
+
+        page = client.get("/api/v1/notes", params={"limit": 10}).json()["items"]
+        by_id = {n["id"]: n for n in page}
+        assert by_id[first]["title"] == "After"
+        assert by_id[first]["body"] == "a"
+        assert by_id[second]["title"] == "Before"
+        assert by_id[second]["body"] == "changed"
+
+    def test_batch_update_validates_title_like_single_update(self):
+        (note_id,) = (r["id"] for r in create_batch([{"title": "Safe", "body": "a"}]))
+        unsafe = "<script>alert(1)</script>"
+
+        single = client.put(
+            f"/api/v1/notes/{note_id}", json={"title": unsafe, "body": "a"}
+        )
+        response = client.patch(
+            "/api/v1/notes:batch",
+            json=[{"id": note_id, "title": unsafe}, {"id": note_id, "title": ""}],
+        )
+
+        assert single.status_code == 422
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [422, 422]
+        assert "title" in results[0]["detail"]
+        note = client.get(f"/api/v1/notes/{note_id}").json()
+        assert note["title"] == "Safe"
+
+    def test_batch_delete(self):
+        ids = [
+            r["id"]
+            for r in create_batch(
+                [
+                    {"title": "Delete me", "body": "x"},
+                    {"title": "Delete me", "body": "y"},
+                ]
+            )
+        ]
+
+        response = client.request("DELETE", "/api/v1/notes:batch", json=ids + [10**9])
+
+        assert response.status_code == 200
+        statuses = [r["status"] for r in response.json()["results"]]
+        assert statuses == [200, 200, 404]
+        page = client.get("/api/v1/notes", params={"limit": 10}).json()["items"]
+        assert not {n["id"] for n in page} & set(ids)
+
+    def test_batch_delete_reports_duplicate_ids(self):
+        note_id = create_batch([{"title": "Delete once", "body": "x"}])[0]["id"]
+
+        response = client.request(
+            "DELETE", "/api/v1/notes:batch", json=[note_id, 10**9, note_id, 10**9]
+        )
+
+        assert response.status_code == 200
+        statuses = [r["status"] for r in response.json()["results"]]
+        assert statuses == [200, 404, 409, 409]
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 404
+
+    def test_batch_size_limit(self):
+        response = client.post(
+            "/api/v1/notes:batch", json=[{"title": "x", "body": "y"}] * 1001
+        )
+
+        assert response.status_code == 413
+        assert response.json()["type"] == "/errors/batch-too-large"
@@ -0,0 +1,273 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import notes
+from app.utils import cache
+from app.utils.cache import CachedResponse, MemoryCacheBackend, ResponseCache
+
+client = TestClient(app)
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class TestMemoryCacheBackend:
+    """LRU вытеснение, TTL и версии ключей"""
+
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(max_entries=2)
+
+        async def scenario():
+            await backend.set("a", b"1", ttl=60)
+            await backend.set("b", b"2", ttl=60)
+            assert await backend.get("a") == b"1"  # "a" становится свежей
+            await backend.set("c", b"3", ttl=60)
+            return [await backend.get(key) for key in ("a", "b", "c")]
+
+        assert asyncio.run(scenario()) == [b"1", None, b"3"]
+
+    def test_ttl_expiry(self, monkeypatch):
+        backend = MemoryCacheBackend()
+        now = [1000.0]
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+        async def scenario():
+            await backend.set("a", b"1", ttl=5)
+            fresh = await backend.get("a")
+            now[0] += 5
+            return fresh, await backend.get("a")
+
+        assert asyncio.run(scenario()) == (b"1", None)
+        assert len(backend) == 0
+
+    def test_stale_write_after_invalidation_is_not_served(self):
+        """Ответ, прочитанный до изменения, попадает под старую версию ключа"""
+        response_cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+
+        async def scenario():
+            key = await response_cache.note_key(1, 1)
+            await response_cache.invalidate_notes(1, [1])
+            await response_cache.set(key, CachedResponse(b"stale"))
+            return await response_cache.get(await response_cache.note_key(1, 1))
+
+        assert asyncio.run(scenario()) is None
+
+    def test_versions_are_bounded(self):
+        backend = MemoryCacheBackend(max_entries=2, max_versions=3)
+
+        async def scenario():
+            for note_id in range(100):
+                await backend.bump_version(f"note:{note_id}")
+
+        asyncio.run(scenario())
+        assert len(backend._versions) == 3
+
+    def test_evicted_version_does_not_revive_stale_entry(self):
+        """После вытеснения версии старый ключ записи больше не строится"""
+        response_cache = ResponseCache(MemoryCacheBackend(max_versions=2), ttl=60)
+
+        async def scenario():
+            await response_cache.invalidate_notes(1, [1])
+            key = await response_cache.note_key(1, 1)
+            await response_cache.set(key, CachedResponse(b"cached"))
+            # Версии других заметок вытесняют версию note:1
+            await response_cache.invalidate_notes(1, [2, 3])
+            assert await response_cache.note_key(1, 1) != key
+            untouched = await response_cache.note_key(1, 4)
+            await response_cache.invalidate_notes(1, [5, 6])
+            return await response_cache.note_key(1, 4) != untouched
+
+        assert asyncio.run(scenario())
+
+    def test_unknown_backend_url(self):
+        with pytest.raises(ValueError):
+            cache.build_cache_backend("memcached://localhost", 10)
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+class TestRedisCacheBackend:
+    """Те же операции на настоящем Redis; ключи теста изолированы префиксом"""
+
+    def run(self, scenario):
+        pytest.importorskip("redis")
+
+        async def wrapper():
+            backend = cache.RedisCacheBackend(
+                TEST_REDIS_URL, prefix=f"test:cache:{uuid.uuid4().hex}:"
+            )
+            try:
+                return await scenario(backend)
+            finally:
+                await backend._client.aclose()
+
+        return asyncio.run(wrapper())
+
+    def test_set_get_and_ttl(self):
+        async def scenario(backend):
+            await backend.set("a", b"1", ttl=60)
+            ttl = await backend._client.pttl(backend.prefix + "a")
+            return await backend.get("a"), await backend.get("missing"), ttl
+
+        value, missing, ttl = self.run(scenario)
+        assert (value, missing) == (b"1", None)
+        assert 0 < ttl <= 60000
+
+    def test_versions(self):
+        async def scenario(backend):
+            before = await backend.get_version("note:1")
+            bumped = await backend.bump_version("note:1")
+            return before, bumped, await backend.get_version("note:1")
+
+        assert self.run(scenario) == (0, 1, 1)
+
+    def test_stale_write_after_invalidation_is_not_served(self):
+        async def scenario(backend):
+            response_cache = ResponseCache(backend, ttl=60)
+            key = await response_cache.note_key(1, 1)
+            await response_cache.invalidate_notes(1, [1])
+            await response_cache.set(key, CachedResponse(b"stale"))
+            fresh = await response_cache.note_key(1, 1)
+            await response_cache.set(fresh, CachedResponse(b"fresh", {"ETag": "x"}))
+            return await response_cache.get(fresh)
+
+        cached = self.run(scenario)
+        assert (cached.body, cached.headers) == (b"fresh", {"ETag": "x"})
+
+
+class TestNotesCache:
+    """Кэширование get_note/get_notes и инвалидация при изменениях"""
+
+    def test_note_read_is_cached_until_update(self, create_note):
+        note_id = create_note()
+
+        first = client.get(f"/api/v1/notes/{note_id}")
+        second = client.get(f"/api/v1/notes/{note_id}")
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert first.json() == second.json()
+
+        client.put(
+            f"/api/v1/notes/{note_id}", json={"title": "Changed", "body": "new body"}
+        )
+        updated = client.get(f"/api/v1/notes/{note_id}")
+        assert updated.headers["x-cache"] == "MISS"
+        assert updated.json()["title"] == "Changed"
+
+        client.delete(f"/api/v1/notes/{note_id}")
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 404
+
+    def test_list_is_invalidated_by_create(self, create_note):
+        client.get("/api/v1/notes", params={"limit": 3})
+        cached = client.get("/api/v1/notes", params={"limit": 3})
+        assert cached.headers["x-cache"] == "HIT"
+
+        note_id = create_note("Fresh list entry")
+
+        refreshed = client.get("/api/v1/notes", params={"limit": 3})
+        assert refreshed.headers["x-cache"] == "MISS"
+        assert note_id in [item["id"] for item in refreshed.json()["items"]]
+
+    def test_batch_update_invalidates_note(self, create_note):
+        note_id = create_note()
+        client.get(f"/api/v1/notes/{note_id}")
+
+        client.patch("/api/v1/notes:batch", json=[{"id": note_id, "title": "Batch"}])
+
+        response = client.get(f"/api/v1/notes/{note_id}")
+        assert response.headers["x-cache"] == "MISS"
+        assert response.json()["title"] == "Batch"
+
+    def test_stats(self, monkeypatch, create_note):
+        monkeypatch.setattr(
+            notes, "notes_cache", ResponseCache(MemoryCacheBackend(), ttl=60)
+        )
+        note_id = create_note()
+
+        for _ in range(3):
+            client.get(f"/api/v1/notes/{note_id}")
+
+        stats = client.get("/api/v1/notes/cache/stats").json()
+        assert stats == {"hits": 2, "misses": 1, "hit_ratio": pytest.approx(2 / 3)}
+
+    def test_disabled_cache(self, monkeypatch, create_note):
+        monkeypatch.setattr(
+            notes, "notes_cache", ResponseCache(MemoryCacheBackend(), ttl=0)
+        )
+        note_id = create_note()
+
+        client.get(f"/api/v1/notes/{note_id}")
+        assert client.get(f"/api/v1/notes/{note_id}").headers["x-cache"] == "MISS"
+
+
+class TestNotesConditionalGet:
+    """ETag/Last-Modified и ответы 304 с кэшем и без него"""
+
+    @pytest.fixture(params=[60, 0], ids=["cached", "uncached"])
+    def response_cache(self, request, monkeypatch):
+        response_cache = ResponseCache(MemoryCacheBackend(), ttl=request.param)
+        monkeypatch.setattr(notes, "notes_cache", response_cache)
+        return response_cache
+
+    def test_note_if_none_match(self, response_cache, create_note):
+        note_id = create_note()
+        first = client.get(f"/api/v1/notes/{note_id}")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == notes.NOTES_CACHE_CONTROL
+        assert "last-modified" in first.headers
+
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        client.put(
+            f"/api/v1/notes/{note_id}", json={"title": "Changed", "body": "new body"}
+        )
+        changed = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": etag}
+        )
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["title"] == "Changed"
+
+    def test_note_if_modified_since(self, response_cache, create_note):
+        note_id = create_note()
+        last_modified = client.get(f"/api/v1/notes/{note_id}").headers["last-modified"]
+
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+
+        stale = client.get(
+            f"/api/v1/notes/{note_id}",
+            headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+        )
+        assert stale.status_code == 200
+
+    def test_missing_note_with_validator(self, response_cache):
+        response = client.get("/api/v1/notes/999999", headers={"If-None-Match": "*"})
+        assert response.status_code == 404
+
+    def test_list_etag_changes_on_create(self, response_cache, create_note):
+        etag = client.get("/api/v1/notes", params={"limit": 3}).headers["etag"]
+
+        response = client.get(
+            "/api/v1/notes", params={"limit": 3}, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert "last-modified" not in response.headers
+
+        create_note("Moves the first page")
+
+        changed = client.get(
+            "/api/v1/notes", params={"limit": 3}, headers={"If-None-Match": etag}
+        )
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
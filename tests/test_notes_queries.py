@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import database
+from app.main import app
+from app.models.note import Note, Tag
+from app.routes import notes
+from app.utils.cache import MemoryCacheBackend, ResponseCache
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """SQL запросы, выполненные async engine обработчиков"""
+    monkeypatch.setattr(
+        notes, "notes_cache", ResponseCache(MemoryCacheBackend(), ttl=0)
+    )
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = database.async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def tagged_notes():
+    """20 новых заметок с двумя тегами у каждой"""
+    prefix = uuid.uuid4().hex[:8]
+    with database.SessionLocal() as db:
+        tags = [Tag(name=f"{prefix}-{i}", user_id=1) for i in range(4)]
+        db.add_all(
+            Note(
+                title=f"Tagged {i}",
+                body="body",
+                user_id=1,
+                tags=tags[i % 3 : i % 3 + 2],
+            )
+            for i in range(20)
+        )
+        db.commit()
+    return prefix
+
+
+class TestNoteQueries:
+    """Теги заметок загружаются фиксированным числом запросов"""
+
+    def test_list_query_count_does_not_depend_on_page_size(
+        self, statements, tagged_notes
+    ):
+        counts = []
+        for limit in (5, 20):
+            statements.clear()
+            page = client.get("/api/v1/notes", params={"limit": limit}).json()
+            counts.append(len(statements))
+            assert len(page["items"]) == limit
+            assert all(len(item["tags"]) == 2 for item in page["items"])
+
+        assert counts[0] == counts[1]
+
+    def test_note_tags_are_returned_sorted(self, statements, tagged_notes):
+        note_id = client.get("/api/v1/notes", params={"limit": 1}).json()["items"][0][
+            "id"
+        ]
+
+        statements.clear()
+        note = client.get(f"/api/v1/notes/{note_id}").json()
+
+        assert note["tags"] == sorted(note["tags"])
+        assert all(tag.startswith(tagged_notes) for tag in note["tags"])
+        # Заметка и ее теги: два запроса
+        assert len(statements) == 2
@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user_id
+from app.main import app
+
+client = TestClient(app)
+
+
+def listed_ids():
+    response = client.get("/api/v1/notes", params={"limit": 200})
+    assert response.status_code == 200
+    return {note["id"] for note in response.json()["items"]}
+
+
+class TestNotesScoping:
+    """Заметки видны и изменяемы только их владельцем"""
+
+    def test_note_is_created_for_current_user(self, other_user, create_note):
+        note_id = create_note("Other user note")
+
+        assert client.get(f"/api/v1/notes/{note_id}").json()["user_id"] == other_user
+        assert note_id in listed_ids()
+
+    def test_other_users_note_is_not_found(self, other_user, create_note):
+        note_id = create_note("Private note")
+        app.dependency_overrides.pop(get_current_user_id)
+
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 404
+        conditional = {"If-None-Match": '"any"'}
+        response = client.get(f"/api/v1/notes/{note_id}", headers=conditional)
+        assert response.status_code == 404
+        response = client.put(
+            f"/api/v1/notes/{note_id}", json={"title": "Stolen", "body": "body"}
+        )
+        assert response.status_code == 404
+        assert client.delete(f"/api/v1/notes/{note_id}").status_code == 404
+        assert note_id not in listed_ids()
+
+    def test_cached_note_is_not_served_to_other_user(self, other_user, create_note):
+        note_id = create_note("Cached private note")
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 200
+        assert client.get("/api/v1/notes").status_code == 200
+        app.dependency_overrides.pop(get_current_user_id)
+
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 404
+        assert note_id not in listed_ids()
+
+    def test_batch_operations_skip_other_users_notes(self, other_user, create_note):
+        note_id = create_note("Batch private note")
+        app.dependency_overrides.pop(get_current_user_id)
+
+        response = client.request(
+            "PATCH", "/api/v1/notes:batch", json=[{"id": note_id, "title": "Stolen"}]
+        )
+        assert response.json()["results"][0]["status"] == 404
+        response = client.request("DELETE", "/api/v1/notes:batch", json=[note_id])
+        assert response.json()["results"][0]["status"] == 404
+
+    def test_search_and_changes_are_scoped(self, other_user, create_note):
+        note_id = create_note("Scoped", "xylophonist")
+        response = client.get("/api/v1/", params={"search": "xylophonist"})
+        assert note_id in {note["id"] for note in response.json()["items"]}
+        app.dependency_overrides.pop(get_current_user_id)
+
+        response = client.get("/api/v1/", params={"search": "xylophonist"})
+        assert note_id not in {note["id"] for note in response.json()["items"]}
+        response = client.get("/api/v1/notes/changes", params={"limit": 200})
+        assert note_id not in {note["id"] for note in response.json()["changes"]}
+
+    def test_deletion_is_synced_only_to_owner(self, other_user, create_note):
+        note_id = create_note("Deleted private note")
+        assert client.delete(f"/api/v1/notes/{note_id}").status_code == 200
+        response = client.get("/api/v1/notes/changes", params={"limit": 200})
+        assert note_id in response.json()["deleted"]
+        app.dependency_overrides.pop(get_current_user_id)
+
+        response = client.get("/api/v1/notes/changes", params={"limit": 200})
+        assert note_id not in response.json()["deleted"]
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import sync
+from app.database.pagination import encode_cursor
+from app.main import app
+from app.models.note import Note, NoteTombstone
+from app.routes import notes
+
+client = TestClient(app)
+
+
+def sync_all(token=None, limit=200):
+    """Проходит все страницы изменений, как это делает клиент"""
+    changed, deleted = {}, set()
+    while True:
+        response = client.get(
+            "/api/v1/notes/changes", params={"since": token, "limit": limit}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        for note in page["changes"]:
+            changed[note["id"]] = note
+            deleted.discard(note["id"])
+        for note_id in page["deleted"]:
+            changed.pop(note_id, None)
+            deleted.add(note_id)
+        token = page["sync_token"]
+        if not page["has_more"]:
+            return changed, deleted, token
+
+
+class TestNoteChangesEndpoint:
+    """GET /notes/changes: созданные, измененные и удаленные заметки"""
+
+    @pytest.fixture(autouse=True)
+    def no_settle_window(self, monkeypatch):
+        monkeypatch.setattr(notes, "NOTES_SYNC_SETTLE_SECONDS", 0)
+
+    def test_only_changes_since_token_are_returned(self, create_note):
+        removed, kept = create_note(), create_note()
+        _, _, token = sync_all()
+
+        client.put(f"/api/v1/notes/{kept}", json={"title": "Edited", "body": "new"})
+        client.delete(f"/api/v1/notes/{removed}")
+        created = create_note("Created later")
+
+        changed, deleted, token = sync_all(token)
+        assert set(changed) == {kept, created}
+        assert changed[kept]["title"] == "Edited"
+        assert deleted == {removed}
+
+        assert sync_all(token)[:2] == ({}, set())
+
+    def test_batch_delete_is_reported(self, create_note):
+        ids = [create_note(), create_note()]
+        _, _, token = sync_all()
+
+        client.request("DELETE", "/api/v1/notes:batch", json=ids)
+
+        assert sync_all(token)[:2] == ({}, set(ids))
+
+    def test_pages_cover_all_changes(self, create_note):
+        _, _, token = sync_all()
+        ids = {create_note() for _ in range(5)}
+
+        first = client.get(
+            "/api/v1/notes/changes", params={"since": token, "limit": 2}
+        ).json()
+        assert first["has_more"] is True
+        assert len(first["changes"]) == 2
+
+        changed, _, _ = sync_all(token, limit=2)
+        assert set(changed) == ids
+
+    @pytest.mark.parametrize("token", ["garbage", encode_cursor([1, 2])])
+    def test_invalid_token(self, token):
+        response = client.get("/api/v1/notes/changes", params={"since": token})
+        assert response.status_code == 400
+
+
+class TestFetchChanges:
+    """Выборка изменений и токен синхронизации"""
+
+    @pytest.mark.asyncio
+    async def test_recent_changes_are_delivered_again(self, sync_db, async_db):
+        sync_db.add(Note(title="Recent", body="body", user_id=1))
+        sync_db.commit()
+
+        first = await sync.fetch_changes(async_db, 1, None, 50, timedelta(minutes=5))
+        since = sync.decode_sync_token(first.sync_token)
+        second = await sync.fetch_changes(async_db, 1, since, 50, timedelta(minutes=5))
+
+        # Запись могла получить время до commit другой транзакции
+        assert [note.title for note in second.notes] == ["Recent"]
+
+    @pytest.mark.asyncio
+    async def test_last_event_per_note_wins(self, sync_db, async_db):
+        old = datetime.utcnow() - timedelta(hours=1)
+        sync_db.add(NoteTombstone(note_id=7, user_id=1, deleted_at=old))
+        # SQLite выдал id удаленной заметки новой
+        reused_at = old + timedelta(seconds=1)
+        sync_db.add(
+            Note(id=7, title="Reused", body="b", user_id=1, updated_at=reused_at)
+        )
+        sync_db.add(NoteTombstone(note_id=8, user_id=1, deleted_at=old))
+        sync_db.commit()
+
+        changes = await sync.fetch_changes(async_db, 1, None, 50, timedelta(0))
+
+        assert [note.id for note in changes.notes] == [7]
+        assert changes.deleted == [8]
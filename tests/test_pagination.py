@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database.pagination import decode_cursor, encode_cursor, paginate
+from app.main import app
+from app.models.note import Note
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def db(sync_db, async_db):
+    """7 заметок, часть из которых создана одновременно"""
+    base = datetime(2024, 1, 1)
+    for i in range(7):
+        sync_db.add(
+            Note(
+                title=f"Note {i}",
+                body="body",
+                user_id=1,
+                created_at=base + timedelta(minutes=i // 2),
+            )
+        )
+    sync_db.commit()
+    return async_db
+
+
+async def page_of(db, cursor=None, limit=3):
+    return await paginate(
+        db,
+        select(Note),
+        key_columns=(Note.created_at, Note.id),
+        row_key=lambda row: (row.Note.created_at, row.Note.id),
+        cursor=cursor,
+        limit=limit,
+        descending=True,
+    )
+
+
+def ids(page):
+    return [row.Note.id for row in page.rows]
+
+
+class TestCursor:
+    """Тесты кодирования курсора"""
+
+    def test_roundtrip(self):
+        key = (datetime(2024, 1, 1, 12, 30, 0, 123456), 42)
+        assert decode_cursor(encode_cursor(key, "prev"), 2) == (key, "prev")
+
+    @pytest.mark.parametrize(
+        "cursor", ["garbage", "", "eyJrIjpbMV0sImQiOiJ4In0", "W10"]
+    )
+    def test_invalid_cursor_rejected(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 2)
+
+    def test_key_size_mismatch_rejected(self):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor((1,)), 2)
+
+
+class TestKeysetPagination:
+    """Тесты keyset пагинации"""
+
+    @pytest.mark.asyncio
+    async def test_walk_forward_covers_all_rows_once(self, db):
+        first = await page_of(db)
+        second = await page_of(db, first.next_cursor)
+        third = await page_of(db, second.next_cursor)
+
+        assert ids(first) == [7, 6, 5]
+        assert ids(second) == [4, 3, 2]
+        assert ids(third) == [1]
+        assert first.prev_cursor is None
+        assert third.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_walk_backward(self, db):
+        first = await page_of(db)
+        second = await page_of(db, first.next_cursor)
+        third = await page_of(db, second.next_cursor)
+
+        back = await page_of(db, third.prev_cursor)
+        assert ids(back) == [4, 3, 2]
+        start = await page_of(db, back.prev_cursor)
+        assert ids(start) == [7, 6, 5]
+        assert start.prev_cursor is None
+        assert start.next_cursor is not None
+
+
+def test_notes_endpoint_pages_do_not_overlap():
+    """GET /notes возвращает страницы без пересечений по курсору"""
+    for i in range(3):
+        client.post("/api/v1/notes", json={"title": f"Page {i}", "body": "text"})
+
+    first = client.get("/api/v1/notes", params={"limit": 2})
+    assert first.status_code == 200
+    first_data = first.json()
+    assert len(first_data["items"]) == 2
+    assert first_data["prev_cursor"] is None
+
+    second = client.get(
+        "/api/v1/notes", params={"limit": 2, "cursor": first_data["next_cursor"]}
+    )
+    second_ids = [note["id"] for note in second.json()["items"]]
+    first_ids = [note["id"] for note in first_data["items"]]
+    assert not set(first_ids) & set(second_ids)
+    assert first_ids + second_ids == sorted(first_ids + second_ids, reverse=True)
+
+
+def test_notes_endpoint_rejects_bad_cursor_and_limit():
+    response = client.get("/api/v1/notes", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["type"] == "/errors/invalid-cursor"
+
+    response = client.get("/api/v1/notes", params={"limit": 10_000})
+    assert response.status_code == 422
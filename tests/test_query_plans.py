@@ -0,0 +1,196 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database import tags as tag_queries
+from app.database.notes import UserNotes
+from app.models.note import Note, NoteTombstone, Tag
+
+# Полный проход по таблице или по всему индексу (USING [COVERING] INDEX):
+# поиск по ключу индекса SQLite показывает как SEARCH
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    """БД со схемой из миграций и данными нескольких пользователей"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    database.migrate_database(engine)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        tags = [Tag(name=f"tag-{i}", user_id=1 + i % 2) for i in range(4)]
+        db.add_all(
+            Note(
+                title=f"Note {i}",
+                body="body",
+                user_id=1 + i % 3,
+                created_at=now - timedelta(minutes=i),
+                updated_at=now - timedelta(minutes=i),
+                tags=tags[i % 3 : i % 3 + 2],
+            )
+            for i in range(60)
+        )
+        db.add_all(
+            NoteTombstone(note_id=1000 + i, user_id=1 + i % 3, deleted_at=now)
+            for i in range(6)
+        )
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def planned_db(migrated_engine):
+    """
+    Async сессия, которая запоминает каждый выполненный SELECT вместе с
+    параметрами; plans() возвращает для них EXPLAIN QUERY PLAN
+    """
+    url = migrated_engine.url.render_as_string(hide_password=False)
+    engine = create_async_engine(database.async_database_url(url))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+    def plans():
+        result = []
+        with migrated_engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).all()
+                result.append((statement, [row[-1] for row in rows]))
+        statements.clear()
+        return result
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.plans = plans
+        yield session
+    await engine.dispose()
+
+
+def is_full_scan(step, allow_scans=()):
+    match = FULL_SCAN_RE.match(step)
+    return match is not None and match.group(1) not in allow_scans
+
+
+def assert_no_full_scans(plans, allow_sort=False, allow_scans=()):
+    """
+    Ни одного SCAN таблицы или индекса, кроме таблиц allow_scans, и, если
+    не разрешено, сортировки результата
+    """
+    assert plans
+    for statement, plan in plans:
+        scans = [
+            step
+            for step in plan
+            if is_full_scan(step, allow_scans) or (step == TEMP_SORT and not allow_sort)
+        ]
+        assert not scans, f"{scans} in plan of:\n{statement}"
+
+
+class TestFullScanDetection:
+    @pytest.mark.parametrize(
+        "step, expected",
+        [
+            ("SCAN notes", True),
+            ("SCAN note_tags USING COVERING INDEX ix_note_tags_tag_id_note_id", True),
+            ("SCAN notes USING INDEX ix_notes_user_id_created_at_id", True),
+            (
+                "SEARCH notes USING INDEX ix_notes_user_id_created_at_id (user_id=?)",
+                False,
+            ),
+            ("SEARCH notes USING INTEGER PRIMARY KEY (rowid=?)", False),
+        ],
+    )
+    def test_full_scans(self, step, expected):
+        assert is_full_scan(step) is expected
+
+    def test_allowed_table(self):
+        assert not is_full_scan("SCAN note_tags", allow_scans=("note_tags",))
+
+
+class TestHotQueryPlans:
+    """Основные запросы читают индексы, а не всю таблицу"""
+
+    @pytest.mark.asyncio
+    async def test_list_pages(self, planned_db):
+        user_notes = UserNotes(planned_db, 2)
+        page = await user_notes.page(None, 10)
+        await user_notes.page(page.next_cursor, 10)
+        planned_db.plans()
+
+        await user_notes.page(page.next_cursor, 10, versions_only=True)
+
+        # Версии для ETag страницы читаются только из индекса
+        [(_, plan)] = planned_db.plans()
+        assert_no_full_scans([(_, plan)])
+        assert any(
+            "COVERING INDEX ix_notes_user_id_created_at_id" in step for step in plan
+        )
+
+    @pytest.mark.asyncio
+    async def test_list_page_reads_only_user_rows(self, planned_db):
+        user_notes = UserNotes(planned_db, 2)
+        await user_notes.page(None, 10)
+
+        plans = planned_db.plans()
+        assert_no_full_scans(plans)
+        assert any("ix_notes_user_id_created_at_id" in " ".join(p) for _, p in plans)
+
+    @pytest.mark.asyncio
+    async def test_tag_filter(self, planned_db):
+        for match in (tag_queries.MATCH_ALL, tag_queries.MATCH_ANY):
+            await UserNotes(planned_db, 1).page(
+                None, 10, tags=["tag-0", "tag-1"], match=match
+            )
+
+        # Сортируются только заметки, найденные по индексам тегов
+        assert_no_full_scans(planned_db.plans(), allow_sort=True)
+
+    @pytest.mark.asyncio
+    async def test_note_by_id(self, planned_db):
+        note_id = await planned_db.scalar(select(Note.id).limit(1))
+        planned_db.plans()
+
+        await UserNotes(planned_db, 1).get(note_id)
+
+        assert_no_full_scans(planned_db.plans())
+
+    @pytest.mark.asyncio
+    async def test_changes_since(self, planned_db):
+        since = (datetime.utcnow() - timedelta(minutes=10), 0)
+
+        await UserNotes(planned_db, 1).changes(since, 20, timedelta(0))
+
+        plans = planned_db.plans()
+        assert_no_full_scans(plans)
+        used = " ".join(" ".join(plan) for _, plan in plans)
+        assert "ix_notes_user_id_updated_at_id" in used
+        assert "ix_note_tombstones_user_id_deleted_at_note_id" in used
+
+    @pytest.mark.asyncio
+    async def test_tag_usage(self, planned_db):
+        usage = await tag_queries.tag_usage(planned_db, 1)
+
+        assert [(tag.name, count) for tag, count in usage] == [
+            ("tag-0", 20),
+            ("tag-2", 40),
+        ]
+        plans = planned_db.plans()
+        assert_no_full_scans(plans)
+        # Связи тегов считаются по индексу для каждого тега пользователя,
+        # а не группировкой всей note_tags
+        [(_, plan)] = plans
+        assert "MATERIALIZE" not in " ".join(plan)
+        assert any(step.startswith("SEARCH note_tags") for step in plan)
@@ -0,0 +1,93 @@
+import logging
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import database, profiling
+from app.main import app
+from app.middleware import query_profiling
+from app.routes import notes
+
+SERVER_TIMING_RE = re.compile(
+    r'^db;dur=(?P<db>[\d.]+);desc="(?P<count>\d+) queries", app;dur=(?P<app>[\d.]+)$'
+)
+
+# Приложение (engines уже инструментированы app.main) с включенным заголовком
+timed_app = FastAPI()
+timed_app.include_router(notes.router, prefix="/api/v1")
+timed_app.add_middleware(query_profiling.QueryProfilingMiddleware, server_timing=True)
+timed_client = TestClient(timed_app)
+
+
+def server_timing(response):
+    match = SERVER_TIMING_RE.match(response.headers["server-timing"])
+    assert match, response.headers["server-timing"]
+    return match
+
+
+class TestServerTiming:
+    def test_queries_of_request_are_reported(self, create_note):
+        note_id = create_note()
+
+        timing = server_timing(timed_client.get(f"/api/v1/notes/{note_id}"))
+
+        # Заметка и ее теги (selectinload)
+        assert int(timing["count"]) == 2
+        assert float(timing["app"]) >= float(timing["db"]) > 0
+
+    def test_cached_response_issues_no_queries(self, create_note):
+        note_id = create_note()
+        timed_client.get(f"/api/v1/notes/{note_id}")
+
+        response = timed_client.get(f"/api/v1/notes/{note_id}")
+
+        assert response.headers["x-cache"] == "HIT"
+        assert server_timing(response)["count"] == "0"
+
+    def test_header_is_disabled_by_default(self):
+        response = TestClient(app).get("/health")
+
+        assert "server-timing" not in response.headers
+
+
+class TestQueryLog:
+    def test_slow_query_is_logged_with_plan(self, monkeypatch, caplog):
+        monkeypatch.setattr(profiling, "DB_SLOW_QUERY_MS", 1e-6)
+
+        with caplog.at_level(logging.WARNING, logger=profiling.__name__):
+            with database.engine.connect() as conn:
+                conn.exec_driver_sql("SELECT title FROM notes WHERE id = ?", (1,))
+
+        [record] = [r for r in caplog.records if "Slow query" in r.getMessage()]
+        message = record.getMessage()
+        assert "SELECT title FROM notes WHERE id = ?" in message
+        assert "plan: SEARCH notes USING INTEGER PRIMARY KEY" in message
+
+    def test_many_queries_per_request_are_reported(self, monkeypatch, caplog):
+        monkeypatch.setattr(profiling, "DB_QUERY_COUNT_WARN", 2)
+        stats, token = profiling.start_request("GET /n-plus-one")
+
+        with database.engine.connect() as conn:
+            for note_id in range(3):
+                conn.exec_driver_sql("SELECT title FROM notes WHERE id = ?", (note_id,))
+        with caplog.at_level(logging.WARNING, logger=profiling.__name__):
+            profiling.finish_request(stats, token)
+
+        assert stats.count == 3
+        assert "GET /n-plus-one issued 3 queries" in caplog.text
+        assert "most repeated (3 times)" in caplog.text
+
+    def test_queries_outside_request_are_not_attributed(self):
+        with database.engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+
+        assert profiling.current_stats() is None
+
+
+def test_server_timing_value():
+    stats = profiling.QueryStats(count=3, duration=0.0012345)
+
+    assert query_profiling.server_timing(stats, 0.01) == (
+        b'db;dur=1.23;desc="3 queries", app;dur=10.00'
+    )
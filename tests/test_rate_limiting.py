@@ -0,0 +1,235 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.middleware.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RedisRateLimitBackend,
+    parse_rate,
+)
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def hit(backend, key, rule):
+    return asyncio.run(backend.hit(key, rule))
+
+
+def limited_client(rate="3/minute", backend=None, **middleware_options):
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(
+        routes=[Route("/api/ping", ok), Route("/health", ok)],
+    )
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=backend or MemoryRateLimitBackend(),
+        rules=[RateLimitRule.parse("/api/", rate)],
+        **middleware_options,
+    )
+    return TestClient(app)
+
+
+class TestParseRate:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [("5/minute", (5, 60.0)), ("2/hour", (2, 3600.0)), ("10 / Second", (10, 1.0))],
+    )
+    def test_valid(self, value, expected):
+        assert parse_rate(value) == expected
+
+    @pytest.mark.parametrize("value", ["", "5", "0/minute", "x/minute", "5/week"])
+    def test_invalid(self, value):
+        with pytest.raises(ValueError):
+            parse_rate(value)
+
+
+class TestMemoryBackend:
+    """GCRA: всплеск до limit, затем по одному запросу за interval"""
+
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        rule = RateLimitRule.parse("/", "3/minute")
+
+        results = [hit(backend, "a", rule) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert results[3].retry_after == pytest.approx(20)
+        assert results[3].reset_after == pytest.approx(60)
+
+        clock.now += 20
+        assert hit(backend, "a", rule).allowed
+        assert not hit(backend, "a", rule).allowed
+
+    def test_keys_are_independent(self):
+        backend = MemoryRateLimitBackend(clock=FakeClock())
+        rule = RateLimitRule.parse("/", "1/minute")
+
+        assert hit(backend, "a", rule).allowed
+        assert hit(backend, "b", rule).allowed
+        assert not hit(backend, "a", rule).allowed
+
+    def test_limit_is_not_rounded_away(self):
+        backend = MemoryRateLimitBackend(clock=FakeClock())
+        rule = RateLimitRule.parse("/", "7/minute")
+
+        assert sum(hit(backend, "a", rule).allowed for _ in range(8)) == 7
+
+    def test_idle_keys_are_evicted(self):
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(sweep_interval=30, clock=clock)
+        rule = RateLimitRule.parse("/", "2/minute")
+        hit(backend, "idle", rule)
+        clock.now += 25
+        hit(backend, "busy", rule)
+        hit(backend, "busy", rule)
+
+        clock.now += 10
+        hit(backend, "busy", rule)
+
+        # TAT "idle" в прошлом - ключ удален, "busy" еще копит долг
+        assert len(backend) == 1
+
+    def test_memory_is_bounded(self):
+        backend = MemoryRateLimitBackend(max_keys=100, clock=FakeClock())
+        rule = RateLimitRule.parse("/", "5/minute")
+
+        for i in range(1000):
+            hit(backend, f"client-{i}", rule)
+
+        assert len(backend) <= 100
+
+    def test_throttled_key_survives_eviction(self):
+        """Поток новых адресов вытесняет их самих, а не исчерпавший лимит ключ"""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(max_keys=10, clock=clock)
+        rule = RateLimitRule.parse("/", "5/minute")
+        for _ in range(5):
+            hit(backend, "busy", rule)
+
+        for i in range(50):
+            clock.now += 1
+            hit(backend, f"client-{i}", rule)
+            hit(backend, "busy", rule)
+
+        assert len(backend) <= 10
+        assert not hit(backend, "busy", rule).allowed
+
+
+class TestRateLimitMiddleware:
+    def test_headers_on_allowed_response(self):
+        client = limited_client()
+
+        response = client.get("/api/ping")
+
+        assert response.status_code == 200
+        assert response.headers["x-ratelimit-limit"] == "3"
+        assert response.headers["x-ratelimit-remaining"] == "2"
+        assert response.headers["x-ratelimit-reset"] == "20"
+
+    def test_excess_requests_get_429(self):
+        client = limited_client()
+        for _ in range(3):
+            assert client.get("/api/ping").status_code == 200
+
+        response = client.get("/api/ping")
+
+        assert response.status_code == 429
+        assert response.headers["content-type"] == "application/problem+json"
+        assert response.headers["retry-after"] == "20"
+        assert response.headers["x-ratelimit-remaining"] == "0"
+        assert response.json()["type"] == "/errors/rate-limited"
+
+    def test_paths_without_rule_are_not_limited(self):
+        client = limited_client("1/minute")
+        client.get("/api/ping")
+
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert "x-ratelimit-limit" not in response.headers
+
+    def test_clients_are_limited_separately(self):
+        addresses = iter(["10.0.0.1", "10.0.0.2", "10.0.0.1"])
+        client = limited_client("1/minute", key_func=lambda scope: next(addresses))
+
+        statuses = [client.get("/api/ping").status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+
+    def test_backend_failure_allows_request(self):
+        class BrokenBackend:
+            async def hit(self, key, rule):
+                raise ConnectionError("redis is down")
+
+        client = limited_client(backend=BrokenBackend())
+
+        assert client.get("/api/ping").status_code == 200
+
+
+@pytest.mark.skipif(
+    not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set (local Redis)"
+)
+class TestRedisBackend:
+    """GCRA_SCRIPT в Redis считает так же, как backend в памяти"""
+
+    @staticmethod
+    def run(scenario):
+        pytest.importorskip("redis")
+
+        async def run():
+            backend = RedisRateLimitBackend(
+                TEST_REDIS_URL, prefix=f"test:ratelimit:{uuid.uuid4().hex}:"
+            )
+            try:
+                return await scenario(backend)
+            finally:
+                await backend._client.aclose()
+
+        return asyncio.run(run())
+
+    def test_burst_then_steady_rate(self):
+        rule = RateLimitRule.parse("/", "3/minute")
+
+        async def scenario(backend):
+            return [await backend.hit("a", rule) for _ in range(4)]
+
+        results = self.run(scenario)
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert results[3].retry_after == pytest.approx(20, abs=1)
+        assert results[3].reset_after == pytest.approx(60, abs=1)
+
+    def test_keys_are_independent_and_expire(self):
+        rule = RateLimitRule.parse("/", "1/minute")
+
+        async def scenario(backend):
+            results = [await backend.hit(key, rule) for key in ("a", "b", "a")]
+            ttl = await backend._client.pttl(backend.prefix + "a")
+            return results, ttl
+
+        results, ttl = self.run(scenario)
+
+        assert [r.allowed for r in results] == [True, True, False]
+        # Ключ живет, пока не восстановится лимит
+        assert 0 < ttl <= 60_000
@@ -0,0 +1,114 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database.search import build_match_query, search_notes, setup_fulltext
+from app.main import app
+from app.models.note import Base, Note
+
+client = TestClient(app)
+
+
+def add_note(db, title, body):
+    note = Note(title=title, body=body, user_id=1)
+    db.add(note)
+    db.commit()
+    return note
+
+
+class TestMatchQuery:
+    """Тесты построения FTS5 выражения"""
+
+    def test_terms_are_quoted_with_prefix(self):
+        assert build_match_query("algebra lin") == '"algebra"* "lin"*'
+
+    def test_fts_operators_are_not_interpreted(self):
+        """Операторы и кавычки FTS5 из ввода отбрасываются"""
+        match = build_match_query('test" OR NEAR(a b) *')
+        assert match == '"test"* "OR"* "NEAR"* "a"* "b"*'
+
+    def test_empty_query(self):
+        assert build_match_query("'; --") is None
+
+
+class TestFullTextSearch:
+    """Тесты полнотекстового поиска по заметкам"""
+
+    @pytest.mark.asyncio
+    async def test_prefix_match_and_snippet(self, sync_db, async_db):
+        add_note(sync_db, "Linear algebra", "Eigenvalues and eigenvectors of matrices")
+        add_note(sync_db, "History", "Nothing relevant here")
+
+        rows = (await search_notes(async_db, "eigen", 1)).rows
+
+        assert [note.title for note, _, _ in rows] == ["Linear algebra"]
+        assert "[Eigenvalues]" in rows[0].snippet
+
+    @pytest.mark.asyncio
+    async def test_results_are_ranked(self, sync_db, async_db):
+        add_note(sync_db, "Once", "python appears once among many other words")
+        add_note(sync_db, "Python python", "python python python")
+
+        rows = (await search_notes(async_db, "python", 1)).rows
+
+        assert [note.title for note, _, _ in rows] == ["Python python", "Once"]
+
+    @pytest.mark.asyncio
+    async def test_search_pages_follow_rank_order(self, sync_db, async_db):
+        for i in range(5):
+            add_note(sync_db, f"Note {i}", "kinematics " * (i + 1))
+
+        first = await search_notes(async_db, "kinematics", 1, limit=3)
+        second = await search_notes(
+            async_db, "kinematics", 1, cursor=first.next_cursor, limit=3
+        )
+
+        titles = [row.Note.title for row in first.rows + second.rows]
+        assert titles == ["Note 4", "Note 3", "Note 2", "Note 1", "Note 0"]
+        assert second.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_index_follows_updates_and_deletes(self, sync_db, async_db):
+        note = add_note(sync_db, "Draft", "chemistry")
+        note.body = "biology"
+        sync_db.commit()
+
+        assert (await search_notes(async_db, "chemistry", 1)).rows == []
+        assert len((await search_notes(async_db, "biology", 1)).rows) == 1
+
+        sync_db.delete(note)
+        sync_db.commit()
+        assert (await search_notes(async_db, "biology", 1)).rows == []
+
+    def test_existing_rows_are_indexed_on_setup(self, tmp_path):
+        """Заметки, созданные до появления индекса, попадают в него"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            add_note(db, "Physics", "quantum mechanics")
+
+        setup_fulltext(engine)
+
+        with engine.connect() as conn:
+            count = conn.exec_driver_sql(
+                "SELECT count(*) FROM notes_fts WHERE notes_fts MATCH 'quantum'"
+            ).scalar()
+        assert count == 1
+        engine.dispose()
+
+
+def test_search_endpoint_returns_ranked_results():
+    """Поиск через API находит созданную заметку по префиксу"""
+    response = client.post(
+        "/api/v1/notes",
+        json={"title": "Thermodynamics", "body": "Entropyfulltextmarker grows"},
+    )
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/", params={"search": "entropyfulltext"})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items and items[0]["title"] == "Thermodynamics"
+    assert "[Entropyfulltextmarker]" in items[0]["snippet"]
@@ -0,0 +1,126 @@
+import io
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.errors import MAX_MASKED_LENGTH, generic_exception_handler, mask_sensitive_data
+from app.main import app
+from app.middleware.request_id import RequestIdMiddleware
+from app.utils.structured_logging import JsonLogging
+
+client = TestClient(app)
+
+
+class TestMaskSensitiveData:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("contact: user@example.com", "contact: [EMAIL_REDACTED]"),
+            ('{"password": "s3cret"}', '{"password": "[PASSWORD_REDACTED]"}'),
+            ('{"api_key":"k-1"}', '{"api_key":"[API_KEY_REDACTED]"}'),
+            ('{"token": "user@example.com"}', '{"token": "[TOKEN_REDACTED]"}'),
+            ("card 4111-1111-1111-1111", "card [CARD_REDACTED]"),
+            ("/login?token=abc&page=2", "/login?token=[TOKEN_REDACTED]&page=2"),
+            ("/api/v1/notes/42?limit=20", "/api/v1/notes/42?limit=20"),
+        ],
+    )
+    def test_redaction(self, value, expected):
+        assert mask_sensitive_data(value) == expected
+
+    def test_dict_is_masked_as_string(self):
+        assert "[EMAIL_REDACTED]" in mask_sensitive_data({"email": "a@b.io"})
+
+    def test_long_url_masking_is_bounded(self):
+        target = "/api/v1/notes?" + "q=1234&" * 10_000
+
+        masked = mask_sensitive_data(target)
+
+        assert len(masked) <= MAX_MASKED_LENGTH + len("[TRUNCATED]")
+        assert masked.endswith("&[TRUNCATED]")
+
+
+class TestRequestId:
+    def test_incoming_request_id_is_correlation_id(self):
+        response = client.get("/items/999", headers={"X-Request-ID": "edge-42.a"})
+
+        assert response.headers["x-request-id"] == "edge-42.a"
+        assert response.json()["correlation_id"] == "edge-42.a"
+
+    def test_generated_when_header_missing(self):
+        response = client.get("/items/999")
+
+        correlation_id = response.json()["correlation_id"]
+        assert response.headers["x-request-id"] == correlation_id
+        assert len(correlation_id) == 36
+
+    def test_unsafe_header_is_replaced(self):
+        response = client.get("/items/999", headers={"X-Request-ID": "a b\tc"})
+
+        assert response.json()["correlation_id"] != "a b\tc"
+        assert len(response.json()["correlation_id"]) == 36
+
+    def test_successful_responses_carry_request_id(self):
+        response = client.get("/health", headers={"X-Request-ID": "probe-1"})
+
+        assert response.headers["x-request-id"] == "probe-1"
+
+    def test_unhandled_exception_logs_request_id(self, caplog):
+        test_app = FastAPI()
+        test_app.add_exception_handler(Exception, generic_exception_handler)
+        test_app.add_middleware(RequestIdMiddleware)
+
+        @test_app.get("/boom")
+        def boom():
+            raise ValueError("boom")
+
+        test_client = TestClient(test_app, raise_server_exceptions=False)
+        with caplog.at_level(logging.ERROR, logger="app.errors"):
+            response = test_client.get(
+                "/boom?token=abc", headers={"X-Request-ID": "r-1"}
+            )
+
+        assert response.status_code == 500
+        assert response.json()["correlation_id"] == "r-1"
+        [record] = caplog.records
+        assert record.correlation_id == "r-1"
+        assert record.path == "/boom?token=[TOKEN_REDACTED]"
+        assert record.exc_info[0] is ValueError
+
+
+class TestJsonLogging:
+    def test_records_are_written_as_json_by_listener(self):
+        stream = io.StringIO()
+        json_logging = JsonLogging("INFO", stream=stream)
+        json_logging.start()
+        try:
+            client.get("/items/999", headers={"X-Request-ID": "json-1"})
+            logging.getLogger("app.test").info("%d notes", 3, extra={"user_id": 7})
+        finally:
+            json_logging.shutdown()
+
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        error = next(e for e in entries if e["logger"] == "security")
+        assert error["request_id"] == "json-1"
+        assert error["correlation_id"] == "json-1"
+        assert error["status"] == 404
+        assert error["level"] == "WARNING"
+        info = next(e for e in entries if e["logger"] == "app.test")
+        assert info["message"] == "3 notes"
+        assert info["user_id"] == 7
+        assert json_logging.handler not in logging.getLogger().handlers
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        json_logging = JsonLogging("INFO", queue_size=2, stream=io.StringIO())
+        logger = logging.getLogger("app.test.flood")
+        logger.addHandler(json_logging.handler)
+        try:
+            # Слушатель не запущен: очередь не разбирается
+            for i in range(5):
+                logger.warning("record %d", i)
+        finally:
+            logger.removeHandler(json_logging.handler)
+
+        assert json_logging.handler.dropped == 3
@@ -0,0 +1,161 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.database import tags as tag_queries
+from app.main import app
+from app.models.note import Note
+
+client = TestClient(app)
+
+
+def unique_name(label):
+    return f"{label}-{uuid.uuid4().hex[:8]}"
+
+
+def create_tag(name=None):
+    response = client.post("/api/v1/tags", json={"name": name or unique_name("tag")})
+    assert response.status_code == 201
+    return response.json()
+
+
+def attach(note_id, tag_id):
+    response = client.put(f"/api/v1/notes/{note_id}/tags/{tag_id}")
+    assert response.status_code == 204
+
+
+def list_ids(*tags, match="all"):
+    response = client.get(
+        "/api/v1/notes", params={"tag": list(tags), "match": match, "limit": 200}
+    )
+    assert response.status_code == 200
+    return {item["id"] for item in response.json()["items"]}
+
+
+class TestTagCrud:
+    """Создание, переименование и удаление тегов"""
+
+    def test_create_get_rename(self):
+        tag = create_tag()
+        assert client.get(f"/api/v1/tags/{tag['id']}").json() == tag
+
+        name = unique_name("renamed")
+        renamed = client.put(f"/api/v1/tags/{tag['id']}", json={"name": name})
+        assert renamed.status_code == 200
+        assert renamed.json()["name"] == name
+        client.delete(f"/api/v1/tags/{tag['id']}")
+
+    def test_duplicate_name(self):
+        tag = create_tag()
+
+        response = client.post("/api/v1/tags", json={"name": tag["name"]})
+        assert response.status_code == 409
+
+        other = create_tag()
+        response = client.put(f"/api/v1/tags/{other['id']}", json={"name": tag["name"]})
+        assert response.status_code == 409
+
+    @pytest.mark.parametrize("name", ["", "with space", "a" * 51])
+    def test_invalid_name(self, name):
+        assert client.post("/api/v1/tags", json={"name": name}).status_code == 422
+
+    def test_unknown_tag(self):
+        assert client.get("/api/v1/tags/999999").status_code == 404
+        assert client.delete("/api/v1/tags/999999").status_code == 404
+
+
+class TestNoteTags:
+    """Привязка тегов к заметкам, фильтрация и счетчики"""
+
+    def test_attach_and_detach(self, create_note):
+        tag, note_id = create_tag(), create_note()
+
+        attach(note_id, tag["id"])
+        attach(note_id, tag["id"])
+        assert client.get(f"/api/v1/notes/{note_id}").json()["tags"] == [tag["name"]]
+
+        response = client.delete(f"/api/v1/notes/{note_id}/tags/{tag['id']}")
+        assert response.status_code == 204
+        assert client.get(f"/api/v1/notes/{note_id}").json()["tags"] == []
+
+    def test_attach_to_missing_note(self):
+        tag = create_tag()
+        response = client.put(f"/api/v1/notes/999999/tags/{tag['id']}")
+        assert response.status_code == 404
+
+    def test_attach_changes_note_etag(self, create_note):
+        tag, note_id = create_tag(), create_note()
+        etag = client.get(f"/api/v1/notes/{note_id}").headers["etag"]
+
+        attach(note_id, tag["id"])
+
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["tags"] == [tag["name"]]
+
+    def test_filter_all_and_any(self, create_note):
+        a, b = create_tag(), create_tag()
+        only_a, both, neither = create_note(), create_note(), create_note()
+        attach(only_a, a["id"])
+        attach(both, a["id"])
+        attach(both, b["id"])
+
+        assert list_ids(a["name"], b["name"]) == {both}
+        assert list_ids(a["name"], b["name"], match="any") == {only_a, both}
+        assert list_ids(a["name"]) == {only_a, both}
+        assert neither not in list_ids(a["name"], match="any")
+        assert list_ids(unique_name("missing")) == set()
+
+    def test_usage_counts(self, create_note):
+        tag, unused = create_tag(), create_tag()
+        for note_id in (create_note(), create_note()):
+            attach(note_id, tag["id"])
+
+        counts = {t["name"]: t["note_count"] for t in client.get("/api/v1/tags").json()}
+        assert counts[tag["name"]] == 2
+        assert counts[unused["name"]] == 0
+
+    def test_rename_and_delete_update_notes(self, create_note):
+        tag, note_id = create_tag(), create_note()
+        attach(note_id, tag["id"])
+        client.get(f"/api/v1/notes/{note_id}")
+
+        client.put(f"/api/v1/tags/{tag['id']}", json={"name": unique_name("new")})
+        renamed = client.get(f"/api/v1/notes/{note_id}").json()["tags"]
+        assert renamed != [tag["name"]]
+
+        assert client.delete(f"/api/v1/tags/{tag['id']}").status_code == 204
+        assert client.get(f"/api/v1/notes/{note_id}").json()["tags"] == []
+
+    def test_batch_delete_removes_links(self, create_note):
+        tag, note_id = create_tag(), create_note()
+        attach(note_id, tag["id"])
+
+        client.request("DELETE", "/api/v1/notes:batch", json=[note_id])
+
+        counts = {t["id"]: t["note_count"] for t in client.get("/api/v1/tags").json()}
+        assert counts[tag["id"]] == 0
+
+
+class TestTagFilterPlan:
+    """Фильтр по тегам читает индексы, а не всю таблицу note_tags"""
+
+    @pytest.mark.parametrize("match", [tag_queries.MATCH_ALL, tag_queries.MATCH_ANY])
+    def test_filter_uses_indexes(self, sync_engine, match):
+        query = select(Note.id).where(
+            Note.id.in_(tag_queries.tagged_note_ids(1, ["a", "b"], match))
+        )
+        sql = query.compile(sync_engine, compile_kwargs={"literal_binds": True})
+
+        with sync_engine.connect() as conn:
+            plan = " ".join(
+                row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+            )
+
+        assert "uq_tags_user_id_name" in plan
+        assert "ix_note_tags_tag_id_note_id" in plan
+        assert "SCAN note_tags" not in plan
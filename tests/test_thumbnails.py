@@ -0,0 +1,173 @@
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.models.file import StoredFile, ThumbnailJob
+from app.utils import thumbnails
+from app.utils.thumbnails import THUMBNAIL_SIZES, InvalidImageError
+from app.workers.thumbnails import ThumbnailWorker
+
+Image = pytest.importorskip("PIL.Image")
+
+client = TestClient(app)
+
+SHA256 = "ab" * 32
+
+
+def image_bytes(size=(800, 600), fmt="PNG", color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def add_stored_file(session_factory, upload_dir, data, content_type="image/png"):
+    extension = "png" if content_type == "image/png" else "jpg"
+    relative = f"ab/ab/{SHA256}.{extension}"
+    (upload_dir / relative).parent.mkdir(parents=True)
+    (upload_dir / relative).write_bytes(data)
+    with session_factory() as db:
+        db.add(
+            StoredFile(
+                sha256=SHA256,
+                path=relative,
+                content_type=content_type,
+                size=len(data),
+                ref_count=1,
+            )
+        )
+        db.add(ThumbnailJob(sha256=SHA256))
+        db.commit()
+
+
+class TestMakeThumbnails:
+    """Генерация миниатюр и размеров изображения"""
+
+    @pytest.mark.parametrize(
+        "fmt,content_type", [("PNG", "image/png"), ("JPEG", "image/jpeg")]
+    )
+    def test_all_sizes_are_created(self, tmp_path, fmt, content_type):
+        source = tmp_path / "source"
+        source.write_bytes(image_bytes((1600, 900), fmt))
+
+        assert thumbnails.make_thumbnails(tmp_path, source, SHA256, content_type) == (
+            1600,
+            900,
+        )
+
+        for size in THUMBNAIL_SIZES:
+            with Image.open(
+                thumbnails.thumbnail_path(tmp_path, SHA256, content_type, size)
+            ) as thumb:
+                assert max(thumb.size) == size
+                assert thumb.format == fmt
+
+    def test_small_image_is_not_upscaled(self, tmp_path):
+        source = tmp_path / "source"
+        source.write_bytes(image_bytes((100, 50)))
+
+        thumbnails.make_thumbnails(tmp_path, source, SHA256, "image/png")
+
+        with Image.open(
+            thumbnails.thumbnail_path(tmp_path, SHA256, "image/png", 512)
+        ) as thumb:
+            assert thumb.size == (100, 50)
+
+    def test_corrupted_image(self, tmp_path):
+        source = tmp_path / "source"
+        source.write_bytes(b"\x89PNG\r\n\x1a\n" + b"garbage" * 10)
+
+        with pytest.raises(InvalidImageError):
+            thumbnails.make_thumbnails(tmp_path, source, SHA256, "image/png")
+
+
+class TestThumbnailWorker:
+    """Фоновая обработка задач из таблицы thumbnail_jobs"""
+
+    @pytest.fixture
+    def session_factory(self, sync_engine):
+        return sessionmaker(bind=sync_engine)
+
+    @pytest.fixture
+    def worker(self, session_factory, tmp_path):
+        worker = ThumbnailWorker(session_factory, tmp_path, max_workers=1)
+        yield worker
+        worker.shutdown()
+
+    def test_job_stores_dimensions(self, worker, session_factory, tmp_path):
+        add_stored_file(session_factory, tmp_path, image_bytes((640, 480)))
+
+        assert worker.submit(SHA256).result(timeout=10) == ThumbnailJob.DONE
+
+        with session_factory() as db:
+            stored = db.get(StoredFile, SHA256)
+            assert (stored.width, stored.height) == (640, 480)
+            assert db.get(ThumbnailJob, SHA256).attempts == 1
+        assert thumbnails.thumbnail_path(tmp_path, SHA256, "image/png", 128).exists()
+
+    def test_job_is_processed_once(self, worker, session_factory, tmp_path):
+        add_stored_file(session_factory, tmp_path, image_bytes())
+
+        assert worker.submit(SHA256).result(timeout=10) == ThumbnailJob.DONE
+        assert worker.submit(SHA256).result(timeout=10) is None
+
+    def test_invalid_image_fails_without_retry(self, worker, session_factory, tmp_path):
+        add_stored_file(session_factory, tmp_path, b"\x89PNG\r\n\x1a\n" + b"x" * 100)
+
+        assert worker.submit(SHA256).result(timeout=10) == ThumbnailJob.FAILED
+
+        with session_factory() as db:
+            job = db.get(ThumbnailJob, SHA256)
+            assert job.attempts == 1
+            assert job.last_error
+
+    def test_recover_resumes_interrupted_jobs(self, worker, session_factory, tmp_path):
+        add_stored_file(session_factory, tmp_path, image_bytes())
+        with session_factory() as db:
+            # Процесс остановился во время обработки
+            db.get(ThumbnailJob, SHA256).status = ThumbnailJob.RUNNING
+            db.commit()
+
+        futures = worker.recover()
+
+        assert [f.result(timeout=10) for f in futures] == [ThumbnailJob.DONE]
+
+
+class TestThumbnailEndpoints:
+    """Загрузка изображения, метаданные и отдача миниатюр"""
+
+    def test_thumbnails_are_served_after_processing(self):
+        data = image_bytes((1200, 800), color=(10, 20, int(time.time()) % 256))
+        upload = client.post(
+            "/api/v1/files/upload", files={"file": ("photo.png", data, "image/png")}
+        )
+        name = upload.json()["saved_as"]
+
+        try:
+            info = client.get(f"/api/v1/files/{name}/info").json()
+            deadline = time.monotonic() + 10
+            while info["thumbnail_status"] != "done" and time.monotonic() < deadline:
+                time.sleep(0.05)
+                info = client.get(f"/api/v1/files/{name}/info").json()
+
+            assert info["thumbnail_status"] == "done"
+            assert (info["width"], info["height"]) == (1200, 800)
+            assert set(info["thumbnails"]) == {str(size) for size in THUMBNAIL_SIZES}
+
+            response = client.get(f"/api/v1/files/{name}", params={"size": 128})
+            assert response.status_code == 200
+            assert (
+                response.headers["etag"]
+                != client.get(f"/api/v1/files/{name}").headers["etag"]
+            )
+            with Image.open(io.BytesIO(response.content)) as thumb:
+                assert max(thumb.size) == 128
+        finally:
+            client.delete(f"/api/v1/files/{name}")
+
+    def test_unknown_thumbnail_size(self):
+        response = client.get(f"/api/v1/files/{'0' * 64}.png", params={"size": 100})
+        assert response.status_code == 404
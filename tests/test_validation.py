@@ -1,9 +1,21 @@
+import json
+from datetime import datetime
 from decimal import Decimal
 
 import pytest
+from fastapi.testclient import TestClient
 
+from app.main import app
 from app.schemas.note import NoteCreate
 from app.schemas.validation import PaymentValidation, safe_json_parse
+from app.utils.json_security import (
+    SafeJSONResponse,
+    render_safe_json,
+    safe_json_dumps,
+    safe_json_response,
+)
+
+client = TestClient(app)
 
 
 class TestPaymentValidation:
@@ -137,3 +149,61 @@ class TestJSONSecurity:
         bad_json = '{"amount": 100.50'  # Незакрытый JSON
         with pytest.raises(ValueError):
             safe_json_parse(bad_json)
+
+
+class TestSafeJSONResponse:
+    """Тесты однопроходной сериализации ответов"""
+
+    def test_decimal_rendered_as_string(self):
+        data = {"amount": Decimal("1234567890.1234567890"), "items": [Decimal("0.1")]}
+
+        body = render_safe_json(data)
+
+        assert json.loads(body) == {
+            "amount": "1234567890.1234567890",
+            "items": ["0.1"],
+        }
+
+    def test_matches_safe_json_dumps_semantics(self):
+        data = {"price": Decimal("10.50"), "name": "тест", "ratio": 0.1 + 0.2}
+
+        assert json.loads(render_safe_json(data)) == json.loads(safe_json_dumps(data))
+
+    def test_values_unsupported_by_fast_path_fall_back(self):
+        data = {"big": 10**30, 1: "int key"}
+
+        assert json.loads(render_safe_json(data)) == {"big": 10**30, "1": "int key"}
+
+    def test_unknown_types_rejected(self):
+        with pytest.raises(TypeError):
+            render_safe_json({"when": datetime(2024, 1, 1)})
+
+    def test_response_object(self):
+        response = safe_json_response({"amount": Decimal("0.1")})
+
+        assert isinstance(response, SafeJSONResponse)
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == {"amount": "0.1"}
+
+    def test_decimal_demo_endpoint(self):
+        response = client.get("/api/v1/demo/decimal-test")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["small_decimal"] == "0.1"
+        assert data["large_decimal"] == "1234567890.1234567890"
+
+    def test_get_note_endpoint(self):
+        created = client.post(
+            "/api/v1/notes", json={"title": "Serialized", "body": "Decimal safe"}
+        ).json()
+
+        response = client.get(f"/api/v1/notes/{created['id']}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["title"] == "Serialized"
+        assert data["body"] == "Decimal safe"
+        assert data["priority"] == "1.0"
+        listed = client.get("/api/v1/notes", params={"limit": 100}).json()["items"]
+        assert data in listed